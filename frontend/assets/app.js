@@ -38,15 +38,29 @@ async function fetchJson(path, options = {}) {
 
 // Metrics form handler
 const metricsForm = document.getElementById("metrics-form");
+const METRIC_PUSH_ENDPOINTS = ["wait-stats", "blocking"];
+let metricsSource = null;
+
 metricsForm?.addEventListener("submit", async (event) => {
   event.preventDefault();
   const endpoint = document.getElementById("metrics-endpoint").value;
   const instance = document.getElementById("metrics-instance").value.trim();
   const limit = document.getElementById("metrics-limit").value;
+  const from = document.getElementById("metrics-from").value.trim();
+  const to = document.getElementById("metrics-to").value.trim();
+  const push = document.getElementById("metrics-push").checked;
   const params = new URLSearchParams({ limit });
   if (instance) params.set("instance", instance);
+  if (from) params.set("from", from);
+  if (to) params.set("to", to);
   const output = document.getElementById("metrics-output");
+  metricsSource?.close();
+  metricsSource = null;
   output.textContent = "Loading...";
+  if (push && METRIC_PUSH_ENDPOINTS.includes(endpoint)) {
+    metricsSource = subscribeLive(`metrics/${endpoint}`, instance, output);
+    return;
+  }
   try {
     const data = await fetchJson(`/metrics/${endpoint}?${params.toString()}`);
     output.textContent = formatOutput(data);
@@ -70,24 +84,95 @@ analysisForm?.addEventListener("submit", async (event) => {
     if (issuesRaw) {
       payload.issues = issuesRaw;
     }
-    const data = await fetchJson("/analysis/insights", {
-      method: "POST",
-      body: JSON.stringify(payload),
-    });
-    output.textContent = formatOutput(data);
+    await streamInsights(payload, output);
   } catch (error) {
     output.textContent = `Error: ${error.message}`;
   }
 });
 
+// Relays /analysis/insights/stream Server-Sent Events into the output panel.
+async function streamInsights(payload, output) {
+  const response = await fetch(`${API_BASE}/analysis/insights/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+  if (!response.ok) {
+    const message = await response.text();
+    throw new Error(message || `Request failed with status ${response.status}`);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let text = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const frames = buffer.split("\n\n");
+    buffer = frames.pop();
+    for (const frame of frames) {
+      const event = /^event: (.*)$/m.exec(frame)?.[1];
+      const data = JSON.parse(/^data: (.*)$/m.exec(frame)?.[1] || "{}");
+      if (event === "token") {
+        text += data.token;
+        output.textContent = text;
+      } else if (event === "done") {
+        const stats = { timing: data.timing, compaction: data.compaction };
+        output.textContent = `${data.response}\n\n${formatOutput(stats)}`;
+      } else if (event === "error") {
+        throw new Error(data.detail);
+      }
+    }
+  }
+}
+
 // Live monitoring form handler
 const liveForm = document.getElementById("live-form");
+const PUSH_SECTIONS = ["waits", "blocking", "sessions"];
+let liveSource = null;
+
+// Keeps a row map in sync with /live/subscribe snapshots and deltas; one shared collection serves every tab.
+// Rows arrive as {key, row} entries keyed by the server, so "removed" keys always match.
+function subscribeLive(section, instance, output) {
+  const params = instance ? `?instance=${encodeURIComponent(instance)}` : "";
+  const rows = new Map();
+  const render = () => {
+    output.textContent = formatOutput(Array.from(rows.values()));
+  };
+  const source = new EventSource(`${API_BASE}/live/subscribe/${section}${params}`);
+  source.addEventListener("snapshot", (event) => {
+    const data = JSON.parse(event.data);
+    rows.clear();
+    data.rows.forEach((entry) => rows.set(entry.key, entry.row));
+    render();
+  });
+  source.addEventListener("delta", (event) => {
+    const data = JSON.parse(event.data);
+    data.upserts.forEach((entry) => rows.set(entry.key, entry.row));
+    data.removed.forEach((key) => rows.delete(key));
+    render();
+  });
+  source.addEventListener("error", (event) => {
+    if (event.data) output.textContent = `Error: ${JSON.parse(event.data).detail}`;
+  });
+  return source;
+}
+
 liveForm?.addEventListener("submit", async (event) => {
   event.preventDefault();
   const endpoint = document.getElementById("live-endpoint").value;
   const limit = document.getElementById("live-limit").value;
+  const instance = document.getElementById("live-instance").value.trim();
+  const push = document.getElementById("live-push").checked;
   const output = document.getElementById("live-output");
+  liveSource?.close();
+  liveSource = null;
   output.textContent = "Loading...";
+  if (push && PUSH_SECTIONS.includes(endpoint)) {
+    liveSource = subscribeLive(endpoint, instance, output);
+    return;
+  }
   try {
     const data = await fetchJson(`/live/${endpoint}?limit=${encodeURIComponent(limit)}`);
     output.textContent = formatOutput(data);
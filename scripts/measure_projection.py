@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Measure the payload saved by projecting Elastic hits onto normalizer fields.
+
+Every registered normalizer is measured. Without ``--url`` the script builds
+synthetic OpenTelemetry-shaped documents for each signal, checks the projection
+keeps every field the normalizer reads, and compares the JSON size of the full
+``_source`` with the projected one. With ``--url`` it runs each signal's search
+against a live cluster with and without ``_source`` includes and reports the
+response body sizes.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.collector_bridge.normalizers import NORMALIZERS  # noqa: E402
+
+_WAIT_TYPES = ("PAGEIOLATCH_SH", "LCK_M_X", "CXPACKET", "WRITELOG", "SOS_SCHEDULER_YIELD")
+_STATEMENTS = (
+    "UPDATE dbo.Orders SET Status = @status WHERE OrderId = @id",
+    "SELECT c.CustomerId, SUM(o.Total) FROM dbo.Customers c JOIN dbo.Orders o ON o.CustomerId = c.CustomerId "
+    "WHERE o.CreatedAt >= @since GROUP BY c.CustomerId",
+    "DELETE FROM dbo.SessionState WHERE ExpiresAt < SYSUTCDATETIME()",
+)
+
+
+def _signal_payload(signal: str, i: int) -> dict:
+    """The signal-specific part of a synthetic document, shaped like the collector's output."""
+
+    if signal == "wait_stats":
+        return {"wait_stats": {"type": _WAIT_TYPES[i % 5], "time_ms": 1200 + i, "tasks": 4, "signal_ms": 12}}
+    if signal == "blocking":
+        return {
+            "blocking": {
+                "session_id": 60 + i % 40,
+                "blocking_session_id": 55 + i % 5,
+                "wait_type": "LCK_M_X" if i % 3 else "LCK_M_S",
+                "wait_resource": f"KEY: 7:72057594043{i % 1000:03d} (8194443284a0)",
+                "duration_ms": 250 * (1 + i % 20),
+                "database": f"app_db_{i % 3}",
+                "login_name": "svc_orders",
+                "host_name": f"app-{i % 8:02d}",
+                "program_name": "Microsoft SqlClient Data Provider",
+                "status": "suspended",
+                "query_text": _STATEMENTS[i % len(_STATEMENTS)],
+            }
+        }
+    if signal == "io":
+        return {
+            "io": {
+                "database": f"app_db_{i % 3}",
+                "file": f"app_db_{i % 3}_data.mdf",
+                "read_bytes": 8192 * (1000 + i),
+                "write_bytes": 8192 * (400 + i),
+                "read_latency_ms": 4 + i % 7,
+                "write_latency_ms": 2 + i % 5,
+                "num_of_reads": 1000 + i,
+                "num_of_writes": 400 + i,
+            }
+        }
+    if signal == "query_store":
+        return {
+            "query_store": {
+                "query_hash": f"0x{i * 2654435761 % 2**64:016X}",
+                "plan_hash": f"0x{i * 40503 % 2**64:016X}",
+                "executions": 10 + i,
+                "avg_duration_ms": 12.5 + i % 9,
+                "avg_cpu_ms": 8.25 + i % 4,
+                "logical_reads": 4000 + i,
+                "query_text": _STATEMENTS[i % len(_STATEMENTS)],
+            }
+        }
+    if signal == "cpu":
+        return {"cpu": {"percent": 35 + i % 50, "sql_percent": 30 + i % 45, "runnable_tasks": i % 6, "idle": 10}}
+    raise ValueError(f"No synthetic document shape for signal '{signal}'")
+
+
+def synthetic_document(i: int, signal: str = "wait_stats") -> dict:
+    return {
+        "@timestamp": f"2024-05-01T12:{i % 60:02d}:00Z",
+        "mssql_instance": f"sql{i % 10:02d}",
+        **_signal_payload(signal, i),
+        "resource": {
+            "attributes": {
+                "host.name": f"sql-host-{i % 10:02d}.corp.example.com",
+                "host.arch": "amd64",
+                "os.type": "windows",
+                "os.description": "Microsoft Windows Server 2022 Datacenter 10.0.20348",
+                "service.name": "otelcol-contrib",
+                "service.version": "0.98.0",
+                "service.instance.id": "5c1f0a4e-2f2e-4b52-9b1c-9a4c8bb2e5d1",
+                "sqlserver.computer.name": f"SQL-HOST-{i % 10:02d}",
+                "sqlserver.instance.name": "MSSQLSERVER",
+                "cloud.provider": "azure",
+                "cloud.region": "westeurope",
+                "cloud.account.id": "00000000-0000-0000-0000-000000000000",
+            }
+        },
+        "scope": {"name": "otelcol/sqlserverreceiver", "version": "0.98.0"},
+        "data_stream": {"type": "metrics", "dataset": "sqlserverreceiver", "namespace": "default"},
+        "agent": {"type": "otelcol", "version": "0.98.0", "id": "b3c1d2e4-aaaa-bbbb-cccc-1234567890ab"},
+        "metricset": {"name": "app"},
+        "unit": "ms",
+    }
+
+
+def project(document: dict, fields) -> dict:
+    """Mimic Elastic ``_source`` includes for dotted paths."""
+
+    projected: dict = {}
+    for path in fields:
+        parts = path.split(".")
+        value = document
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return projected
+
+
+def _report(name: str, full: int, projected: int) -> None:
+    reduction = 1 - projected / full if full else 0.0
+    print(f"{name:>12}: full={full} bytes projected={projected} bytes reduction={reduction:.1%}")
+
+
+def measure_synthetic(count: int) -> None:
+    for name, normalizer in NORMALIZERS.items():
+        docs = [synthetic_document(i, name) for i in range(count)]
+        projected_docs = [project(doc, normalizer.fields) for doc in docs]
+        if normalizer.rows(projected_docs) != normalizer.rows(docs):
+            raise SystemExit(f"{name}: projection drops fields the normalizer reads")
+        full = len(json.dumps(docs).encode("utf-8"))
+        _report(name, full, len(json.dumps(projected_docs).encode("utf-8")))
+
+
+def measure_live(args: argparse.Namespace) -> None:
+    from elasticsearch import Elasticsearch
+
+    es = Elasticsearch(
+        args.url,
+        basic_auth=(args.user, args.password) if args.user and args.password else None,
+        verify_certs=not args.insecure,
+    )
+    for name, normalizer in NORMALIZERS.items():
+        marker = {"exists": {"field": normalizer.spec.marker}}
+        query = {"bool": {"filter": [{"query_string": {"query": args.q}}, marker]}}
+        full = es.search(index=args.index, query=query, size=args.size)
+        projected = es.search(index=args.index, query=query, size=args.size, source_includes=list(normalizer.fields))
+        if not full.body.get("hits", {}).get("hits"):
+            print(f"{name:>12}: no documents match")
+            continue
+        _report(name, len(json.dumps(full.body).encode("utf-8")), len(json.dumps(projected.body).encode("utf-8")))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url")
+    parser.add_argument("--index", default="mssql-metrics-*")
+    parser.add_argument("--q", default="*")
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--user", default=os.getenv("ES_USER"))
+    parser.add_argument("--password", default=os.getenv("ES_PASS"))
+    parser.add_argument("--insecure", action="store_true")
+    args = parser.parse_args()
+    if args.url:
+        measure_live(args)
+    else:
+        measure_synthetic(args.size)
+
+
+if __name__ == "__main__":
+    main()
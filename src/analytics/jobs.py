@@ -0,0 +1,291 @@
+"""Background queue of LLM analysis jobs drained by a bounded worker pool."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from src.analytics.llm_analyzer import CachedInsightStream, InsightStream, LLMAnalyzer
+from src.analytics.ollama_client import OllamaBusyError
+from src.common.config import OllamaSettings
+
+LOGGER = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = frozenset({"queued", "running"})
+STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+# A job Ollama turned away waits retry_backoff * 2**attempts seconds, at most this many backoffs.
+MAX_BACKOFF = 8
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when accepting a submission would exceed ``job_max_pending`` queued jobs."""
+
+
+def job_key(request: Mapping[str, Any]) -> str:
+    """Identity of a job for de-duplication: the analysis inputs, excluding priority."""
+
+    material = {name: request.get(name) for name in ("title", "metrics", "issues", "instance", "use_cache")}
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat() if timestamp is not None else None
+
+
+class _Job:
+    __slots__ = (
+        "id",
+        "key",
+        "request",
+        "priority",
+        "status",
+        "submitted_at",
+        "started_at",
+        "finished_at",
+        "result",
+        "error",
+        "stream",
+        "attempts",
+    )
+
+    def __init__(self, key: str, request: Dict[str, Any], priority: int, submitted_at: float):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.request = request
+        self.priority = priority
+        self.status = "queued"
+        self.submitted_at = submitted_at
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.stream: Optional[InsightStream | CachedInsightStream] = None
+        self.attempts = 0
+
+    def view(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "title": self.request.get("title"),
+            "instance": self.request.get("instance"),
+            "priority": self.priority,
+            "submitted_at": _iso(self.submitted_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class InsightJobQueue:
+    """Runs analyses in the background so clients submit, then poll, instead of holding a request open.
+
+    Jobs wait in a priority queue (higher ``priority`` first, FIFO within a
+    priority) and ``job_workers`` tasks feed them to Ollama through the analyzer's
+    streaming path, so cancelling a running job drops the upstream generation.
+    Submitting a job identical to one still queued or running returns the existing
+    job. Finished jobs are kept for ``job_retention`` seconds. ``settings_provider``
+    is read on every submission; the worker count is fixed when the queue starts.
+    A job rejected with :class:`OllamaBusyError` goes back to ``queued`` and is
+    queued again after a backoff instead of failing.
+    """
+
+    def __init__(
+        self,
+        settings_provider: Callable[[], OllamaSettings],
+        analyzer_provider: Callable[[], LLMAnalyzer],
+        clock: Callable[[], float] = time.time,
+    ):
+        self._settings_provider = settings_provider
+        self._analyzer_provider = analyzer_provider
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, _Job] = {}
+        self._active: Dict[str, _Job] = {}
+        self._sequence = itertools.count()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._stats = {"submitted": 0, "deduplicated": 0, "rejected": 0, "requeued": 0}
+
+    def submit(self, request: Mapping[str, Any], priority: int = 0) -> Dict[str, Any]:
+        return self.submit_many([request], priority)[0]
+
+    def submit_many(self, requests: Sequence[Mapping[str, Any]], priority: int = 0) -> List[Dict[str, Any]]:
+        """Queue every request or none: the batch is rejected if it would overflow the queue.
+
+        Must be called on the event loop running the workers.
+        """
+
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        settings = self._settings_provider()
+        now = self._clock()
+        with self._lock:
+            self._prune(now, settings.job_retention)
+            keyed = [(job_key(request), dict(request)) for request in requests]
+            new_keys = {key for key, _ in keyed if key not in self._active}
+            queued = sum(1 for job in self._active.values() if job.status == "queued")
+            if queued + len(new_keys) > settings.job_max_pending:
+                self._stats["rejected"] += len(requests)
+                raise JobQueueFullError(f"Analysis queue is full ({settings.job_max_pending} jobs pending)")
+            views = []
+            for key, request in keyed:
+                job = self._active.get(key)
+                if job is not None:
+                    self._stats["deduplicated"] += 1
+                    views.append({**job.view(), "deduplicated": True})
+                    continue
+                job = _Job(key, request, priority, now)
+                self._jobs[job.id] = self._active[key] = job
+                self._stats["submitted"] += 1
+                self._queue.put_nowait((-priority, next(self._sequence), job))
+                views.append({**job.view(), "deduplicated": False})
+        return views
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._prune(self._clock(), self._settings_provider().job_retention)
+            job = self._jobs.get(job_id)
+            return job.view() if job is not None else None
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job; finished jobs are returned unchanged."""
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status in ACTIVE_STATUSES:
+                self._finish(job, "cancelled")
+            stream = job.stream
+            view = job.view()
+        if stream is not None:
+            stream.close()
+        return view
+
+    def _finish(
+        self, job: _Job, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None
+    ) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = self._clock()
+        if self._active.get(job.key) is job:
+            del self._active[job.key]
+
+    def _prune(self, now: float, retention: float) -> None:
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > retention
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _run(self, job: _Job) -> bool:
+        """Run one job; returns ``True`` when Ollama was busy and the job is queued again."""
+
+        with self._lock:
+            if job.status != "queued":
+                return False
+            job.status = "running"
+            job.started_at = self._clock()
+        request = job.request
+        try:
+            stream = self._analyzer_provider().analyze_stream(
+                request.get("title", "SQL Server Health Report"),
+                request.get("metrics") or [],
+                request.get("issues"),
+                request.get("use_cache", True),
+                request.get("instance"),
+            )
+            with self._lock:
+                job.stream = stream
+                cancelled = job.status == "cancelled"
+            if cancelled:
+                stream.close()
+                return False
+            result = None
+            for event in stream:
+                if event["event"] == "done":
+                    result = event["data"]
+        except OllamaBusyError as exc:
+            with self._lock:
+                if job.status != "running":
+                    return False
+                LOGGER.info("Ollama is busy; requeueing analysis job %s: %s", job.id, exc)
+                job.status = "queued"
+                job.started_at = None
+                job.attempts += 1
+                self._stats["requeued"] += 1
+            return True
+        except Exception as exc:
+            with self._lock:
+                if job.status == "running":
+                    LOGGER.warning("Analysis job %s failed: %s", job.id, exc)
+                    self._finish(job, "failed", error=str(exc) or type(exc).__name__)
+            return False
+        finally:
+            with self._lock:
+                job.stream = None
+        with self._lock:
+            if job.status == "running":
+                self._finish(job, "succeeded", result=result)
+        return False
+
+    def _requeue(self, job: _Job) -> None:
+        if self._queue is not None and job.status == "queued":
+            self._queue.put_nowait((-job.priority, next(self._sequence), job))
+
+    async def _work(self) -> None:
+        assert self._queue is not None
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if await asyncio.to_thread(self._run, job):
+                    delay = self._settings_provider().retry_backoff * min(2**job.attempts, MAX_BACKOFF)
+                    asyncio.get_running_loop().call_later(delay, self._requeue, job)
+            except Exception:
+                LOGGER.exception("Analysis job %s crashed", job.id)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict.fromkeys(STATUSES, 0)
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return {"workers": len(self._workers), "jobs": counts, **self._stats}
+
+    def start(self) -> None:
+        if self._queue is not None:
+            return
+        self._queue = asyncio.PriorityQueue()
+        loop = asyncio.get_running_loop()
+        self._workers = [
+            loop.create_task(self._work(), name=f"insight-job-{index}")
+            for index in range(max(1, self._settings_provider().job_workers))
+        ]
+
+    async def stop(self) -> None:
+        if self._queue is None:
+            return
+        with self._lock:
+            active = list(self._active.values())
+        for job in active:
+            self.cancel(job.id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+
+__all__ = ["InsightJobQueue", "JobQueueFullError", "MAX_BACKOFF", "job_key"]
@@ -1,49 +1,421 @@
 """LLM-powered analysis helpers using Ollama."""
 from __future__ import annotations
 
+import contextlib
+import hashlib
+import json
 import logging
-from typing import Any, Dict, List, Optional
-
-import requests
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+from src.analytics.ollama_client import GenerationStream, OllamaClient
+from src.analytics.prompt_compaction import compact_metrics
 from src.common.config import OllamaSettings
 
 LOGGER = logging.getLogger(__name__)
 
 
+def insight_key(payload: Dict[str, Any]) -> str:
+    """Content address of a generation: the prompt, model, temperature and ``num_predict``."""
+
+    options = payload.get("options", {})
+    material = {
+        "model": payload.get("model"),
+        "prompt": payload.get("prompt"),
+        "temperature": options.get("temperature"),
+        "num_predict": options.get("num_predict"),
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class InsightCache:
+    """LRU of generated insights keyed by :func:`insight_key`, backed by an optional directory.
+
+    The in-memory LRU holds ``max_entries`` results; every result is also written
+    to ``directory`` as ``<key>.json`` so it survives restarts and is loaded back
+    into memory on first use. Entries older than ``ttl`` seconds are ignored and
+    deleted. A write that takes the directory past ``disk_max_entries`` files
+    prunes it: expired files first, then the oldest. A ``ttl`` of zero disables
+    the cache.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600.0,
+        max_entries: int = 256,
+        directory: Optional[str] = None,
+        disk_max_entries: int = 4096,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._settings: Optional[Tuple[Any, ...]] = None
+        self._disk_entries = 0
+        self._stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+        }
+        self.configure(ttl, max_entries, directory, disk_max_entries)
+
+    def configure(self, ttl: float, max_entries: int, directory: Optional[str], disk_max_entries: int = 4096) -> None:
+        """Apply cache settings; unchanged settings keep the cached entries."""
+
+        settings = (ttl, max_entries, directory, disk_max_entries)
+        with self._lock:
+            if settings == self._settings:
+                return
+            self._settings = settings
+            self._ttl = ttl
+            self._max_entries = max_entries
+            self._disk_max_entries = disk_max_entries
+            self._directory = Path(directory) if directory else None
+            self._entries.clear()
+        if self._directory is not None:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Delete expired files, then the oldest ones until at most ``disk_max_entries`` remain."""
+
+        cutoff = self._clock() - self._ttl
+        kept: List[Tuple[float, Path]] = []
+        for path in self._directory.glob("*.json"):  # type: ignore[union-attr]
+            with contextlib.suppress(OSError):
+                modified = path.stat().st_mtime
+                if modified < cutoff:
+                    path.unlink()
+                else:
+                    kept.append((modified, path))
+        kept.sort()
+        excess = max(0, len(kept) - max(0, self._disk_max_entries))
+        for _, path in kept[:excess]:
+            with contextlib.suppress(OSError):
+                path.unlink()
+        with self._lock:
+            self._disk_entries = len(kept) - excess
+            self._stats["disk_evictions"] += excess
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0
+
+    def _path(self, key: str) -> Optional[Path]:
+        return self._directory / f"{key}.json" if self._directory is not None else None
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            return float(entry["stored_at"]), entry["result"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            LOGGER.warning("Discarding unreadable insight cache entry %s", path)
+            with contextlib.suppress(OSError):
+                path.unlink()
+            return None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self._ttl:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._entries.pop(key, None)
+        entry = self._read_disk(key)
+        if entry is not None and now - entry[0] >= self._ttl:
+            with contextlib.suppress(OSError):
+                self._path(key).unlink()  # type: ignore[union-attr]
+            entry = None
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry[1]
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        entry = (self._clock(), result)
+        with self._lock:
+            self._stats["stores"] += 1
+            self._remember(key, entry)
+        path = self._path(key)
+        if path is None:
+            return
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            added = not path.exists()
+            tmp.write_text(json.dumps({"stored_at": entry[0], "result": result}, default=str), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            LOGGER.warning("Could not persist insight cache entry %s", path, exc_info=True)
+            return
+        with self._lock:
+            self._disk_entries += added
+            full = self._disk_entries > self._disk_max_entries
+        if full:
+            self._prune_disk()
+
+    def bypassed(self) -> None:
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def _remember(self, key: str, entry: Tuple[float, Dict[str, Any]]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "ttl": self._ttl,
+                "max_entries": self._max_entries,
+                "disk_entries": self._disk_entries if self._directory is not None else 0,
+                "disk_max_entries": self._disk_max_entries,
+                "directory": str(self._directory) if self._directory is not None else None,
+            }
+
+
+class InsightStream:
+    """Events for one streamed generation: ``token`` per chunk, then a single ``done``.
+
+    ``done`` carries the assembled response plus timing: time to first token, total
+    time and tokens per second (from Ollama's ``eval_count``/``eval_duration`` when
+    reported), all measured from ``started``: the moment the caller began waiting
+    for a generation slot. :meth:`close` is safe to call from another thread and
+    cancels the upstream generation.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        prompt: str,
+        chunks: GenerationStream,
+        on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+        clock: Callable[[], float] = time.perf_counter,
+        details: Optional[Dict[str, Any]] = None,
+        started: Optional[float] = None,
+    ):
+        self._model = model
+        self._prompt = prompt
+        self._details = details or {}
+        self._chunks = chunks
+        self._on_complete = on_complete
+        self._clock = clock
+        self._started = started if started is not None else clock()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        parts: List[str] = []
+        first_token: Optional[float] = None
+        final: Dict[str, Any] = {}
+        for chunk in self._chunks:
+            token = chunk.get("response") or ""
+            if token:
+                if first_token is None:
+                    first_token = self._clock()
+                parts.append(token)
+                yield {"event": "token", "data": {"token": token}}
+            if chunk.get("done"):
+                final = chunk
+                break
+        self.close()
+        finished = self._clock()
+        tokens = final.get("eval_count") or len(parts)
+        if final.get("eval_duration"):
+            tokens_per_sec = tokens / (final["eval_duration"] / 1e9)
+        elif first_token is not None and finished > first_token:
+            tokens_per_sec = tokens / (finished - first_token)
+        else:
+            tokens_per_sec = None
+        ttft_ms = round((first_token - self._started) * 1000, 1) if first_token is not None else None
+        result = {"model": self._model, "prompt": self._prompt, "response": "".join(parts), **self._details}
+        if final and self._on_complete is not None:
+            self._on_complete(result)
+        yield {
+            "event": "done",
+            "data": {
+                **result,
+                "cached": False,
+                "timing": {
+                    "time_to_first_token_ms": ttft_ms,
+                    "total_ms": round((finished - self._started) * 1000, 1),
+                    "tokens": tokens,
+                    "tokens_per_sec": round(tokens_per_sec, 2) if tokens_per_sec else None,
+                },
+            },
+        }
+
+    def close(self) -> None:
+        self._chunks.close()
+
+
+class CachedInsightStream:
+    """Replays a cached insight as a single ``token`` event followed by ``done``."""
+
+    def __init__(self, result: Dict[str, Any]):
+        self._result = result
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        yield {"event": "token", "data": {"token": self._result.get("response") or ""}}
+        yield {"event": "done", "data": {**self._result, "cached": True, "timing": None}}
+
+    def close(self) -> None:
+        pass
+
+
 class LLMAnalyzer:
-    def __init__(self, settings: OllamaSettings):
+    """Builds prompts and runs them through Ollama.
+
+    ``recorder``, when given, receives every freshly generated result together with
+    its inputs (``instance``, ``title``, ``metrics``); cached results are not
+    recorded again.
+    """
+
+    def __init__(
+        self,
+        settings: OllamaSettings,
+        client: Optional[OllamaClient] = None,
+        cache: Optional[InsightCache] = None,
+        recorder: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ):
         self._settings = settings
+        self._client = client or OllamaClient(settings)
+        self._cache = cache
+        self._recorder = recorder
+
+    def _build_prompt(
+        self, title: str, metrics: List[Dict[str, Any]], issues: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """The prompt text plus compaction statistics for the metrics table it embeds."""
 
-    def _build_prompt(self, title: str, metrics: List[Dict[str, Any]], issues: Optional[str] = None) -> str:
+        compacted = compact_metrics(metrics, self._settings.prompt_token_budget, self._settings.prompt_top_k)
         lines = [f"# {title}"]
         lines.append("Provide a concise summary with actionable remediation steps.")
         if issues:
             lines.append("Known issues or context: " + issues)
         lines.append("Metrics:")
-        for metric in metrics:
-            lines.append(f"- {metric}")
-        return "\n".join(lines)
+        lines.append(compacted.pop("table"))
+        return "\n".join(lines), compacted
 
-    def analyze(self, title: str, metrics: List[Dict[str, Any]], issues: Optional[str] = None) -> Dict[str, Any]:
-        prompt = self._build_prompt(title, metrics, issues)
-        payload = {
+    def _payload(self, prompt: str, stream: bool) -> Dict[str, Any]:
+        return {
             "model": self._settings.model,
             "prompt": prompt,
+            "stream": stream,
             "options": {
                 "temperature": self._settings.temperature,
                 "num_predict": self._settings.max_tokens,
             },
         }
+
+    def _cached(self, payload: Dict[str, Any], use_cache: bool) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Cache key for ``payload`` and the cached result, if any; a bypass still refreshes the entry."""
+
+        if self._cache is None or not self._cache.enabled:
+            return None, None
+        key = insight_key(payload)
+        if not use_cache:
+            self._cache.bypassed()
+            return key, None
+        return key, self._cache.get(key)
+
+    def _completion(self, key: Optional[str], inputs: Dict[str, Any]) -> Optional[Callable[[Dict[str, Any]], None]]:
+        """Callback storing a fresh result in the cache and handing it to the recorder."""
+
+        cache, recorder = self._cache, self._recorder
+        if (key is None or cache is None) and recorder is None:
+            return None
+
+        def complete(result: Dict[str, Any]) -> None:
+            if key is not None and cache is not None:
+                cache.put(key, result)
+            if recorder is not None:
+                try:
+                    recorder({**inputs, **result})
+                except Exception:
+                    LOGGER.exception("Failed to record insight")
+
+        return complete
+
+    def analyze(
+        self,
+        title: str,
+        metrics: List[Dict[str, Any]],
+        issues: Optional[str] = None,
+        use_cache: bool = True,
+        instance: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        prompt, compaction = self._build_prompt(title, metrics, issues)
+        payload = self._payload(prompt, stream=False)
+        key, cached = self._cached(payload, use_cache)
+        if cached is not None:
+            return {**cached, "cached": True}
         LOGGER.debug("Sending prompt to Ollama", extra={"payload": payload})
-        response = requests.post(f"{self._settings.host}/api/generate", json=payload, timeout=60)
-        response.raise_for_status()
-        data = response.json()
-        return {
+        data = self._client.generate(payload)
+        result = {
             "model": self._settings.model,
             "prompt": prompt,
             "response": data.get("response"),
+            "compaction": compaction,
         }
+        complete = self._completion(key, {"instance": instance, "title": title, "metrics": metrics})
+        if complete is not None:
+            complete(result)
+        return {**result, "cached": False}
+
+    def analyze_stream(
+        self,
+        title: str,
+        metrics: List[Dict[str, Any]],
+        issues: Optional[str] = None,
+        use_cache: bool = True,
+        instance: Optional[str] = None,
+    ) -> InsightStream | CachedInsightStream:
+        """Start a streamed generation.
+
+        Blocks while waiting for a generation slot (at most ``queue_timeout``) and
+        until Ollama returns the response headers, which includes any model load.
+        """
+
+        prompt, compaction = self._build_prompt(title, metrics, issues)
+        payload = self._payload(prompt, stream=True)
+        key, cached = self._cached(payload, use_cache)
+        if cached is not None:
+            return CachedInsightStream(cached)
+        LOGGER.debug("Streaming prompt to Ollama", extra={"payload": payload})
+        on_complete = self._completion(key, {"instance": instance, "title": title, "metrics": metrics})
+        started = time.perf_counter()
+        return InsightStream(
+            self._settings.model,
+            prompt,
+            self._client.generate_stream(payload),
+            on_complete,
+            details={"compaction": compaction},
+            started=started,
+        )
 
 
-__all__ = ["LLMAnalyzer"]
+__all__ = ["CachedInsightStream", "InsightCache", "InsightStream", "LLMAnalyzer", "insight_key"]
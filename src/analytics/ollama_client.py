@@ -0,0 +1,281 @@
+"""Shared, concurrency-limited HTTP client for the Ollama API."""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.common.config import OllamaSettings
+
+LOGGER = logging.getLogger(__name__)
+
+# Statuses worth retrying: Ollama answers 503 while a model is loading and 429 when overloaded.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Settings an OllamaClient is built from; changing any other field reuses the client.
+_CLIENT_FIELDS = (
+    "host",
+    "connect_timeout",
+    "request_timeout",
+    "max_concurrency",
+    "max_queue",
+    "queue_timeout",
+    "retries",
+    "retry_backoff",
+)
+
+
+class OllamaBusyError(RuntimeError):
+    """Raised without contacting Ollama when the generation queue is full or the wait times out."""
+
+
+class GenerationStream:
+    """Iterator over the JSON chunks of a streamed Ollama response.
+
+    Holds one of the client's generation slots until it is exhausted or closed.
+    :meth:`close` may be called from another thread while a read is in progress;
+    it drops the HTTP connection, which makes Ollama abandon the generation.
+    """
+
+    def __init__(self, response: Any, release: Callable[[], None]):
+        self._response = response
+        self._lines = response.iter_lines()
+        self._release = release
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __iter__(self) -> "GenerationStream":
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        try:
+            for line in self._lines:
+                if line:
+                    return json.loads(line)
+        except Exception:
+            self.close()
+            raise
+        self.close()
+        raise StopIteration
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self._response.close()
+        finally:
+            self._release()
+
+
+class OllamaClient:
+    """Keep-alive ``requests`` session gated by a generation semaphore.
+
+    At most ``max_concurrency`` generations run against Ollama at once. Up to
+    ``max_queue`` further callers wait, each for at most ``queue_timeout`` seconds;
+    anyone beyond that is rejected immediately with :class:`OllamaBusyError` so a
+    burst of requests fails fast instead of timing out together. Connection errors
+    and retryable statuses are retried ``retries`` times with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        settings: OllamaSettings,
+        session: Optional[requests.Session] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._settings = settings
+        self._sleep = sleep
+        self._session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, settings.max_concurrency))
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max(1, settings.max_concurrency))
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._active = 0
+        self._retired = False
+        self._stats = {"requests": 0, "rejected": 0, "queue_timeouts": 0, "retries": 0, "failures": 0}
+
+    @property
+    def settings(self) -> OllamaSettings:
+        return self._settings
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            self._wait_for_slot()
+        with self._lock:
+            self._active += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active -= 1
+            drained = self._retired and not self._active
+        self._slots.release()
+        if drained:
+            self._session.close()
+
+    def _wait_for_slot(self) -> None:
+        with self._lock:
+            if self._waiting >= self._settings.max_queue:
+                self._stats["rejected"] += 1
+                raise OllamaBusyError("Ollama generation queue is full")
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self._settings.queue_timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            with self._lock:
+                self._stats["queue_timeouts"] += 1
+            raise OllamaBusyError(f"Timed out after {self._settings.queue_timeout}s waiting for Ollama")
+
+    def post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST ``payload`` to ``path`` and return the decoded JSON body."""
+
+        self._acquire()
+        try:
+            with self._lock:
+                self._stats["requests"] += 1
+            return self._post_with_retries(path, payload).json()
+        finally:
+            self._release()
+
+    def stream(self, path: str, payload: Dict[str, Any]) -> GenerationStream:
+        """POST ``payload`` with ``stream: true`` and iterate the response chunks as they arrive.
+
+        Retries only apply until the response headers arrive; the generation slot is
+        held until the returned stream is exhausted or closed.
+        """
+
+        self._acquire()
+        try:
+            with self._lock:
+                self._stats["requests"] += 1
+            response = self._post_with_retries(path, {**payload, "stream": True}, stream=True)
+        except BaseException:
+            self._release()
+            raise
+        return GenerationStream(response, self._release)
+
+    def _post_with_retries(self, path: str, payload: Dict[str, Any], stream: bool = False) -> Any:
+        settings = self._settings
+        url = f"{settings.host.rstrip('/')}{path}"
+        attempt = 0
+        while True:
+            retryable = attempt < settings.retries
+            try:
+                response = self._session.post(
+                    url, json=payload, timeout=(settings.connect_timeout, settings.request_timeout), stream=stream
+                )
+                if retryable and response.status_code in RETRY_STATUSES:
+                    LOGGER.warning("Ollama returned %s; retrying", response.status_code)
+                    response.close()
+                else:
+                    response.raise_for_status()
+                    return response
+            except requests.ConnectionError:
+                if not retryable:
+                    with self._lock:
+                        self._stats["failures"] += 1
+                    raise
+                LOGGER.warning("Could not reach Ollama at %s; retrying", settings.host)
+            except Exception:
+                with self._lock:
+                    self._stats["failures"] += 1
+                raise
+            with self._lock:
+                self._stats["retries"] += 1
+            self._sleep(settings.retry_backoff * (2**attempt))
+            attempt += 1
+
+    def generate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self.post("/api/generate", payload)
+
+    def generate_stream(self, payload: Dict[str, Any]) -> GenerationStream:
+        return self.stream("/api/generate", payload)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self._settings.max_concurrency,
+                "max_queue": self._settings.max_queue,
+                "waiting": self._waiting,
+                "active": self._active,
+                **self._stats,
+            }
+
+    def retire(self) -> None:
+        """Close the session as soon as no generation holds a slot, which may be right away."""
+
+        with self._lock:
+            self._retired = True
+            drained = not self._active
+        if drained:
+            self._session.close()
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def client_settings_key(settings: OllamaSettings) -> Tuple[Any, ...]:
+    """The fields an :class:`OllamaClient` depends on; the model and cache settings are not among them."""
+
+    return tuple(getattr(settings, name) for name in _CLIENT_FIELDS)
+
+
+class OllamaClientRegistry:
+    """Hands out one shared :class:`OllamaClient`, rebuilt when its connection or concurrency settings change.
+
+    The replaced client is retired rather than closed, so generations still
+    running on it finish before its session is closed.
+    """
+
+    def __init__(self, factory: Callable[[OllamaSettings], OllamaClient] = OllamaClient):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple[Any, ...]] = None
+        self._client: Optional[OllamaClient] = None
+
+    def get(self, settings: OllamaSettings) -> OllamaClient:
+        key = client_settings_key(settings)
+        replaced: List[OllamaClient] = []
+        with self._lock:
+            if self._client is None or key != self._key:
+                if self._client is not None:
+                    replaced.append(self._client)
+                self._client = self._factory(settings)
+                self._key = key
+            client = self._client
+        for old in replaced:
+            old.retire()
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._client.stats() if self._client is not None else {}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+            self._key = None
+
+
+__all__ = [
+    "GenerationStream",
+    "OllamaBusyError",
+    "OllamaClient",
+    "OllamaClientRegistry",
+    "RETRY_STATUSES",
+    "client_settings_key",
+]
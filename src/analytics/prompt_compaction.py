@@ -0,0 +1,223 @@
+"""Token-budgeted compaction of metric rows for LLM prompts."""
+from __future__ import annotations
+
+import json
+import math
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+# Columns that rank rows by how much they matter, in order of preference. When none
+# is present the numeric column with the largest total is used.
+SEVERITY_FIELDS = (
+    "wait_ms_per_sec",
+    "wait_time_ms",
+    "total_wait_ms",
+    "wait_duration_ms",
+    "cpu_ms",
+    "duration_ms",
+    "logical_reads",
+    "blocked_sessions",
+    "executions",
+    "waiting_tasks",
+    "value",
+)
+# Gauges whose worst value across merged snapshots matters more than the newest.
+PEAK_FIELDS = frozenset({"blocked_sessions", "wait_duration_ms", "value"})
+# Point-in-time columns (plus any ``*_at``) left out of grouping and reported as the window. Durations such as
+# ``cpu_time`` or ``total_elapsed_time`` are measures, so the set is explicit rather than a ``*_time`` match.
+TIMESTAMP_FIELDS = frozenset(
+    {
+        "@timestamp",
+        "timestamp",
+        "collection_time",
+        "sqlserver_start_time",
+        "start_time",
+        "creation_time",
+        "last_execution_time",
+    }
+)
+CHARS_PER_TOKEN = 4
+MAX_CELL_CHARS = 60
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English and tabular text (about four characters per token)."""
+
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_identity(column: str) -> bool:
+    return column == "id" or column.endswith("_id")
+
+
+def _is_timestamp(column: str) -> bool:
+    return column in TIMESTAMP_FIELDS or column.endswith("_at")
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        text = f"{value:.6g}" if abs(value) < 1e15 else f"{value:.3e}"
+    elif isinstance(value, (dict, list, tuple)):
+        text = json.dumps(value, default=str, separators=(",", ":"), sort_keys=True)
+    else:
+        text = str(value)
+    text = text.replace("|", "/").replace("\n", " ")
+    return text if len(text) <= MAX_CELL_CHARS else text[: MAX_CELL_CHARS - 1] + "…"
+
+
+def _percentile(values: Sequence[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def _is_peak(column: str) -> bool:
+    return column in PEAK_FIELDS or column.endswith("_per_sec") or column.startswith(("avg_", "max_"))
+
+
+def _group(metrics: Sequence[Any]) -> Tuple[List[str], List[str], List[Dict[str, Any]], Tuple[Any, Any]]:
+    """Merge rows sharing every non-measure value and drop timestamps.
+
+    A merged measure keeps its value from the newest row that has one (by
+    timestamp, else input order), which is the current total of a cumulative
+    counter; rates and other gauges matched by :func:`_is_peak` keep their maximum
+    instead. Summing either would count the same activity once per snapshot. A
+    column is a measure when its non-null values are all numbers.
+    """
+
+    columns: Dict[str, Optional[bool]] = {}  # column -> numeric so far (None until a value is seen)
+    rows = [row if isinstance(row, Mapping) else {"value": row} for row in metrics]
+    stamps: List[str] = []
+    row_stamps: List[Optional[str]] = []
+    for row in rows:
+        row_stamp = None
+        for column, value in row.items():
+            if _is_timestamp(column):
+                if value is not None:
+                    stamps.append(str(value))
+                    row_stamp = max(row_stamp or "", str(value))
+                continue
+            numeric = columns.setdefault(column, None)
+            if value is None or numeric is False:
+                continue
+            # A column with mixed types is treated as an identifier rather than aggregated.
+            columns[column] = _is_number(value) and not _is_identity(column)
+        row_stamps.append(row_stamp)
+    keys = [column for column, numeric in columns.items() if not numeric]
+    measures = [column for column, numeric in columns.items() if numeric]
+    peaks = [column for column in measures if _is_peak(column)]
+    latest = [column for column in measures if not _is_peak(column)]
+
+    groups: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+    newest: Dict[Tuple[Tuple[str, ...], str], str] = {}
+    peaked: Set[Tuple[Tuple[str, ...], str]] = set()
+    for row, row_stamp in zip(rows, row_stamps):
+        identity = tuple(_cell(row.get(column)) for column in keys)
+        group = groups.get(identity)
+        if group is None:
+            group = groups[identity] = {column: row.get(column) for column in keys}
+            group.update((column, 0.0) for column in measures)
+            group["rows"] = 0
+        group["rows"] += 1
+        for column in peaks:
+            if row.get(column) is not None:
+                value = float(row[column])
+                group[column] = max(group[column], value) if (identity, column) in peaked else value
+                peaked.add((identity, column))
+        for column in latest:
+            if row.get(column) is not None and (row_stamp or "") >= newest.get((identity, column), ""):
+                newest[(identity, column)] = row_stamp or ""
+                group[column] = float(row[column])
+    window = (min(stamps), max(stamps)) if stamps else (None, None)
+    return keys, measures, list(groups.values()), window
+
+
+def _severity_column(measures: Sequence[str], groups: Sequence[Mapping[str, Any]]) -> Optional[str]:
+    for column in SEVERITY_FIELDS:
+        if column in measures:
+            return column
+    if not measures:
+        return None
+    return max(measures, key=lambda column: sum(abs(group[column]) for group in groups))
+
+
+def _render(
+    keys: Sequence[str],
+    measures: Sequence[str],
+    groups: Sequence[Mapping[str, Any]],
+    shown: int,
+    window: Tuple[Any, Any],
+) -> str:
+    columns = [*keys, *measures]
+    show_rows = any(group["rows"] > 1 for group in groups)
+    if show_rows:
+        columns.append("rows")
+    lines = []
+    if window[0] is not None:
+        lines.append(f"Window: {window[0]} .. {window[1]}")
+    lines.append("| " + " | ".join(columns) + " |")
+    for group in groups[:shown]:
+        lines.append("| " + " | ".join(_cell(group.get(column)) for column in columns) + " |")
+    tail = groups[shown:]
+    if tail:
+        stats = []
+        for column in measures:
+            values = [group[column] for group in tail]
+            stats.append(
+                f"{column} sum={_cell(sum(values))} p95={_cell(_percentile(values, 0.95))} max={_cell(max(values))}"
+            )
+        summary = f"Other {len(tail)} groups ({sum(group['rows'] for group in tail)} rows)"
+        lines.append(summary + (": " + "; ".join(stats) if stats else ""))
+    return "\n".join(lines)
+
+
+def compact_metrics(metrics: Sequence[Any], token_budget: int = 2000, top_k: int = 25) -> Dict[str, Any]:
+    """Render ``metrics`` as a compact table that fits ``token_budget`` estimated tokens.
+
+    Rows that agree on every non-measure column (wait type, session, database, ...)
+    are merged so repeated snapshots of the same entity collapse to one line that
+    carries their newest counters and peak gauges (see :func:`_group`). Groups are
+    ranked by a severity column (see :data:`SEVERITY_FIELDS`); at most ``top_k``
+    are listed and the rest are summarised by count, sum, p95 and max per measure.
+    Fewer groups are listed when the table would exceed the budget, so the prompt
+    size stays bounded however many rows are supplied.
+    """
+
+    raw_tokens = sum(estimate_tokens(f"- {metric}") for metric in metrics)
+    keys, measures, groups, window = _group(metrics)
+    severity = _severity_column(measures, groups)
+    if severity is not None:
+        groups.sort(key=lambda group: group[severity], reverse=True)
+
+    # The largest number of listed groups whose rendering fits the budget.
+    low, high = 0, min(top_k, len(groups))
+    table = _render(keys, measures, groups, high, window) if groups else "(none)"
+    if groups and estimate_tokens(table) > token_budget:
+        while low < high:
+            middle = (low + high + 1) // 2
+            if estimate_tokens(_render(keys, measures, groups, middle, window)) <= token_budget:
+                low = middle
+            else:
+                high = middle - 1
+        table = _render(keys, measures, groups, low, window)
+        if estimate_tokens(table) > token_budget:
+            table = table[: token_budget * CHARS_PER_TOKEN - 1] + "…"
+    shown = high
+    tokens = estimate_tokens(table)
+    return {
+        "table": table,
+        "rows": len(metrics),
+        "groups": len(groups),
+        "shown": shown,
+        "raw_tokens": raw_tokens,
+        "tokens": tokens,
+        "compression_ratio": round(raw_tokens / tokens, 2) if tokens else 1.0,
+        "severity": severity,
+    }
+
+
+__all__ = ["PEAK_FIELDS", "SEVERITY_FIELDS", "TIMESTAMP_FIELDS", "compact_metrics", "estimate_tokens"]
@@ -1,52 +1,200 @@
 """FastAPI application factory."""
 from __future__ import annotations
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator
 
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-from src.analytics.llm_analyzer import LLMAnalyzer
+from src.analytics.jobs import InsightJobQueue
+from src.analytics.llm_analyzer import InsightCache, LLMAnalyzer
+from src.analytics.ollama_client import OllamaClientRegistry
 from src.api.routes import analysis, config as config_routes, live_monitor, metrics
-from src.collector_bridge.elastic_client import ElasticTelemetryClient
-from src.collector_bridge.service import TelemetryService
-from src.common.config import AppConfig
+from src.collector_bridge.cache import TelemetryCache
+from src.collector_bridge.elastic_client import AsyncElasticTelemetryClient, ElasticClientRegistry
+from src.collector_bridge.insights import InsightWriter
+from src.collector_bridge.rollups import RollupStore, RollupWorker
+from src.collector_bridge.service import AsyncTelemetryService
+from src.common.config import AppConfig, SQLServerSettings
 from src.common.config_manager import ConfigManager
-from src.live_monitor.connection import SQLServerConnectionManager
+from src.live_monitor.broker import LiveBroker, dmv_fetcher, metrics_fetcher, section_fetcher
+from src.live_monitor.connection import ConnectionPoolRegistry, SQLServerConnectionManager
 from src.live_monitor.dmv_queries import DMVCollector
+from src.live_monitor.fleet import FleetCollector
+from src.live_monitor.query_stats import QueryStatsTracker
+from src.live_monitor.sampler import DMVSampler
+from src.live_monitor.wait_deltas import WaitDeltaEngine
 
 LOGGER = logging.getLogger(__name__)
 
 
 def create_app(config_path: str | None = None) -> FastAPI:
-    app = FastAPI(title="SQL Server Observability API", version="0.1.0")
     manager = ConfigManager(config_path)
+    elastic_clients = ElasticClientRegistry(AsyncElasticTelemetryClient)
+    initial = manager.get_config().elastic
+    telemetry_cache = TelemetryCache(ttl=initial.cache_ttl, max_entries=initial.cache_max_entries)
+    manager.subscribe(lambda cfg: telemetry_cache.configure(cfg.elastic.cache_ttl, cfg.elastic.cache_max_entries))
+    insight_writer = InsightWriter(lambda: manager.get_config().elastic, elastic_clients.get)
+    ollama_clients = OllamaClientRegistry()
+    ollama_settings = manager.get_config().ollama
+    insight_cache = InsightCache(
+        ollama_settings.cache_ttl,
+        ollama_settings.cache_max_entries,
+        ollama_settings.cache_dir,
+        ollama_settings.cache_disk_max_entries,
+    )
+    manager.subscribe(
+        lambda cfg: insight_cache.configure(
+            cfg.ollama.cache_ttl, cfg.ollama.cache_max_entries, cfg.ollama.cache_dir, cfg.ollama.cache_disk_max_entries
+        )
+    )
 
-    def get_config() -> AppConfig:
+    def build_analyzer() -> LLMAnalyzer:
+        settings = manager.get_config().ollama
+        return LLMAnalyzer(
+            settings, client=ollama_clients.get(settings), cache=insight_cache, recorder=insight_writer.record
+        )
+
+    insight_jobs = InsightJobQueue(lambda: manager.get_config().ollama, build_analyzer)
+    sql_pools = ConnectionPoolRegistry()
+    sql_pools.configure(manager.get_config().sqlserver)
+    manager.subscribe(lambda cfg: sql_pools.configure(cfg.sqlserver))
+    wait_deltas = WaitDeltaEngine()
+    query_stats = QueryStatsTracker()
+
+    def pooled_collector(settings: SQLServerSettings) -> DMVCollector:
+        return DMVCollector(SQLServerConnectionManager(settings, pools=sql_pools))
+
+    dmv_sampler = DMVSampler(lambda: manager.get_config().sqlserver, pooled_collector, wait_deltas, query_stats)
+    manager.subscribe(lambda cfg: dmv_sampler.configure(cfg.sqlserver))
+    live_broker = LiveBroker(
+        lambda: manager.get_config().sqlserver,
+        section_fetcher(
+            dmv_fetcher(dmv_sampler, pooled_collector),
+            metrics_fetcher(
+                lambda: AsyncTelemetryService(elastic_clients.get(manager.get_config().elastic), cache=telemetry_cache),
+                lambda: manager.get_config().sqlserver,
+            ),
+        ),
+    )
+    fleet_collector = FleetCollector(pooled_collector, max_workers=manager.get_config().sqlserver.fleet_workers)
+    manager.subscribe(lambda cfg: fleet_collector.configure(cfg.sqlserver.fleet_workers))
+    rollup_store = RollupStore()
+    rollup_worker = RollupWorker(rollup_store, lambda: manager.get_config().elastic, elastic_clients.get)
+
+    async def evict_idle_connections() -> None:
+        while True:
+            await asyncio.sleep(60)
+            await asyncio.to_thread(sql_pools.evict_idle)
+            elastic_clients.reap()
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        rollup_worker.start()
+        dmv_sampler.start()
+        insight_jobs.start()
+        insight_writer.start()
+        evictor = asyncio.create_task(evict_idle_connections(), name="connection-evictor")
+        try:
+            yield
+        finally:
+            evictor.cancel()
+            await asyncio.gather(evictor, return_exceptions=True)
+            await rollup_worker.stop()
+            await live_broker.close()
+            await dmv_sampler.stop()
+            await insight_jobs.stop()
+            await insight_writer.stop()
+            fleet_collector.close()
+            sql_pools.close()
+            ollama_clients.close()
+            LOGGER.info("Closing pooled Elastic clients")
+            await elastic_clients.aclose()
+
+    app = FastAPI(title="SQL Server Observability API", version="0.1.0", lifespan=lifespan)
+
+    async def get_config() -> AppConfig:
         cfg = manager.get_config()
         LOGGER.debug("Configuration retrieved for request")
         return cfg
 
-    def get_telemetry_service(cfg: AppConfig = Depends(get_config)) -> TelemetryService:
-        client = ElasticTelemetryClient(cfg.elastic)
-        return TelemetryService(client)
+    async def get_telemetry_service(cfg: AppConfig = Depends(get_config)) -> AsyncTelemetryService:
+        return AsyncTelemetryService(elastic_clients.get(cfg.elastic), cache=telemetry_cache)
+
+    def get_client_registry() -> ElasticClientRegistry:
+        return elastic_clients
+
+    def get_telemetry_cache() -> TelemetryCache:
+        return telemetry_cache
+
+    def get_rollup_store() -> RollupStore:
+        return rollup_store
+
+    def get_llm_analyzer() -> LLMAnalyzer:
+        return build_analyzer()
+
+    def get_ollama_clients() -> OllamaClientRegistry:
+        return ollama_clients
+
+    def get_insight_cache() -> InsightCache:
+        return insight_cache
 
-    def get_llm_analyzer(cfg: AppConfig = Depends(get_config)) -> LLMAnalyzer:
-        return LLMAnalyzer(cfg.ollama)
+    def get_job_queue() -> InsightJobQueue:
+        return insight_jobs
+
+    def get_insight_writer() -> InsightWriter:
+        return insight_writer
 
     def get_dmv_collector(cfg: AppConfig = Depends(get_config)) -> DMVCollector:
-        manager_conn = SQLServerConnectionManager(cfg.sqlserver)
-        return DMVCollector(manager_conn)
+        return pooled_collector(cfg.sqlserver)
+
+    def get_connection_pools() -> ConnectionPoolRegistry:
+        return sql_pools
+
+    def get_wait_delta_engine() -> WaitDeltaEngine:
+        return wait_deltas
+
+    def get_dmv_sampler() -> DMVSampler:
+        return dmv_sampler
+
+    def get_query_stats_tracker() -> QueryStatsTracker:
+        return query_stats
+
+    def get_fleet_collector() -> FleetCollector:
+        return fleet_collector
+
+    def get_live_broker() -> LiveBroker:
+        return live_broker
+
+    async def get_sql_settings(cfg: AppConfig = Depends(get_config)) -> SQLServerSettings:
+        return cfg.sqlserver
 
     def get_manager() -> ConfigManager:
         return manager
 
     app.dependency_overrides[analysis.get_llm_analyzer] = get_llm_analyzer
+    app.dependency_overrides[analysis.get_ollama_clients] = get_ollama_clients
+    app.dependency_overrides[analysis.get_insight_cache] = get_insight_cache
+    app.dependency_overrides[analysis.get_job_queue] = get_job_queue
+    app.dependency_overrides[analysis.get_insight_writer] = get_insight_writer
     app.dependency_overrides[metrics.get_telemetry_service] = get_telemetry_service
+    app.dependency_overrides[metrics.get_client_registry] = get_client_registry
+    app.dependency_overrides[metrics.get_telemetry_cache] = get_telemetry_cache
+    app.dependency_overrides[metrics.get_rollup_store] = get_rollup_store
     app.dependency_overrides[live_monitor.get_dmv_collector] = get_dmv_collector
+    app.dependency_overrides[live_monitor.get_connection_pools] = get_connection_pools
+    app.dependency_overrides[live_monitor.get_wait_delta_engine] = get_wait_delta_engine
+    app.dependency_overrides[live_monitor.get_dmv_sampler] = get_dmv_sampler
+    app.dependency_overrides[live_monitor.get_fleet_collector] = get_fleet_collector
+    app.dependency_overrides[live_monitor.get_query_stats_tracker] = get_query_stats_tracker
+    app.dependency_overrides[live_monitor.get_live_broker] = get_live_broker
+    app.dependency_overrides[live_monitor.get_sql_settings] = get_sql_settings
     app.dependency_overrides[config_routes.get_config_manager] = get_manager
 
     app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
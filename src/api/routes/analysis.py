@@ -1,11 +1,17 @@
 """Analysis endpoints using the LLM."""
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from src.analytics.llm_analyzer import LLMAnalyzer
+from src.analytics.jobs import InsightJobQueue, JobQueueFullError
+from src.analytics.llm_analyzer import CachedInsightStream, InsightCache, InsightStream, LLMAnalyzer
+from src.analytics.ollama_client import OllamaBusyError, OllamaClientRegistry
+from src.collector_bridge.insights import InsightWriter
 
 router = APIRouter()
 
@@ -14,9 +20,166 @@ def get_llm_analyzer() -> LLMAnalyzer:  # pragma: no cover - overridden in app f
     raise RuntimeError("Dependency override not configured")
 
 
+def get_ollama_clients() -> OllamaClientRegistry:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_insight_cache() -> InsightCache:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_job_queue() -> InsightJobQueue:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_insight_writer() -> InsightWriter:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
 @router.post("/insights")
-def generate_insights(payload: dict, analyzer: LLMAnalyzer = Depends(get_llm_analyzer)) -> dict:
+def generate_insights(
+    payload: dict,
+    cache: bool = Query(default=True, description="Set to false to bypass and refresh the cached insight"),
+    analyzer: LLMAnalyzer = Depends(get_llm_analyzer),
+) -> dict:
+    title = payload.get("title", "SQL Server Health Report")
+    metrics: List[dict] = payload.get("metrics", [])
+    issues = payload.get("issues")
+    try:
+        return analyzer.analyze(
+            title=title, metrics=metrics, issues=issues, use_cache=cache, instance=payload.get("instance")
+        )
+    except OllamaBusyError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"}) from exc
+
+
+def _sse(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8")
+
+
+async def _relay(stream: InsightStream | CachedInsightStream) -> AsyncIterator[bytes]:
+    """Forward generation events as SSE; closing the stream on exit cancels the generation upstream."""
+
+    events = iter(stream)
+    try:
+        while True:
+            event = await asyncio.to_thread(next, events, None)
+            if event is None:
+                break
+            yield _sse(event["event"], event["data"])
+    except Exception as exc:
+        yield _sse("error", {"detail": str(exc) or type(exc).__name__})
+    finally:
+        stream.close()
+
+
+@router.post("/insights/stream")
+async def stream_insights(
+    payload: dict,
+    cache: bool = Query(default=True, description="Set to false to bypass and refresh the cached insight"),
+    analyzer: LLMAnalyzer = Depends(get_llm_analyzer),
+) -> StreamingResponse:
     title = payload.get("title", "SQL Server Health Report")
     metrics: List[dict] = payload.get("metrics", [])
     issues = payload.get("issues")
-    return analyzer.analyze(title=title, metrics=metrics, issues=issues)
+    try:
+        stream = await asyncio.to_thread(
+            analyzer.analyze_stream, title, metrics, issues, cache, payload.get("instance")
+        )
+    except OllamaBusyError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"}) from exc
+    return StreamingResponse(
+        _relay(stream),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/client")
+def client_stats(clients: OllamaClientRegistry = Depends(get_ollama_clients)) -> dict:
+    return clients.stats()
+
+
+@router.get("/cache")
+def cache_stats(cache: InsightCache = Depends(get_insight_cache)) -> dict:
+    return cache.stats()
+
+
+def _job_request(payload: dict, cache: bool) -> Dict[str, Any]:
+    return {
+        "title": payload.get("title", "SQL Server Health Report"),
+        "metrics": payload.get("metrics", []),
+        "issues": payload.get("issues"),
+        "instance": payload.get("instance"),
+        "use_cache": cache,
+    }
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(
+    payload: dict,
+    priority: int = Query(default=0, description="Higher priorities run first"),
+    cache: bool = Query(default=True, description="Set to false to bypass and refresh the cached insight"),
+    jobs: InsightJobQueue = Depends(get_job_queue),
+) -> dict:
+    try:
+        return jobs.submit(_job_request(payload, cache), priority)
+    except JobQueueFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "30"}) from exc
+
+
+@router.post("/jobs/batch", status_code=202)
+async def submit_jobs(
+    payload: dict,
+    priority: int = Query(default=0, description="Higher priorities run first"),
+    cache: bool = Query(default=True, description="Set to false to bypass and refresh the cached insight"),
+    jobs: InsightJobQueue = Depends(get_job_queue),
+) -> dict:
+    """Queue several analyses at once, e.g. one per instance; ``payload`` is ``{"jobs": [...]}``."""
+
+    requests = [_job_request(item, cache) for item in payload.get("jobs", [])]
+    if not requests:
+        raise HTTPException(status_code=400, detail="No jobs supplied")
+    try:
+        return {"jobs": jobs.submit_many(requests, priority)}
+    except JobQueueFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "30"}) from exc
+
+
+@router.get("/jobs")
+async def job_stats(jobs: InsightJobQueue = Depends(get_job_queue)) -> dict:
+    return jobs.stats()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, jobs: InsightJobQueue = Depends(get_job_queue)) -> dict:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job '{job_id}'")
+    return job
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, jobs: InsightJobQueue = Depends(get_job_queue)) -> dict:
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job '{job_id}'")
+    return job
+
+
+@router.get("/history")
+async def insight_history(
+    instance: str | None = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    writer: InsightWriter = Depends(get_insight_writer),
+) -> dict:
+    """Previously generated insights from the ``llm_insights`` index, newest first."""
+
+    return {"insights": await writer.search(instance=instance, start=start, end=end, limit=limit)}
+
+
+@router.get("/history/writer")
+def insight_writer_stats(writer: InsightWriter = Depends(get_insight_writer)) -> dict:
+    return writer.stats()
@@ -1,7 +1,7 @@
 """API routes for managing application configuration."""
 from __future__ import annotations
 
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel, Field
@@ -25,6 +25,22 @@ class ElasticConfigModel(BaseModel):
     ca_cert: Optional[str] = Field(default=None, alias="caCert")
     insecure: Optional[bool] = None
     request_timeout: Optional[int] = Field(default=None, alias="requestTimeout")
+    connections_per_node: Optional[int] = Field(default=None, alias="connectionsPerNode")
+    http_compress: Optional[bool] = Field(default=None, alias="httpCompress")
+    keep_alive: Optional[bool] = Field(default=None, alias="keepAlive")
+    sniff_on_start: Optional[bool] = Field(default=None, alias="sniffOnStart")
+    sniff_on_node_failure: Optional[bool] = Field(default=None, alias="sniffOnNodeFailure")
+    sniff_interval: Optional[float] = Field(default=None, alias="sniffInterval")
+    cache_ttl: Optional[float] = Field(default=None, alias="cacheTtl")
+    cache_max_entries: Optional[int] = Field(default=None, alias="cacheMaxEntries")
+    rollup_interval: Optional[float] = Field(default=None, alias="rollupInterval")
+    rollup_instances: Optional[int] = Field(default=None, alias="rollupInstances")
+    rollup_ingest_lag: Optional[float] = Field(default=None, alias="rollupIngestLag")
+    insights_index: Optional[str] = Field(default=None, alias="insightsIndex")
+    insights_batch_size: Optional[int] = Field(default=None, alias="insightsBatchSize")
+    insights_flush_interval: Optional[float] = Field(default=None, alias="insightsFlushInterval")
+    insights_buffer_size: Optional[int] = Field(default=None, alias="insightsBufferSize")
+    insights_retries: Optional[int] = Field(default=None, alias="insightsRetries")
 
     class Config:
         populate_by_name = True
@@ -35,6 +51,36 @@ class OllamaConfigModel(BaseModel):
     model: Optional[str] = None
     temperature: Optional[float] = None
     max_tokens: Optional[int] = Field(default=None, alias="maxTokens")
+    connect_timeout: Optional[float] = Field(default=None, alias="connectTimeout")
+    request_timeout: Optional[float] = Field(default=None, alias="requestTimeout")
+    max_concurrency: Optional[int] = Field(default=None, alias="maxConcurrency")
+    max_queue: Optional[int] = Field(default=None, alias="maxQueue")
+    queue_timeout: Optional[float] = Field(default=None, alias="queueTimeout")
+    retries: Optional[int] = None
+    retry_backoff: Optional[float] = Field(default=None, alias="retryBackoff")
+    cache_ttl: Optional[float] = Field(default=None, alias="cacheTtl")
+    cache_max_entries: Optional[int] = Field(default=None, alias="cacheMaxEntries")
+    cache_dir: Optional[str] = Field(default=None, alias="cacheDir")
+    cache_disk_max_entries: Optional[int] = Field(default=None, alias="cacheDiskMaxEntries")
+    prompt_token_budget: Optional[int] = Field(default=None, alias="promptTokenBudget")
+    prompt_top_k: Optional[int] = Field(default=None, alias="promptTopK")
+    job_workers: Optional[int] = Field(default=None, alias="jobWorkers")
+    job_max_pending: Optional[int] = Field(default=None, alias="jobMaxPending")
+    job_retention: Optional[float] = Field(default=None, alias="jobRetention")
+
+    class Config:
+        populate_by_name = True
+
+
+class SQLTargetModel(BaseModel):
+    name: str
+    server: Optional[str] = None
+    dsn: Optional[str] = None
+    database: Optional[str] = None
+    username: Optional[str] = None
+    password: Optional[str] = None
+    login_timeout: Optional[int] = Field(default=None, alias="loginTimeout")
+    query_timeout: Optional[int] = Field(default=None, alias="queryTimeout")
 
     class Config:
         populate_by_name = True
@@ -48,6 +94,18 @@ class SQLConfigModel(BaseModel):
     database: Optional[str] = None
     encrypt: Optional[bool] = None
     trust_server_certificate: Optional[bool] = Field(default=None, alias="trustServerCertificate")
+    login_timeout: Optional[int] = Field(default=None, alias="loginTimeout")
+    query_timeout: Optional[int] = Field(default=None, alias="queryTimeout")
+    pool_size: Optional[int] = Field(default=None, alias="poolSize")
+    pool_timeout: Optional[float] = Field(default=None, alias="poolTimeout")
+    pool_idle_timeout: Optional[float] = Field(default=None, alias="poolIdleTimeout")
+    pool_max_lifetime: Optional[float] = Field(default=None, alias="poolMaxLifetime")
+    sample_interval: Optional[float] = Field(default=None, alias="sampleInterval")
+    sample_history: Optional[int] = Field(default=None, alias="sampleHistory")
+    sample_limit: Optional[int] = Field(default=None, alias="sampleLimit")
+    fleet_workers: Optional[int] = Field(default=None, alias="fleetWorkers")
+    subscriber_buffer: Optional[int] = Field(default=None, alias="subscriberBuffer")
+    targets: Optional[List[SQLTargetModel]] = None
 
     class Config:
         populate_by_name = True
@@ -80,10 +138,52 @@ def update_config(payload: ConfigUpdateModel, manager: ConfigManager = Depends(g
             "logsIndex": "logs_index",
             "caCert": "ca_cert",
             "requestTimeout": "request_timeout",
+            "connectionsPerNode": "connections_per_node",
+            "httpCompress": "http_compress",
+            "keepAlive": "keep_alive",
+            "sniffOnStart": "sniff_on_start",
+            "sniffOnNodeFailure": "sniff_on_node_failure",
+            "sniffInterval": "sniff_interval",
+            "cacheTtl": "cache_ttl",
+            "cacheMaxEntries": "cache_max_entries",
+            "rollupInterval": "rollup_interval",
+            "rollupInstances": "rollup_instances",
+            "rollupIngestLag": "rollup_ingest_lag",
+            "insightsIndex": "insights_index",
+            "insightsBatchSize": "insights_batch_size",
+            "insightsFlushInterval": "insights_flush_interval",
+            "insightsBufferSize": "insights_buffer_size",
+            "insightsRetries": "insights_retries",
             "maxTokens": "max_tokens",
+            "connectTimeout": "connect_timeout",
+            "maxConcurrency": "max_concurrency",
+            "maxQueue": "max_queue",
+            "queueTimeout": "queue_timeout",
+            "retryBackoff": "retry_backoff",
+            "cacheDir": "cache_dir",
+            "cacheDiskMaxEntries": "cache_disk_max_entries",
+            "promptTokenBudget": "prompt_token_budget",
+            "promptTopK": "prompt_top_k",
+            "jobWorkers": "job_workers",
+            "jobMaxPending": "job_max_pending",
+            "jobRetention": "job_retention",
             "trustServerCertificate": "trust_server_certificate",
+            "loginTimeout": "login_timeout",
+            "queryTimeout": "query_timeout",
+            "poolSize": "pool_size",
+            "poolTimeout": "pool_timeout",
+            "poolIdleTimeout": "pool_idle_timeout",
+            "poolMaxLifetime": "pool_max_lifetime",
+            "sampleInterval": "sample_interval",
+            "sampleHistory": "sample_history",
+            "sampleLimit": "sample_limit",
+            "fleetWorkers": "fleet_workers",
+            "subscriberBuffer": "subscriber_buffer",
+        }
+        return {
+            mapping.get(k, k): [_normalise(section, item) for item in v] if k == "targets" and v else v
+            for k, v in values.items()
         }
-        return {mapping.get(k, k): v for k, v in values.items()}
 
     updates = {}
     if "elastic" in data:
@@ -1,29 +1,253 @@
 """Live SQL Server monitoring endpoints."""
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from src.live_monitor.dmv_queries import DMVCollector
+from src.analytics.blocking import analyze_blocking
+from src.common.config import SQLServerSettings
+from src.live_monitor.broker import METRIC_SECTIONS, ROW_KEYS, LiveBroker, Subscription
+from src.live_monitor.connection import ConnectionPoolRegistry
+from src.live_monitor.dmv_queries import SNAPSHOT_QUERIES, DMVCollector
+from src.live_monitor.fleet import OPERATIONS, FleetCollector, resolve_targets
+from src.live_monitor.query_stats import ORDER_BY, QueryStatsTracker
+from src.live_monitor.sampler import SECTIONS, DMVSampler
+from src.live_monitor.wait_deltas import WaitDeltaEngine
 
 router = APIRouter()
 
+# Seconds between SSE comments sent on quiet subscriptions so proxies keep the connection open.
+KEEPALIVE_SECONDS = 15.0
+
 
 def get_dmv_collector() -> DMVCollector:  # pragma: no cover - overridden in app factory
     raise RuntimeError("Dependency override not configured")
 
 
+def get_connection_pools() -> ConnectionPoolRegistry:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_wait_delta_engine() -> WaitDeltaEngine:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_dmv_sampler() -> DMVSampler:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_fleet_collector() -> FleetCollector:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_sql_settings() -> SQLServerSettings:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_query_stats_tracker() -> QueryStatsTracker:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_live_broker() -> LiveBroker:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def _buffered(sampler: DMVSampler, section: str, limit: int) -> Optional[List[dict]]:
+    """Latest sampled rows for ``section``, or ``None`` when the caller must query SQL Server."""
+
+    ring = sampler.fresh_ring()
+    rows = ring.latest(section) if ring is not None else None
+    if rows is None or (len(rows) < limit and len(rows) == sampler.settings.sample_limit):
+        return None
+    return rows[:limit]
+
+
 @router.get("/waits")
-def waits(limit: int = Query(default=25, ge=1, le=500), collector: DMVCollector = Depends(get_dmv_collector)) -> List[dict]:
-    return collector.wait_stats(limit=limit)
+def waits(
+    limit: int = Query(default=25, ge=1, le=500),
+    sampler: DMVSampler = Depends(get_dmv_sampler),
+    collector: DMVCollector = Depends(get_dmv_collector),
+) -> List[dict]:
+    buffered = _buffered(sampler, "waits", limit)
+    return buffered if buffered is not None else collector.wait_stats(limit=limit)
+
+
+@router.get("/waits/delta")
+def wait_deltas(
+    top: int = Query(default=10, ge=1, le=200),
+    sampler: DMVSampler = Depends(get_dmv_sampler),
+    collector: DMVCollector = Depends(get_dmv_collector),
+    engine: WaitDeltaEngine = Depends(get_wait_delta_engine),
+) -> dict:
+    if sampler.fresh_ring() is not None:
+        latest = engine.latest(sampler.instance, top=top)
+        if latest:
+            return latest[0]
+    return collector.wait_deltas(engine, top=top)
 
 
 @router.get("/blocking")
-def blocking(limit: int = Query(default=25, ge=1, le=500), collector: DMVCollector = Depends(get_dmv_collector)) -> List[dict]:
-    return collector.blocking(limit=limit)
+def blocking(
+    limit: int = Query(default=25, ge=1, le=500),
+    sampler: DMVSampler = Depends(get_dmv_sampler),
+    collector: DMVCollector = Depends(get_dmv_collector),
+) -> List[dict]:
+    buffered = _buffered(sampler, "blocking", limit)
+    return buffered if buffered is not None else collector.blocking(limit=limit)
+
+
+@router.get("/blocking/chains")
+def blocking_chains(
+    limit: int = Query(default=500, ge=1, le=5000),
+    sampler: DMVSampler = Depends(get_dmv_sampler),
+    collector: DMVCollector = Depends(get_dmv_collector),
+) -> dict:
+    buffered = _buffered(sampler, "blocking", limit)
+    return analyze_blocking(buffered if buffered is not None else collector.blocking(limit=limit))
 
 
 @router.get("/sessions")
-def sessions(limit: int = Query(default=50, ge=1, le=500), collector: DMVCollector = Depends(get_dmv_collector)) -> List[dict]:
-    return collector.active_sessions(limit=limit)
+def sessions(
+    limit: int = Query(default=50, ge=1, le=500),
+    sampler: DMVSampler = Depends(get_dmv_sampler),
+    collector: DMVCollector = Depends(get_dmv_collector),
+) -> List[dict]:
+    buffered = _buffered(sampler, "sessions", limit)
+    return buffered if buffered is not None else collector.active_sessions(limit=limit)
+
+
+@router.get("/queries/top")
+def top_queries(
+    top: int = Query(default=10, ge=1, le=200),
+    order_by: str = Query(default="cpu", pattern="^(" + "|".join(ORDER_BY) + ")$"),
+    sampler: DMVSampler = Depends(get_dmv_sampler),
+    collector: DMVCollector = Depends(get_dmv_collector),
+    tracker: QueryStatsTracker = Depends(get_query_stats_tracker),
+) -> dict:
+    # The sampler feeds the same tracker every interval; sampling here too would shorten its interval.
+    if sampler.running:
+        return collector.ranked_queries(tracker, sampler.instance, top=top, order_by=order_by)
+    return collector.top_queries(tracker, top=top, order_by=order_by)
+
+
+@router.get("/stream/{section}")
+def stream(
+    section: str,
+    limit: int = Query(default=10000, ge=1, le=1000000),
+    batch_size: int = Query(default=500, ge=1, le=10000),
+    collector: DMVCollector = Depends(get_dmv_collector),
+) -> StreamingResponse:
+    if section not in SNAPSHOT_QUERIES:
+        raise HTTPException(status_code=404, detail=f"Unknown section '{section}'")
+    chunks = collector.stream(section, limit, batch_size=batch_size)
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
+
+
+@router.get("/history/{section}")
+def history(
+    section: str,
+    samples: int = Query(default=20, ge=1, le=10000),
+    sampler: DMVSampler = Depends(get_dmv_sampler),
+) -> List[dict]:
+    if section not in SECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown section '{section}'")
+    ring = sampler.ring()
+    return ring.history(section, samples) if ring is not None else []
+
+
+@router.get("/series")
+def series(samples: int = Query(default=240, ge=1, le=10000), sampler: DMVSampler = Depends(get_dmv_sampler)) -> dict:
+    ring = sampler.ring()
+    return ring.series(samples) if ring is not None else {}
+
+
+@router.get("/snapshot")
+def snapshot(
+    limit: int = Query(default=25, ge=1, le=500),
+    sections: List[str] | None = Query(default=None),
+    collector: DMVCollector = Depends(get_dmv_collector),
+) -> dict:
+    unknown = [name for name in sections or [] if name not in SNAPSHOT_QUERIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown snapshot sections: {', '.join(unknown)}")
+    return collector.snapshot(limit=limit, sections=sections)
+
+
+@router.get("/fleet/{operation}")
+async def fleet(
+    operation: str,
+    limit: int = Query(default=25, ge=1, le=500),
+    targets: List[str] | None = Query(default=None),
+    settings: SQLServerSettings = Depends(get_sql_settings),
+    collector: FleetCollector = Depends(get_fleet_collector),
+) -> dict:
+    if operation not in OPERATIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown fleet operation '{operation}'")
+    try:
+        return await collector.sweep(settings, operation, limit=limit, targets=targets)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.get("/pool")
+def pool_stats(pools: ConnectionPoolRegistry = Depends(get_connection_pools)) -> List[dict]:
+    return pools.stats()
+
+
+def _sse(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8")
+
+
+async def _push(broker: LiveBroker, subscription: Subscription) -> AsyncIterator[bytes]:
+    try:
+        while True:
+            try:
+                message = await subscription.get(timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if message is None:
+                yield _sse("dropped", {"detail": "Subscriber fell behind; reconnect to resume"})
+                return
+            yield _sse(message["type"], message)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@router.get("/subscribe/{section:path}")
+async def subscribe(
+    section: str,
+    instance: str | None = Query(default=None),
+    settings: SQLServerSettings = Depends(get_sql_settings),
+    sampler: DMVSampler = Depends(get_dmv_sampler),
+    broker: LiveBroker = Depends(get_live_broker),
+) -> StreamingResponse:
+    """Server-Sent Events for one ``section`` of one instance: a snapshot, then row deltas per interval.
+
+    ``metrics/wait-stats`` and ``metrics/blocking`` push the matching Elastic
+    telemetry, for every instance when none is given.
+    """
+
+    if section not in ROW_KEYS:
+        raise HTTPException(status_code=404, detail=f"Unknown section '{section}'")
+    if section in METRIC_SECTIONS:
+        instance = instance or ""
+    else:
+        instance = instance or sampler.instance
+        if instance not in resolve_targets(settings):
+            raise HTTPException(status_code=404, detail=f"Unknown instance '{instance}'")
+    subscription = broker.subscribe(section, instance)
+    return StreamingResponse(
+        _push(broker, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/subscriptions")
+async def subscriptions(broker: LiveBroker = Depends(get_live_broker)) -> dict:
+    return broker.stats()
@@ -1,41 +1,222 @@
 """Telemetry endpoints."""
 from __future__ import annotations
 
-from typing import List
+from typing import Any, AsyncIterator, List, Literal
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
-from src.collector_bridge.service import TelemetryService
+from src.analytics.blocking import analyze_blocking, latest_snapshot
+from src.collector_bridge import normalizers
+from src.collector_bridge.cache import TelemetryCache
+from src.collector_bridge.elastic_client import ElasticClientRegistry, PointInTimeExpiredError
+from src.collector_bridge.export import decode_cursor
+from src.collector_bridge.rollups import RESOLUTIONS, RollupStore
+from src.collector_bridge.service import AsyncTelemetryService
 
 router = APIRouter()
 
+DURATION_PATTERN = r"^\d+[smhd]$"
+RESOLUTION_PATTERN = "^(" + "|".join(RESOLUTIONS) + ")$"
+# Response header naming where a summary came from: ``rollup`` buffers or an ``elastic`` query.
+SOURCE_HEADER = "X-Telemetry-Source"
 
-def get_telemetry_service() -> TelemetryService:  # pragma: no cover - overridden in app factory
+
+def get_telemetry_service() -> AsyncTelemetryService:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_client_registry() -> ElasticClientRegistry:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_telemetry_cache() -> TelemetryCache:  # pragma: no cover - overridden in app factory
+    raise RuntimeError("Dependency override not configured")
+
+
+def get_rollup_store() -> RollupStore:  # pragma: no cover - overridden in app factory
     raise RuntimeError("Dependency override not configured")
 
 
 @router.get("/wait-stats")
-def wait_stats(
+async def wait_stats(
     instance: str | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=500),
-    service: TelemetryService = Depends(get_telemetry_service),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    service: AsyncTelemetryService = Depends(get_telemetry_service),
 ) -> List[dict]:
-    return service.latest_waits(instance=instance, limit=limit)
+    return await service.latest_waits(instance=instance, limit=limit, start=start, end=end)
 
 
 @router.get("/blocking")
-def blocking(
+async def blocking(
     instance: str | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=500),
-    service: TelemetryService = Depends(get_telemetry_service),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    service: AsyncTelemetryService = Depends(get_telemetry_service),
 ) -> List[dict]:
-    return service.blocking_sessions(instance=instance, limit=limit)
+    return await service.blocking_sessions(instance=instance, limit=limit, start=start, end=end)
+
+
+@router.get("/blocking/chains")
+async def blocking_chains(
+    instance: str = Query(...),
+    limit: int = Query(default=1000, ge=1, le=10000),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    service: AsyncTelemetryService = Depends(get_telemetry_service),
+) -> dict:
+    rows = await service.blocking_sessions(instance=instance, limit=limit, start=start, end=end)
+    return analyze_blocking(latest_snapshot(rows))
+
+
+@router.get("/wait-stats/top")
+async def top_wait_stats(
+    response: Response,
+    instance: str | None = Query(default=None),
+    window: str = Query(default="15m", pattern=DURATION_PATTERN),
+    top: int = Query(default=10, ge=1, le=100),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    service: AsyncTelemetryService = Depends(get_telemetry_service),
+    store: RollupStore = Depends(get_rollup_store),
+) -> dict:
+    rows = store.top_waits(instance, window, top) if start is None and end is None else None
+    if rows is not None:
+        return _summary(response, store, rows)
+    rows = await service.top_waits(instance=instance, window=window, top=top, start=start, end=end)
+    return _summary(response, None, rows)
+
+
+@router.get("/blocking/histogram")
+async def blocking_histogram(
+    response: Response,
+    instance: str | None = Query(default=None),
+    window: str = Query(default="1h", pattern=DURATION_PATTERN),
+    interval: str = Query(default="1m", pattern=DURATION_PATTERN),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    service: AsyncTelemetryService = Depends(get_telemetry_service),
+    store: RollupStore = Depends(get_rollup_store),
+) -> dict:
+    rows = store.blocking_histogram(instance, window, interval) if start is None and end is None else None
+    if rows is not None:
+        return _summary(response, store, rows)
+    rows = await service.blocking_timeline(instance=instance, window=window, interval=interval, start=start, end=end)
+    return _summary(response, None, rows)
+
+
+def _summary(response: Response, store: RollupStore | None, rows: List[dict]) -> dict:
+    """Wrap summary rows with where they came from; ``fresh_as_of`` is null when Elastic answered live."""
+
+    source = "elastic" if store is None else "rollup"
+    response.headers[SOURCE_HEADER] = source
+    freshness = store.freshness() if store is not None else {"fresh_as_of": None, "age_seconds": None}
+    return {"source": source, **freshness, "rows": rows}
+
+
+@router.get("/signals/{signal}")
+async def signal(
+    signal: str,
+    instance: str | None = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=1000),
+    columnar: bool = Query(default=False),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    service: AsyncTelemetryService = Depends(get_telemetry_service),
+) -> Any:
+    if signal not in normalizers.signals():
+        raise HTTPException(status_code=404, detail=f"Unknown telemetry signal '{signal}'")
+    return await service.latest_signal(
+        signal, instance=instance, limit=limit, columnar=columnar, start=start, end=end
+    )
+
+
+@router.get("/rollups/wait-stats")
+async def rollup_wait_stats(
+    instance: str | None = Query(default=None),
+    resolution: str = Query(default="1m", pattern=RESOLUTION_PATTERN),
+    limit: int = Query(default=60, ge=1, le=500),
+    store: RollupStore = Depends(get_rollup_store),
+) -> dict:
+    return store.wait_series(instance=instance, resolution=resolution, points=limit)
+
+
+@router.get("/rollups/blocking")
+async def rollup_blocking(
+    instance: str | None = Query(default=None),
+    resolution: str = Query(default="1m", pattern=RESOLUTION_PATTERN),
+    limit: int = Query(default=60, ge=1, le=500),
+    store: RollupStore = Depends(get_rollup_store),
+) -> dict:
+    return store.blocking_series(instance=instance, resolution=resolution, points=limit)
+
+
+@router.get("/fleet/{signal}")
+async def fleet(
+    signal: str,
+    instances: List[str] | None = Query(default=None, max_length=500),
+    limit: int = Query(default=50, ge=1, le=500),
+    window: str = Query(default="1h", pattern=DURATION_PATTERN),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    service: AsyncTelemetryService = Depends(get_telemetry_service),
+) -> dict:
+    if signal not in normalizers.signals():
+        raise HTTPException(status_code=404, detail=f"Unknown telemetry signal '{signal}'")
+    return await service.fleet_signal(
+        signal, instances=instances, limit=limit, discover_window=window, start=start, end=end
+    )
 
 
 @router.get("/logs")
-def logs(
+async def logs(
     q: str = Query(default="*"),
     limit: int = Query(default=100, ge=1, le=1000),
-    service: TelemetryService = Depends(get_telemetry_service),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    service: AsyncTelemetryService = Depends(get_telemetry_service),
 ) -> List[dict]:
-    return service.raw_logs(search=q, limit=limit)
+    return await service.raw_logs(search=q, limit=limit, start=start, end=end)
+
+
+@router.get("/export")
+async def export(
+    dataset: Literal["logs", "metrics"] = Query(default="logs"),
+    q: str = Query(default="*"),
+    page_size: int = Query(default=1000, ge=1, le=10000),
+    cursor: str | None = Query(default=None),
+    start: str | None = Query(default=None, alias="from"),
+    end: str | None = Query(default=None, alias="to"),
+    service: AsyncTelemetryService = Depends(get_telemetry_service),
+) -> StreamingResponse:
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    stream = service.export(dataset, search=q, page_size=page_size, cursor=cursor, start=start, end=end)
+    # Pull the first chunk before answering so an expired cursor is a 410, not a broken stream.
+    try:
+        first = await stream.__anext__()
+    except PointInTimeExpiredError as exc:
+        raise HTTPException(status_code=410, detail="Export cursor expired; restart without a cursor") from exc
+    return StreamingResponse(_prepend(first, stream), media_type="application/x-ndjson")
+
+
+async def _prepend(first: bytes, stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield first
+    async for chunk in stream:
+        yield chunk
+
+
+@router.get("/pool")
+def pool_stats(registry: ElasticClientRegistry = Depends(get_client_registry)) -> dict:
+    return registry.stats()
+
+
+@router.get("/cache")
+def cache_stats(cache: TelemetryCache = Depends(get_telemetry_cache)) -> dict:
+    return cache.stats()
@@ -0,0 +1,157 @@
+"""Server-side aggregation requests for MSSQL telemetry.
+
+Each helper pairs the aggregation body sent to Elastic (always with ``size=0``)
+with a parser that flattens the bucketed response into plain rows, so the API
+moves summaries rather than raw hits and covers the whole time window. The
+filter side of each request comes from :class:`~src.collector_bridge.query.TelemetryQuery`.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.collector_bridge.query import INSTANCE_KEYWORD_FIELD
+
+WAIT_PERCENTILES = [50.0, 95.0, 99.0]
+
+
+def top_waits_aggs(instances: int = 25, wait_types: int = 10) -> Dict[str, Any]:
+    return {
+        "instances": {
+            "terms": {"field": INSTANCE_KEYWORD_FIELD, "size": instances},
+            "aggs": {
+                "wait_types": {
+                    "terms": {
+                        "field": "wait_stats.type.keyword",
+                        "size": wait_types,
+                        "order": {"wait_time_ms": "desc"},
+                    },
+                    "aggs": {
+                        "wait_time_ms": {"sum": {"field": "wait_stats.time_ms"}},
+                        "waiting_tasks": {"sum": {"field": "wait_stats.tasks"}},
+                        "wait_time_pct": {
+                            "percentiles": {"field": "wait_stats.time_ms", "percents": WAIT_PERCENTILES}
+                        },
+                    },
+                }
+            },
+        }
+    }
+
+
+def parse_top_waits(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    instances = response.get("aggregations", {}).get("instances", {}).get("buckets", [])
+    for instance in instances:
+        for bucket in instance.get("wait_types", {}).get("buckets", []):
+            rows.append(
+                {
+                    "instance": instance.get("key"),
+                    "wait_type": bucket.get("key"),
+                    "samples": bucket.get("doc_count"),
+                    "wait_time_ms": bucket.get("wait_time_ms", {}).get("value"),
+                    "waiting_tasks": bucket.get("waiting_tasks", {}).get("value"),
+                    "percentiles": _percentiles(bucket.get("wait_time_pct")),
+                }
+            )
+    return rows
+
+
+def blocking_histogram_aggs(interval: str = "1m") -> Dict[str, Any]:
+    return {
+        "timeline": {
+            "date_histogram": {"field": "@timestamp", "fixed_interval": interval, "min_doc_count": 0},
+            "aggs": {
+                "total_duration_ms": {"sum": {"field": "blocking.duration_ms"}},
+                "max_duration_ms": {"max": {"field": "blocking.duration_ms"}},
+                "blocked_sessions": {"cardinality": {"field": "blocking.session_id"}},
+                "duration_pct": {
+                    "percentiles": {"field": "blocking.duration_ms", "percents": WAIT_PERCENTILES}
+                },
+            },
+        }
+    }
+
+
+def parse_blocking_histogram(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    buckets = response.get("aggregations", {}).get("timeline", {}).get("buckets", [])
+    return [
+        {
+            "timestamp": bucket.get("key_as_string") or bucket.get("key"),
+            "events": bucket.get("doc_count"),
+            "blocked_sessions": bucket.get("blocked_sessions", {}).get("value"),
+            "total_duration_ms": bucket.get("total_duration_ms", {}).get("value"),
+            "max_duration_ms": bucket.get("max_duration_ms", {}).get("value"),
+            "percentiles": _percentiles(bucket.get("duration_pct")),
+        }
+        for bucket in buckets
+    ]
+
+
+def blocking_by_instance_aggs(instances: int = 25) -> Dict[str, Any]:
+    return {
+        "instances": {
+            "terms": {"field": INSTANCE_KEYWORD_FIELD, "size": instances},
+            "aggs": {
+                "total_duration_ms": {"sum": {"field": "blocking.duration_ms"}},
+                "max_duration_ms": {"max": {"field": "blocking.duration_ms"}},
+                "blocked_sessions": {"cardinality": {"field": "blocking.session_id"}},
+            },
+        }
+    }
+
+
+def parse_blocking_by_instance(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    buckets = response.get("aggregations", {}).get("instances", {}).get("buckets", [])
+    return [
+        {
+            "instance": bucket.get("key"),
+            "events": bucket.get("doc_count"),
+            "blocked_sessions": bucket.get("blocked_sessions", {}).get("value"),
+            "total_duration_ms": bucket.get("total_duration_ms", {}).get("value"),
+            "max_duration_ms": bucket.get("max_duration_ms", {}).get("value"),
+        }
+        for bucket in buckets
+    ]
+
+
+def instances_aggs(instances: int = 500) -> Dict[str, Any]:
+    return {"instances": {"terms": {"field": INSTANCE_KEYWORD_FIELD, "size": instances}}}
+
+
+def parse_instances(response: Dict[str, Any]) -> List[str]:
+    buckets = response.get("aggregations", {}).get("instances", {}).get("buckets", [])
+    return [bucket["key"] for bucket in buckets]
+
+
+def per_minute_aggs(aggs: Dict[str, Any]) -> Dict[str, Any]:
+    """Nest ``aggs`` under a 1m ``date_histogram`` so each minute comes back as its own bucket."""
+
+    return {"minutes": {"date_histogram": {"field": "@timestamp", "fixed_interval": "1m"}, "aggs": aggs}}
+
+
+def parse_per_minute(
+    response: Dict[str, Any], parser: Callable[[Dict[str, Any]], List[Dict[str, Any]]]
+) -> List[Tuple[float, List[Dict[str, Any]]]]:
+    """``(minute start in epoch seconds, rows)`` per bucket, parsing each bucket's sub-aggregations with ``parser``."""
+
+    buckets = response.get("aggregations", {}).get("minutes", {}).get("buckets", [])
+    return [(bucket["key"] / 1000, parser({"aggregations": bucket})) for bucket in buckets]
+
+
+def _percentiles(agg: Dict[str, Any] | None) -> Dict[str, Any]:
+    values = (agg or {}).get("values") or {}
+    return {f"p{float(k):g}": v for k, v in values.items()}
+
+
+__all__ = [
+    "blocking_by_instance_aggs",
+    "blocking_histogram_aggs",
+    "instances_aggs",
+    "parse_blocking_by_instance",
+    "parse_blocking_histogram",
+    "parse_instances",
+    "parse_per_minute",
+    "parse_top_waits",
+    "per_minute_aggs",
+    "top_waits_aggs",
+]
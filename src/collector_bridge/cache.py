@@ -0,0 +1,180 @@
+"""TTL + LRU cache with single-flight request coalescing for telemetry queries."""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+def query_key(kind: str, index: str, query: Any, size: int, fields: Any = None) -> Tuple[Any, ...]:
+    """Build a cache key that ignores whitespace and key-order differences in ``query``."""
+
+    if isinstance(query, str):
+        normalized = " ".join(query.split())
+    else:
+        normalized = json.dumps(query, sort_keys=True, separators=(",", ":"), default=str)
+    return (kind, index, normalized, size, tuple(fields) if fields else None)
+
+
+# Result of a shared async load whose owner was cancelled; waiters retry the lookup.
+_ABANDONED = object()
+
+
+class TelemetryCache:
+    """Bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    Concurrent lookups for a key that is already being loaded wait for the
+    in-flight load instead of issuing their own (single-flight), from threads via
+    :meth:`get_or_load` or from coroutines via :meth:`aget_or_load`. Failed loads
+    are propagated to every waiter and never cached. A ``ttl`` of zero disables
+    caching and coalescing entirely.
+
+    :meth:`clear` starts a new generation: loads already in flight still answer
+    their waiters, but their results are not stored and later lookups do not join them.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 256, clock: Callable[[], float] = time.monotonic):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._ainflight: Dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0 and self._max_entries > 0
+
+    def configure(self, ttl: float, max_entries: int) -> None:
+        with self._lock:
+            self._ttl = ttl
+            self._max_entries = max_entries
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._inflight.clear()
+            self._ainflight.clear()
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "inflight": len(self._inflight) + len(self._ainflight),
+                "ttl": self._ttl,
+                "max_entries": self._max_entries,
+            }
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires <= self._clock():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return True, value
+
+    def _store(self, key: Hashable, value: Any, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (self._clock() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        if not self.enabled:
+            return loader()
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            pending = self._inflight.get(key)
+            if pending is None:
+                self._stats["misses"] += 1
+                pending = self._inflight[key] = Future()
+                generation = self._generation
+                owner = True
+            else:
+                self._stats["coalesced"] += 1
+                owner = False
+        if not owner:
+            return pending.result()
+        try:
+            value = loader()
+        except BaseException as exc:
+            pending.set_exception(exc)
+            raise
+        else:
+            self._store(key, value, generation)
+            pending.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is pending:
+                    del self._inflight[key]
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Coroutine counterpart of :meth:`get_or_load`.
+
+        If the coroutine running the shared load is cancelled, the waiters are not:
+        the next one in line takes the load over.
+        """
+
+        if not self.enabled:
+            return await loader()
+        while True:
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    return value
+                pending = self._ainflight.get(key)
+                if pending is None:
+                    self._stats["misses"] += 1
+                    pending = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                    generation = self._generation
+                    owner = True
+                else:
+                    self._stats["coalesced"] += 1
+                    owner = False
+            if not owner:
+                value = await asyncio.shield(pending)
+                if value is _ABANDONED:
+                    continue
+                return value
+            try:
+                value = await loader()
+            except asyncio.CancelledError:
+                pending.set_result(_ABANDONED)
+                raise
+            except BaseException as exc:
+                pending.set_exception(exc)
+                pending.exception()  # mark retrieved when nobody else is waiting
+                raise
+            else:
+                self._store(key, value, generation)
+                pending.set_result(value)
+                return value
+            finally:
+                with self._lock:
+                    if self._ainflight.get(key) is pending:
+                        del self._ainflight[key]
+
+
+__all__ = ["TelemetryCache", "query_key"]
@@ -1,82 +1,457 @@
 """Thin client for querying Elastic MSSQL telemetry."""
 from __future__ import annotations
 
+import asyncio
+import inspect
 import json
 import logging
-from typing import Any, Dict, Iterable, List
+import time
+from concurrent.futures import Future
+from dataclasses import astuple
+from functools import partial
+from threading import Lock
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch, Elasticsearch, NotFoundError
 
+from src.collector_bridge import normalizers
+from src.collector_bridge.query import TelemetryQuery
 from src.common.config import ElasticSettings
 
 LOGGER = logging.getLogger(__name__)
 
+# Source paths read by each normalizer; fetches request only these via ``_source`` includes.
+WAIT_STATS_FIELDS: Tuple[str, ...] = normalizers.WAIT_STATS.fields
+BLOCKING_FIELDS: Tuple[str, ...] = normalizers.BLOCKING.fields
+
+
+class PointInTimeExpiredError(RuntimeError):
+    """Raised by ``scan`` when its point-in-time is gone and the scan cannot be resumed."""
+
+
+def _client_options(settings: ElasticSettings) -> Dict[str, Any]:
+    opts: Dict[str, Any] = {
+        "basic_auth": (settings.username, settings.password)
+        if settings.username and settings.password
+        else None,
+        "ca_certs": settings.ca_cert if settings.ca_cert and not settings.insecure else None,
+        "verify_certs": not settings.insecure,
+        "request_timeout": settings.request_timeout,
+        "connections_per_node": settings.connections_per_node,
+        "http_compress": settings.http_compress,
+        "headers": {"connection": "keep-alive" if settings.keep_alive else "close"},
+        "sniff_on_start": settings.sniff_on_start,
+        "sniff_on_node_failure": settings.sniff_on_node_failure,
+        "min_delay_between_sniffing": settings.sniff_interval,
+    }
+    # Remove None values to avoid validation warnings
+    opts = {k: v for k, v in opts.items() if v is not None}
+    LOGGER.debug("Initializing Elasticsearch client with options %s", json.dumps(opts, default=str))
+    return opts
 
-class ElasticTelemetryClient:
-    """Wrapper around :class:`elasticsearch.Elasticsearch` tailored for telemetry queries."""
+
+def _node_stats(node: Any) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "node": node.base_url,
+        "max_connections": getattr(node.config, "connections_per_node", None),
+    }
+    pool = getattr(node, "pool", None)
+    if pool is not None:  # urllib3 node
+        stats["connections_created"] = getattr(pool, "num_connections", None)
+        stats["requests"] = getattr(pool, "num_requests", None)
+        stats["idle_connections"] = pool.pool.qsize() if getattr(pool, "pool", None) is not None else None
+    session = getattr(node, "session", None)
+    if session is not None:  # aiohttp node
+        stats["session_open"] = not session.closed
+    return stats
+
+
+class _TelemetryClientBase:
+    """Behaviour shared by the sync and async telemetry clients."""
+
+    _client: Any
 
     def __init__(self, settings: ElasticSettings):
         self._settings = settings
-        self._client = self._build_client(settings)
+
+    @property
+    def settings(self) -> ElasticSettings:
+        return self._settings
+
+    def pool_stats(self) -> List[Dict[str, Any]]:
+        """Return per-node connection pool counters from the underlying transport."""
+
+        return [_node_stats(node) for node in self._client.transport.node_pool.all()]
 
     @staticmethod
-    def _build_client(settings: ElasticSettings) -> Elasticsearch:
-        opts: Dict[str, Any] = {
-            "basic_auth": (settings.username, settings.password)
-            if settings.username and settings.password
-            else None,
-            "ca_certs": settings.ca_cert if settings.ca_cert and not settings.insecure else None,
-            "verify_certs": not settings.insecure,
-            "request_timeout": settings.request_timeout,
-        }
-        # Remove None values to avoid validation warnings
-        opts = {k: v for k, v in opts.items() if v is not None}
+    def _projection(fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+        return {"source_includes": list(fields)} if fields else {}
 
-        LOGGER.debug("Initializing Elasticsearch client with options %s", json.dumps(opts, default=str))
-        return Elasticsearch(settings.url, **opts)
+    @staticmethod
+    def _search_params(query: TelemetryQuery, size: int) -> Dict[str, Any]:
+        return {"query": query.to_dict(), "sort": query.sort(), "size": size, "track_total_hits": False}
 
-    def raw_search(self, index: str, query: str, size: int = 100) -> Dict[str, Any]:
-        LOGGER.debug("Executing Elastic search", extra={"index": index, "query": query, "size": size})
-        return self._client.search(index=index, q=query, size=size)
+    def _msearch_body(
+        self, queries: Sequence[TelemetryQuery], size: int, fields: Optional[Sequence[str]]
+    ) -> List[Dict[str, Any]]:
+        body: List[Dict[str, Any]] = []
+        for query in queries:
+            search = self._search_params(query, size)
+            if fields:
+                search["_source"] = {"includes": list(fields)}
+            body.extend(({"index": self._settings.metrics_index}, search))
+        return body
 
-    def fetch_metrics(self, query: str, size: int = 200) -> List[Dict[str, Any]]:
-        response = self.raw_search(self._settings.metrics_index, query=query, size=size)
-        return [hit["_source"] for hit in response.get("hits", {}).get("hits", [])]
+    @staticmethod
+    def _bulk_operations(index: str, documents: Sequence[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        operations: List[Dict[str, Any]] = []
+        for doc_id, document in documents:
+            operations.extend(({"index": {"_index": index, "_id": doc_id}}, document))
+        return operations
+
+    @staticmethod
+    def _sources(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [hit.get("_source", {}) for hit in response.get("hits", {}).get("hits", [])]
 
-    def fetch_logs(self, query: str, size: int = 200) -> List[Dict[str, Any]]:
-        response = self.raw_search(self._settings.logs_index, query=query, size=size)
-        return [hit["_source"] for hit in response.get("hits", {}).get("hits", [])]
+    def normalize(self, signal: str, documents: Iterable[Dict[str, Any]], columnar: bool = False) -> Any:
+        return normalizers.get_normalizer(signal)(documents, columnar=columnar)
 
     def normalize_wait_stats(self, documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        normalized: List[Dict[str, Any]] = []
-        for doc in documents:
-            waits = doc.get("wait_stats") or {}
-            normalized.append(
-                {
-                    "timestamp": doc.get("@timestamp") or doc.get("timestamp"),
-                    "instance": doc.get("mssql_instance"),
-                    "wait_type": waits.get("type"),
-                    "wait_time_ms": waits.get("time_ms"),
-                    "waiting_tasks": waits.get("tasks"),
-                }
-            )
-        return normalized
+        return normalizers.NORMALIZERS["wait_stats"].rows(documents)
 
     def normalize_blocking(self, documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        results: List[Dict[str, Any]] = []
-        for doc in documents:
-            blocking = doc.get("blocking") or {}
-            results.append(
+        return normalizers.NORMALIZERS["blocking"].rows(documents)
+
+
+class ElasticTelemetryClient(_TelemetryClientBase):
+    """Wrapper around :class:`elasticsearch.Elasticsearch` tailored for telemetry queries."""
+
+    def __init__(self, settings: ElasticSettings):
+        super().__init__(settings)
+        self._client = Elasticsearch(settings.url, **_client_options(settings))
+
+    def close(self) -> None:
+        self._client.close()
+
+    def raw_search(
+        self, index: str, query: TelemetryQuery, size: int = 100, fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        LOGGER.debug("Executing Elastic search", extra={"index": index, "query": query, "size": size})
+        return self._client.search(index=index, **self._search_params(query, size), **self._projection(fields))
+
+    def fetch_metrics(
+        self, query: TelemetryQuery, size: int = 200, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        response = self.raw_search(self._settings.metrics_index, query=query, size=size, fields=fields)
+        return self._sources(response)
+
+    def fetch_logs(
+        self, query: TelemetryQuery, size: int = 200, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        response = self.raw_search(self._settings.logs_index, query=query, size=size, fields=fields)
+        return self._sources(response)
+
+    def aggregate_metrics(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        LOGGER.debug("Executing Elastic aggregation", extra={"query": query, "aggs": list(aggs)})
+        return self._client.search(index=self._settings.metrics_index, query=query, aggs=aggs, size=0)
+
+    def msearch_metrics(
+        self, queries: Sequence[TelemetryQuery], size: int = 50, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Run every query in a single ``_msearch`` and return the per-query responses in order."""
+
+        LOGGER.debug("Executing Elastic msearch", extra={"searches": len(queries), "size": size})
+        response = self._client.msearch(searches=self._msearch_body(queries, size, fields))
+        return list(response.get("responses", []))
+
+    def bulk_index(self, index: str, documents: Sequence[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Index ``(id, document)`` pairs in one ``_bulk`` request; per-item results are in ``items``."""
+
+        LOGGER.debug("Executing Elastic bulk", extra={"index": index, "documents": len(documents)})
+        return self._client.bulk(operations=self._bulk_operations(index, documents))
+
+    def put_index_template(self, name: str, template: Dict[str, Any]) -> Dict[str, Any]:
+        """Create or replace the composable index template ``name`` (``index_patterns``, ``template``, ...)."""
+
+        return self._client.indices.put_index_template(name=name, **template)
+
+
+class AsyncElasticTelemetryClient(_TelemetryClientBase):
+    """Variant of :class:`ElasticTelemetryClient` backed by :class:`AsyncElasticsearch`.
+
+    Requests are awaited on the event loop, so concurrency is bounded by the aiohttp
+    connection pool (``connections_per_node``) rather than by server threads.
+    """
+
+    def __init__(self, settings: ElasticSettings):
+        super().__init__(settings)
+        self._client = AsyncElasticsearch(settings.url, **_client_options(settings))
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    async def raw_search(
+        self, index: str, query: TelemetryQuery, size: int = 100, fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        LOGGER.debug("Executing async Elastic search", extra={"index": index, "query": query, "size": size})
+        return await self._client.search(
+            index=index, **self._search_params(query, size), **self._projection(fields)
+        )
+
+    async def fetch_metrics(
+        self, query: TelemetryQuery, size: int = 200, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        response = await self.raw_search(self._settings.metrics_index, query=query, size=size, fields=fields)
+        return self._sources(response)
+
+    async def fetch_logs(
+        self, query: TelemetryQuery, size: int = 200, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        response = await self.raw_search(self._settings.logs_index, query=query, size=size, fields=fields)
+        return self._sources(response)
+
+    async def aggregate_metrics(self, query: Dict[str, Any], aggs: Dict[str, Any]) -> Dict[str, Any]:
+        LOGGER.debug("Executing async Elastic aggregation", extra={"query": query, "aggs": list(aggs)})
+        return await self._client.search(index=self._settings.metrics_index, query=query, aggs=aggs, size=0)
+
+    async def msearch_metrics(
+        self, queries: Sequence[TelemetryQuery], size: int = 50, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        LOGGER.debug("Executing async Elastic msearch", extra={"searches": len(queries), "size": size})
+        response = await self._client.msearch(searches=self._msearch_body(queries, size, fields))
+        return list(response.get("responses", []))
+
+    async def bulk_index(self, index: str, documents: Sequence[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        LOGGER.debug("Executing async Elastic bulk", extra={"index": index, "documents": len(documents)})
+        return await self._client.bulk(operations=self._bulk_operations(index, documents))
+
+    async def put_index_template(self, name: str, template: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._client.indices.put_index_template(name=name, **template)
+
+    async def scan(
+        self,
+        index: str,
+        query: Dict[str, Any],
+        page_size: int = 1000,
+        pit_id: Optional[str] = None,
+        search_after: Optional[List[Any]] = None,
+        keep_alive: str = "2m",
+    ) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Page through ``index`` with a point-in-time and ``search_after``.
+
+        Yields ``(pit_id, hits)`` per page. Passing a previous ``pit_id`` and the last
+        hit's ``sort`` values resumes where an earlier scan stopped. The PIT is closed
+        once the scan is exhausted; an interrupted scan leaves it to expire after
+        ``keep_alive`` so it can still be resumed. The ``_shard_doc`` tiebreaker only
+        has meaning inside the PIT that produced it, so an expired PIT raises
+        :class:`PointInTimeExpiredError` and the scan has to start over.
+        """
+
+        if pit_id is None:
+            opened = await self._client.open_point_in_time(index=index, keep_alive=keep_alive)
+            pit_id = opened["id"]
+        while True:
+            params: Dict[str, Any] = {
+                "pit": {"id": pit_id, "keep_alive": keep_alive},
+                "query": query,
+                "size": page_size,
+                "sort": [{"@timestamp": "asc"}, {"_shard_doc": "asc"}],
+                "track_total_hits": False,
+            }
+            if search_after is not None:
+                params["search_after"] = search_after
+            try:
+                response = await self._client.search(**params)
+            except NotFoundError as exc:
+                raise PointInTimeExpiredError(f"Point-in-time for {index} expired; restart the scan") from exc
+            pit_id = response.get("pit_id", pit_id)
+            hits = response.get("hits", {}).get("hits", [])
+            if not hits:
+                break
+            yield pit_id, hits
+            search_after = hits[-1]["sort"]
+            if len(hits) < page_size:
+                break
+        await self._client.close_point_in_time(id=pit_id)
+
+
+def _settings_key(settings: ElasticSettings) -> Tuple[Any, ...]:
+    return astuple(settings)
+
+
+class ElasticClientRegistry:
+    """Share one telemetry client per distinct :class:`ElasticSettings`.
+
+    Clients are created lazily on first use and reused for every later request with
+    identical settings, so the transport's connection pool survives across requests.
+    Creating a client for new settings retires the others; a retired client is
+    closed once it has been unused for longer than its ``request_timeout``, after
+    which no request started on it can still be running. Pass
+    ``AsyncElasticTelemetryClient`` as the factory to pool async clients and release
+    them with :meth:`aclose`.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[ElasticSettings], Any] = ElasticTelemetryClient,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._factory = factory
+        self._clock = clock
+        self._lock = Lock()
+        self._clients: Dict[Tuple[Any, ...], Any] = {}
+        self._acquisitions: Dict[Tuple[Any, ...], int] = {}
+        self._last_used: Dict[Tuple[Any, ...], float] = {}
+        self._retired: Dict[Tuple[Any, ...], Any] = {}
+        self._loops: Dict[int, Optional[asyncio.AbstractEventLoop]] = {}
+        self._created = 0
+        self._reused = 0
+
+    def get(self, settings: ElasticSettings) -> Any:
+        key = _settings_key(settings)
+        now = self._clock()
+        with self._lock:
+            client = self._clients.get(key) or self._retired.pop(key, None)
+            if client is None:
+                LOGGER.info("Creating pooled Elastic client for %s", settings.url)
+                client = self._factory(settings)
+                self._loops[id(client)] = _running_loop()
+                self._acquisitions[key] = 0
+                self._created += 1
+                for old_key in [old_key for old_key in self._clients if old_key != key]:
+                    self._retired[old_key] = self._clients.pop(old_key)
+            else:
+                self._reused += 1
+            self._clients[key] = client
+            self._acquisitions[key] += 1
+            self._last_used[key] = now
+            idle = self._reap(now)
+        self._close_retired(idle)
+        return client
+
+    def reap(self) -> int:
+        """Close retired clients that have been idle for longer than their request timeout.
+
+        ``get()`` only reaps when a request arrives, so the application lifespan calls this
+        periodically to release pools retired by a settings change on a quiet instance.
+        """
+
+        with self._lock:
+            idle = self._reap(self._clock())
+        self._close_retired(idle)
+        return len(idle)
+
+    def _reap(self, now: float) -> List[Any]:
+        """Remove and return retired clients idle for longer than their request timeout."""
+
+        idle = [
+            key
+            for key, client in self._retired.items()
+            if now - self._last_used.get(key, now) > client.settings.request_timeout
+        ]
+        for key in idle:
+            self._acquisitions.pop(key, None)
+            self._last_used.pop(key, None)
+        return [self._retired.pop(key) for key in idle]
+
+    def _close_retired(self, clients: List[Any]) -> None:
+        for client in clients:
+            with self._lock:
+                loop = self._loops.pop(id(client), None)
+            self._close_later(client, loop)
+
+    @staticmethod
+    def _close_later(client: Any, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Close ``client`` on the event loop that created it.
+
+        Async transports are bound to their loop, so the close coroutine is handed to that loop
+        with ``run_coroutine_threadsafe`` (safe from the loop itself and from worker threads).
+        Failures surface through a done-callback instead of being dropped.
+        """
+
+        LOGGER.info("Closing retired Elastic client for %s", client.settings.url)
+        try:
+            result = client.close()
+        except Exception:
+            LOGGER.exception("Failed to close retired Elastic client for %s", client.settings.url)
+            return
+        if not inspect.isawaitable(result):
+            return
+        if loop is None or loop.is_closed():
+            LOGGER.warning("Event loop of retired Elastic client for %s is gone; not closed", client.settings.url)
+            if inspect.iscoroutine(result):
+                result.close()
+            return
+        future = asyncio.run_coroutine_threadsafe(_awaited(result), loop)
+        future.add_done_callback(partial(_log_close_failure, client.settings.url))
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            items = list(self._clients.items())
+            acquisitions = dict(self._acquisitions)
+            created, reused, retired = self._created, self._reused, len(self._retired)
+        return {
+            "clients": len(items),
+            "retired": retired,
+            "created": created,
+            "reused": reused,
+            "pools": [
                 {
-                    "timestamp": doc.get("@timestamp") or doc.get("timestamp"),
-                    "session_id": blocking.get("session_id"),
-                    "blocking_session_id": blocking.get("blocking_session_id"),
-                    "wait_type": blocking.get("wait_type"),
-                    "duration_ms": blocking.get("duration_ms"),
-                    "query_text": blocking.get("query_text"),
+                    "url": client.settings.url,
+                    "acquisitions": acquisitions.get(key, 0),
+                    "nodes": client.pool_stats(),
                 }
-            )
-        return results
+                for key, client in items
+            ],
+        }
+
+    def _drain(self) -> List[Any]:
+        with self._lock:
+            clients = [*self._clients.values(), *self._retired.values()]
+            self._clients.clear()
+            self._loops.clear()
+            self._retired.clear()
+            self._acquisitions.clear()
+            self._last_used.clear()
+        return clients
+
+    def close(self) -> None:
+        for client in self._drain():
+            try:
+                client.close()
+            except Exception:  # pragma: no cover - best effort during shutdown
+                LOGGER.exception("Failed to close Elastic client")
+
+    async def aclose(self) -> None:
+        for client in self._drain():
+            try:
+                result = client.close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:  # pragma: no cover - best effort during shutdown
+                LOGGER.exception("Failed to close Elastic client")
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+async def _awaited(result: Any) -> Any:
+    return await result
+
+
+def _log_close_failure(url: str, future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        LOGGER.error("Failed to close retired Elastic client for %s", url, exc_info=future.exception())
 
 
-__all__ = ["ElasticTelemetryClient"]
+__all__ = [
+    "AsyncElasticTelemetryClient",
+    "BLOCKING_FIELDS",
+    "ElasticClientRegistry",
+    "ElasticTelemetryClient",
+    "PointInTimeExpiredError",
+    "WAIT_STATS_FIELDS",
+]
@@ -0,0 +1,92 @@
+"""NDJSON export of telemetry documents using point-in-time pagination."""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from src.collector_bridge.elastic_client import AsyncElasticTelemetryClient, PointInTimeExpiredError
+from src.collector_bridge.query import TelemetryQuery
+
+LOGGER = logging.getLogger(__name__)
+
+# Top-level member that marks a line as a control record rather than a document.
+CONTROL_KEY = "_export"
+
+
+def encode_cursor(pit_id: str, search_after: List[Any]) -> str:
+    raw = json.dumps({"pit": pit_id, "after": search_after}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List[Any]]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(data["pit"]), list(data["after"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Invalid export cursor") from exc
+
+
+def _line(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _control(record: str, **fields: Any) -> bytes:
+    return _line({CONTROL_KEY: {"record": record, **fields}})
+
+
+async def export_ndjson(
+    client: AsyncElasticTelemetryClient,
+    index: str,
+    query: TelemetryQuery | None = None,
+    page_size: int = 1000,
+    cursor: Optional[str] = None,
+) -> AsyncIterator[bytes]:
+    """Stream every document matching ``query`` as NDJSON.
+
+    Each document's ``_source`` is written on its own line. Control records are
+    the only lines with a top-level :data:`CONTROL_KEY` member, whose ``record``
+    says what they are:
+
+    - ``cursor`` follows every page; passing its ``cursor`` back resumes the export
+      after the last document already received.
+    - ``end`` is always the last line of a complete export.
+    - ``error`` is the last line when the export failed part way; it carries the
+      ``detail`` and the ``cursor`` to resume from (the starting ``cursor`` if no page
+      was sent). The ``cursor`` is null when the point-in-time expired, since the
+      export can then only be restarted from the beginning.
+
+    A stream that ends without ``end`` or ``error`` was cut off in transit. A
+    :class:`PointInTimeExpiredError` before the first page is raised rather than
+    written, so the caller can reject the stale cursor outright.
+    """
+
+    pit_id: Optional[str] = None
+    search_after: Optional[List[Any]] = None
+    if cursor:
+        pit_id, search_after = decode_cursor(cursor)
+
+    query = query or TelemetryQuery()
+    sent = False
+    try:
+        async for pit_id, hits in client.scan(
+            index, query.to_dict(), page_size=page_size, pit_id=pit_id, search_after=search_after
+        ):
+            cursor = encode_cursor(pit_id, hits[-1]["sort"])
+            yield b"".join(_line(hit["_source"]) for hit in hits) + _control("cursor", cursor=cursor)
+            sent = True
+    except PointInTimeExpiredError as exc:
+        if not sent:
+            raise
+        LOGGER.warning("Export from %s failed: %s", index, exc)
+        yield _control("error", detail=str(exc), cursor=None)
+        return
+    except Exception as exc:
+        LOGGER.warning("Export from %s failed: %s", index, exc)
+        yield _control("error", detail=str(exc) or type(exc).__name__, cursor=cursor)
+        return
+    yield _control("end")
+
+
+__all__ = ["CONTROL_KEY", "decode_cursor", "encode_cursor", "export_ndjson"]
@@ -0,0 +1,268 @@
+"""Buffered persistence of generated insights to the Elastic ``llm_insights`` index."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Tuple
+
+from src.collector_bridge.query import INSTANCE_FIELD, TIMESTAMP_FIELD, TelemetryQuery
+from src.common.config import ElasticSettings
+
+LOGGER = logging.getLogger(__name__)
+
+SUPPORTING_METRICS_LIMIT = 50
+# Producers wait at most this long for buffer space before the insight is dropped.
+RECORD_TIMEOUT = 1.0
+_ACTION = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.+?)\s*$")
+
+
+def recommended_actions(response: str) -> List[str]:
+    """Bulleted or numbered lines of a model response."""
+
+    return [match.group(1) for match in map(_ACTION.match, response.splitlines()) if match]
+
+
+def insights_template(index: str) -> Dict[str, Any]:
+    """Index template for ``index`` so ``llm_insights`` never falls back to dynamic mapping.
+
+    Dynamic mapping would make the instance a ``text`` field, which the instance
+    ``term`` filter of :meth:`InsightWriter.search` cannot match, and would map
+    every column of every supporting metric row.
+    """
+
+    return {
+        "index_patterns": [index],
+        "priority": 200,
+        "template": {
+            "mappings": {
+                "dynamic": False,
+                "properties": {
+                    TIMESTAMP_FIELD: {"type": "date"},
+                    "generated_at": {"type": "date"},
+                    INSTANCE_FIELD: {"type": "keyword"},
+                    "title": {"type": "text", "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}},
+                    "model": {"type": "keyword"},
+                    "summary": {"type": "text"},
+                    "recommended_actions": {"type": "text"},
+                    "supporting_metrics": {"type": "flattened"},
+                    "metrics_count": {"type": "integer"},
+                    "compaction": {"type": "object", "enabled": False},
+                },
+            }
+        },
+    }
+
+
+def insight_document(record: Mapping[str, Any], generated_at: float) -> Dict[str, Any]:
+    """The ``llm_insights`` document for one analysis result and its inputs."""
+
+    timestamp = datetime.fromtimestamp(generated_at, tz=timezone.utc).isoformat()
+    response = record.get("response") or ""
+    metrics = record.get("metrics") or []
+    return {
+        TIMESTAMP_FIELD: timestamp,
+        "generated_at": timestamp,
+        INSTANCE_FIELD: record.get("instance"),
+        "title": record.get("title"),
+        "model": record.get("model"),
+        "summary": response,
+        "recommended_actions": recommended_actions(response),
+        "supporting_metrics": list(metrics[:SUPPORTING_METRICS_LIMIT]),
+        "metrics_count": len(metrics),
+        "compaction": record.get("compaction"),
+    }
+
+
+class InsightWriter:
+    """Batches insight documents in memory and writes them with the ``_bulk`` API off the request path.
+
+    :meth:`record` is called from worker threads and returns immediately unless
+    the buffer holds ``insights_buffer_size`` documents, in which case it waits up
+    to :data:`RECORD_TIMEOUT` for a flush before dropping the insight. A background
+    task flushes ``insights_batch_size`` documents as soon as that many are
+    buffered, and whatever is buffered every ``insights_flush_interval`` seconds.
+    Items rejected with 429 or a 5xx status, or lost to a failed request, are put
+    back at the head of the buffer and retried on a later flush up to
+    ``insights_retries`` times; documents carry a fixed ``_id`` so retries never
+    duplicate them. The index template (see :func:`insights_template`) is put
+    when the writer starts and again before the first write to a renamed index;
+    nothing is written until it has been accepted.
+    """
+
+    def __init__(
+        self,
+        settings_provider: Callable[[], ElasticSettings],
+        client_provider: Callable[[ElasticSettings], Any],
+        clock: Callable[[], float] = time.time,
+    ):
+        self._settings_provider = settings_provider
+        self._client_provider = client_provider
+        self._clock = clock
+        # (document id, document, failed attempts)
+        self._buffer: Deque[Tuple[str, Dict[str, Any], int]] = deque()
+        self._space = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._templated: Optional[str] = None
+        self._stats = {"recorded": 0, "dropped": 0, "flushes": 0, "indexed": 0, "retried": 0, "failed": 0}
+
+    def record(self, record: Mapping[str, Any]) -> bool:
+        """Buffer one analysis result; blocks the calling thread briefly when the buffer is full."""
+
+        settings = self._settings_provider()
+        document = insight_document(record, self._clock())
+        with self._space:
+            if not self._space.wait_for(
+                lambda: len(self._buffer) < settings.insights_buffer_size, timeout=RECORD_TIMEOUT
+            ):
+                self._stats["dropped"] += 1
+                LOGGER.warning("Insight buffer is full; dropping insight for %s", record.get("instance"))
+                return False
+            self._buffer.append((uuid.uuid4().hex, document, 0))
+            self._stats["recorded"] += 1
+            full = len(self._buffer) >= settings.insights_batch_size
+        if full and self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    async def flush(self) -> Dict[str, int]:
+        """Write up to one batch and return how many documents were indexed, requeued and given up on."""
+
+        settings = self._settings_provider()
+        with self._space:
+            batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), settings.insights_batch_size))]
+            self._space.notify_all()
+        outcome = {"indexed": 0, "retried": 0, "failed": 0}
+        if not batch:
+            return outcome
+        retry: List[Tuple[str, Dict[str, Any], int]] = []
+        try:
+            client = self._client_provider(settings)
+            await self._ensure_template(client, settings)
+            response = await client.bulk_index(settings.insights_index, [(doc_id, doc) for doc_id, doc, _ in batch])
+        except Exception as exc:
+            LOGGER.warning("Bulk write of %s insights failed: %s", len(batch), exc)
+            retry = batch
+        else:
+            items = response.get("items", [])
+            for entry, item in zip(batch, items):
+                result = next(iter(item.values()), {})
+                status = int(result.get("status", 500))
+                if status < 300:
+                    outcome["indexed"] += 1
+                elif status == 429 or status >= 500:
+                    retry.append(entry)
+                else:
+                    outcome["failed"] += 1
+                    LOGGER.error("Elastic rejected insight %s: %s", entry[0], result.get("error"))
+            if len(items) < len(batch):
+                # Documents carry their ids, so writing the unreported ones again cannot duplicate them.
+                LOGGER.warning("Bulk response covered %s of %s insights; retrying the rest", len(items), len(batch))
+                retry.extend(batch[len(items) :])
+        requeue = [
+            (doc_id, doc, attempts + 1) for doc_id, doc, attempts in retry if attempts < settings.insights_retries
+        ]
+        outcome["retried"] = len(requeue)
+        outcome["failed"] += len(retry) - len(requeue)
+        with self._space:
+            self._buffer.extendleft(reversed(requeue))
+            self._stats["flushes"] += 1
+            for name, count in outcome.items():
+                self._stats[name] += count
+        return outcome
+
+    async def _ensure_template(self, client: Any, settings: ElasticSettings) -> None:
+        if self._templated == settings.insights_index:
+            return
+        await client.put_index_template(settings.insights_index, insights_template(settings.insights_index))
+        self._templated = settings.insights_index
+
+    async def _drain(self) -> None:
+        """Flush full batches back to back; stop early when Elastic pushes back so retries wait a cycle."""
+
+        while True:
+            outcome = await self.flush()
+            with self._space:
+                remaining = len(self._buffer)
+            if not remaining or outcome["retried"] or remaining < self._settings_provider().insights_batch_size:
+                return
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        settings = self._settings_provider()
+        try:
+            await self._ensure_template(self._client_provider(settings), settings)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            LOGGER.warning(
+                "Could not put the %s index template; retrying before the first write: %s", settings.insights_index, exc
+            )
+        while True:
+            interval = self._settings_provider().insights_flush_interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval if interval > 0 else 30)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                LOGGER.exception("Insight flush failed")
+
+    async def search(
+        self,
+        instance: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """Stored insights, newest first, without re-running the model."""
+
+        settings = self._settings_provider()
+        client = self._client_provider(settings)
+        query = TelemetryQuery().for_instance(instance, field=INSTANCE_FIELD).between(start, end)
+        response = await client.raw_search(settings.insights_index, query=query, size=limit)
+        return [{"id": hit.get("_id"), **hit.get("_source", {})} for hit in response.get("hits", {}).get("hits", [])]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._space:
+            return {"buffered": len(self._buffer), **self._stats}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = self._loop.create_task(self._run(), name="insight-writer")
+
+    async def stop(self) -> None:
+        """Stop the background task and make a final attempt to write what is still buffered."""
+
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+        try:
+            while self.stats()["buffered"] and not (await self.flush())["retried"]:
+                pass
+        except Exception:  # pragma: no cover - best effort during shutdown
+            LOGGER.exception("Final insight flush failed")
+        if self.stats()["buffered"]:
+            LOGGER.warning("Discarding %s unwritten insights on shutdown", self.stats()["buffered"])
+
+
+__all__ = ["InsightWriter", "RECORD_TIMEOUT", "insight_document", "insights_template", "recommended_actions"]
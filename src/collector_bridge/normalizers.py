@@ -0,0 +1,236 @@
+"""Declarative normalizers for heterogeneous MSSQL telemetry documents.
+
+A :class:`NormalizerSpec` maps each output column to one or more dotted source
+paths (tried in order, first value that is not ``None`` wins).
+:func:`compile_normalizer` resolves a spec into per-path getters once, so a whole
+page of hits is normalized column by column without re-parsing paths. Adding a
+signal type only requires a new spec.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from itertools import repeat
+from operator import itemgetter, setitem
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Exhausts an iterator without storing its items.
+_consume = deque(maxlen=0).extend
+
+
+@dataclass(frozen=True)
+class NormalizerSpec:
+    name: str
+    columns: Mapping[str, Tuple[str, ...]]
+    marker: str | None = None  # source path that must exist for a document to carry this signal
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """Source paths needed by this spec, suitable for ``_source`` includes."""
+
+        seen: Dict[str, None] = {}
+        for paths in self.columns.values():
+            for path in paths:
+                seen.setdefault(path, None)
+        return tuple(seen)
+
+
+def _path_getter(parts: Tuple[str, ...]) -> Callable[[Any], Any]:
+    """Per-document lookup of one dotted path; ``None`` when any level is missing or not a mapping."""
+
+    def get(document: Any) -> Any:
+        value = document
+        for part in parts:
+            if not isinstance(value, Mapping):
+                return None
+            value = value.get(part)
+        return value
+
+    return get
+
+
+def _first_present(getters: Sequence[Callable[[Any], Any]]) -> Callable[[Any], Any]:
+    """Lookup returning the first value that is not ``None``, so zeros and empty strings are kept."""
+
+    if len(getters) == 1:
+        return getters[0]
+
+    def get(document: Any) -> Any:
+        for getter in getters:
+            value = getter(document)
+            if value is not None:
+                return value
+        return None
+
+    return get
+
+
+class CompiledNormalizer:
+    """Batch extractor produced by :func:`compile_normalizer`.
+
+    Each column is the first source path whose value is not ``None``. Extraction
+    is columnar: ``itemgetter`` calls are mapped over the whole page one path
+    segment at a time, and only the documents whose primary path is empty are
+    looked up again through the fallbacks. A page where some document lacks a
+    container on a primary path, or a leaf that has no fallback, is extracted
+    document by document instead. Row output is built by transposing the columns.
+    """
+
+    def __init__(self, spec: NormalizerSpec):
+        if not spec.columns:
+            raise ValueError(f"Normalizer spec '{spec.name}' declares no columns")
+        self.spec = spec
+        self._names = tuple(spec.columns)
+        self._getters: List[Callable[[Any], Any]] = []
+        self._containers: Dict[Tuple[str, ...], Callable[[Any], Any]] = {}
+        # (column, primary container path, primary leaf, lookup of the remaining paths or None)
+        self._plan: List[Tuple[str, Tuple[str, ...], str, Optional[Callable[[Any], Any]]]] = []
+        for name, paths in spec.columns.items():
+            getters = [_path_getter(tuple(path.split("."))) for path in paths]
+            self._getters.append(_first_present(getters))
+            parts = tuple(paths[0].split("."))
+            for depth in range(1, len(parts)):
+                self._containers.setdefault(parts[:depth], itemgetter(parts[depth - 1]))
+            fallback = _first_present(getters[1:]) if len(getters) > 1 else None
+            self._plan.append((name, parts[:-1], parts[-1], fallback))
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return self.spec.fields
+
+    def rows(self, documents: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        documents = documents if isinstance(documents, list) else list(documents)
+        rows: List[Dict[str, Any]] = [{} for _ in documents]
+        for name, column in self.columns(documents).items():
+            _consume(map(setitem, rows, repeat(name), column))
+        return rows
+
+    def columns(self, documents: Iterable[Mapping[str, Any]]) -> Dict[str, List[Any]]:
+        documents = documents if isinstance(documents, list) else list(documents)
+        try:
+            return self._fast_columns(documents)
+        except (KeyError, TypeError, AttributeError):
+            return {name: list(map(getter, documents)) for name, getter in zip(self._names, self._getters)}
+
+    def _fast_columns(self, documents: List[Mapping[str, Any]]) -> Dict[str, List[Any]]:
+        containers: Dict[Tuple[str, ...], List[Any]] = {(): documents}
+        for prefix, getter in self._containers.items():
+            containers[prefix] = list(map(getter, containers[prefix[:-1]]))
+        result: Dict[str, List[Any]] = {}
+        for name, prefix, leaf, fallback in self._plan:
+            try:
+                column = list(map(itemgetter(leaf), containers[prefix]))
+            except KeyError:
+                if fallback is None:
+                    raise
+                column = [container.get(leaf) for container in containers[prefix]]
+            if fallback is not None and None in column:
+                column = [fallback(document) if value is None else value for document, value in zip(documents, column)]
+            result[name] = column
+        return result
+
+    def __call__(self, documents: Iterable[Mapping[str, Any]], columnar: bool = False) -> Any:
+        return self.columns(documents) if columnar else self.rows(documents)
+
+
+def compile_normalizer(spec: NormalizerSpec) -> CompiledNormalizer:
+    return CompiledNormalizer(spec)
+
+
+_TIMESTAMP: Tuple[str, ...] = ("@timestamp", "timestamp")
+
+WAIT_STATS = NormalizerSpec(
+    name="wait_stats",
+    marker="wait_stats.type",
+    columns={
+        "timestamp": _TIMESTAMP,
+        "instance": ("mssql_instance",),
+        "wait_type": ("wait_stats.type",),
+        "wait_time_ms": ("wait_stats.time_ms",),
+        "waiting_tasks": ("wait_stats.tasks",),
+    },
+)
+
+BLOCKING = NormalizerSpec(
+    name="blocking",
+    marker="blocking.session_id",
+    columns={
+        "timestamp": _TIMESTAMP,
+        "session_id": ("blocking.session_id",),
+        "blocking_session_id": ("blocking.blocking_session_id",),
+        "wait_type": ("blocking.wait_type",),
+        "duration_ms": ("blocking.duration_ms",),
+        "query_text": ("blocking.query_text",),
+    },
+)
+
+IO = NormalizerSpec(
+    name="io",
+    marker="io.database",
+    columns={
+        "timestamp": _TIMESTAMP,
+        "instance": ("mssql_instance",),
+        "database": ("io.database",),
+        "file": ("io.file",),
+        "read_bytes": ("io.read_bytes",),
+        "write_bytes": ("io.write_bytes",),
+        "read_latency_ms": ("io.read_latency_ms",),
+        "write_latency_ms": ("io.write_latency_ms",),
+    },
+)
+
+QUERY_STORE = NormalizerSpec(
+    name="query_store",
+    marker="query_store.query_hash",
+    columns={
+        "timestamp": _TIMESTAMP,
+        "instance": ("mssql_instance",),
+        "query_hash": ("query_store.query_hash",),
+        "executions": ("query_store.executions",),
+        "avg_duration_ms": ("query_store.avg_duration_ms",),
+        "avg_cpu_ms": ("query_store.avg_cpu_ms",),
+        "logical_reads": ("query_store.logical_reads",),
+    },
+)
+
+CPU = NormalizerSpec(
+    name="cpu",
+    marker="cpu.percent",
+    columns={
+        "timestamp": _TIMESTAMP,
+        "instance": ("mssql_instance",),
+        "cpu_percent": ("cpu.percent",),
+        "sql_cpu_percent": ("cpu.sql_percent",),
+        "scheduler_runnable_tasks": ("cpu.runnable_tasks",),
+    },
+)
+
+NORMALIZERS: Dict[str, CompiledNormalizer] = {
+    spec.name: compile_normalizer(spec) for spec in (WAIT_STATS, BLOCKING, IO, QUERY_STORE, CPU)
+}
+
+
+def get_normalizer(signal: str) -> CompiledNormalizer:
+    try:
+        return NORMALIZERS[signal]
+    except KeyError as exc:
+        raise ValueError(f"Unknown telemetry signal '{signal}'") from exc
+
+
+def signals() -> Sequence[str]:
+    return tuple(NORMALIZERS)
+
+
+__all__ = [
+    "BLOCKING",
+    "CPU",
+    "CompiledNormalizer",
+    "IO",
+    "NORMALIZERS",
+    "NormalizerSpec",
+    "QUERY_STORE",
+    "WAIT_STATS",
+    "compile_normalizer",
+    "get_normalizer",
+    "signals",
+]
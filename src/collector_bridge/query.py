@@ -0,0 +1,78 @@
+"""Structured Elastic query builder for telemetry searches.
+
+:class:`TelemetryQuery` renders a ``bool`` query whose clauses all sit in filter
+context (``term``, ``exists``, ``range`` and an optional ``query_string``), so
+Elastic skips scoring, can cache each clause in the node query cache and can
+pre-filter shards whose ``@timestamp`` range does not overlap the request.
+
+The telemetry indices are dynamically mapped, so ``mssql_instance`` is a ``text``
+field with a ``keyword`` subfield; exact instance filters and ``terms``
+aggregations use :data:`INSTANCE_KEYWORD_FIELD`. Indices whose template maps the
+field as ``keyword`` itself (``llm_insights``) pass :data:`INSTANCE_FIELD` instead.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+TIMESTAMP_FIELD = "@timestamp"
+INSTANCE_FIELD = "mssql_instance"
+INSTANCE_KEYWORD_FIELD = f"{INSTANCE_FIELD}.keyword"
+
+
+@dataclass(frozen=True)
+class TelemetryQuery:
+    instance: Optional[str] = None
+    exists: Tuple[str, ...] = ()
+    start: Optional[str] = None
+    end: Optional[str] = None
+    text: Optional[str] = None
+    order: str = "desc"
+    instance_field: str = INSTANCE_KEYWORD_FIELD
+
+    def for_instance(self, instance: Optional[str], field: str = INSTANCE_KEYWORD_FIELD) -> "TelemetryQuery":
+        return replace(self, instance=instance, instance_field=field)
+
+    def with_field(self, path: Optional[str]) -> "TelemetryQuery":
+        return replace(self, exists=self.exists + (path,)) if path else self
+
+    def between(self, start: Optional[str] = None, end: Optional[str] = None) -> "TelemetryQuery":
+        """Bound ``@timestamp`` to ``[start, end)``; values may be ISO timestamps or date math."""
+
+        return replace(self, start=start or self.start, end=end or self.end)
+
+    def matching(self, text: Optional[str]) -> "TelemetryQuery":
+        return replace(self, text=None if not text or text.strip() == "*" else text)
+
+    def ascending(self) -> "TelemetryQuery":
+        return replace(self, order="asc")
+
+    def to_dict(self) -> Dict[str, Any]:
+        filters: List[Dict[str, Any]] = []
+        if self.instance:
+            filters.append({"term": {self.instance_field: self.instance}})
+        filters.extend({"exists": {"field": path}} for path in self.exists)
+        if self.start or self.end:
+            bounds: Dict[str, str] = {}
+            if self.start:
+                bounds["gte"] = self.start
+            if self.end:
+                bounds["lt"] = self.end
+            filters.append({"range": {TIMESTAMP_FIELD: bounds}})
+        if self.text:
+            filters.append({"query_string": {"query": self.text}})
+        if not filters:
+            return {"match_all": {}}
+        return {"bool": {"filter": filters}}
+
+    def sort(self) -> List[Dict[str, Any]]:
+        return [{TIMESTAMP_FIELD: {"order": self.order, "unmapped_type": "date"}}]
+
+
+def relative_window(window: str) -> str:
+    """Date math for the last ``window`` (e.g. ``15m``), rounded to the minute so it stays cacheable."""
+
+    return f"now-{window}/m"
+
+
+__all__ = ["INSTANCE_FIELD", "INSTANCE_KEYWORD_FIELD", "TIMESTAMP_FIELD", "TelemetryQuery", "relative_window"]
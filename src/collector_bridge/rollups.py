@@ -0,0 +1,369 @@
+"""Background rollups of Elastic telemetry served from in-process buffers."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.collector_bridge import aggregations
+from src.collector_bridge.query import TelemetryQuery
+from src.common.config import ElasticSettings
+
+LOGGER = logging.getLogger(__name__)
+
+# resolution label -> (bucket width in seconds, buckets retained)
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {
+    "1m": (60, 60),
+    "5m": (300, 72),
+    "1h": (3600, 48),
+}
+
+
+# Wait types aggregated per instance on every poll; larger ``top`` requests go to Elastic.
+ROLLUP_WAIT_TYPES = 50
+# Consecutive failed polls stretch the poll interval up to this multiple.
+MAX_BACKOFF = 8
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _seconds(duration: str) -> int:
+    """``"15m"`` -> 900; accepts the ``<number><s|m|h|d>`` form the API validates."""
+
+    return int(duration[:-1]) * _UNIT_SECONDS[duration[-1]]
+
+
+class _Bucket:
+    __slots__ = ("start", "waits", "events", "peak_blocked_sessions", "total_duration_ms", "max_duration_ms")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.waits: Dict[str, List[float]] = {}  # wait_type -> [wait_time_ms, waiting_tasks, samples]
+        self.events = 0
+        self.peak_blocked_sessions = 0
+        self.total_duration_ms = 0.0
+        self.max_duration_ms = 0.0
+
+
+class RollupStore:
+    """Rolling 1m/5m/1h buckets of wait and blocking totals per instance.
+
+    Each instance keeps one bounded deque of buckets per resolution, so memory is
+    fixed by :data:`RESOLUTIONS` regardless of how long the worker runs.
+    :meth:`top_waits` and :meth:`blocking_histogram` answer the ``/metrics``
+    summaries from the buckets while the worker keeps them fresh and they cover
+    the requested window, and return ``None`` otherwise, including for an
+    instance the buffers hold no buckets for.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._lock = Lock()
+        self._clock = clock
+        self._series: Dict[Tuple[str, str], Deque[_Bucket]] = {}
+        self._fresh_as_of: Optional[float] = None
+        self._valid_until: Optional[float] = None
+        self._covered_since: Optional[float] = None
+
+    @property
+    def fresh_as_of(self) -> Optional[float]:
+        return self._fresh_as_of
+
+    def _bucket(self, instance: str, resolution: str, at: float) -> _Bucket:
+        width, retained = RESOLUTIONS[resolution]
+        start = int(at // width) * width
+        series = self._series.setdefault((instance, resolution), deque(maxlen=retained))
+        if not series or series[-1].start != start:
+            series.append(_Bucket(start))
+        return series[-1]
+
+    def ingest(self, at: float, waits: List[Dict[str, Any]], blocking: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for resolution in RESOLUTIONS:
+                for row in waits:
+                    bucket = self._bucket(row["instance"], resolution, at)
+                    totals = bucket.waits.setdefault(row["wait_type"], [0.0, 0.0, 0])
+                    totals[0] += row.get("wait_time_ms") or 0.0
+                    totals[1] += row.get("waiting_tasks") or 0.0
+                    totals[2] += row.get("samples") or 0
+                for row in blocking:
+                    bucket = self._bucket(row["instance"], resolution, at)
+                    bucket.events += row.get("events") or 0
+                    peak = int(row.get("blocked_sessions") or 0)
+                    bucket.peak_blocked_sessions = max(bucket.peak_blocked_sessions, peak)
+                    bucket.total_duration_ms += row.get("total_duration_ms") or 0.0
+                    bucket.max_duration_ms = max(bucket.max_duration_ms, row.get("max_duration_ms") or 0.0)
+
+    def mark_fresh(self, at: float, valid_until: Optional[float] = None, since: Optional[float] = None) -> None:
+        """Record that data up to ``at`` is ingested; summaries are served from buffers until ``valid_until``.
+
+        ``since`` is where the ingested range starts; only the first value is kept.
+        """
+
+        with self._lock:
+            self._fresh_as_of = at
+            self._valid_until = valid_until
+            if self._covered_since is None:
+                self._covered_since = since
+
+    def _serving(self, window: float) -> bool:
+        with self._lock:
+            now = self._clock()
+            return (
+                self._valid_until is not None
+                and now <= self._valid_until
+                and self._covered_since is not None
+                and self._covered_since <= now - window
+            )
+
+    def _window(self, instance: Optional[str], resolution: str, window: float) -> List[Tuple[str, List[_Bucket]]]:
+        width, _ = RESOLUTIONS[resolution]
+        cutoff = self._clock() - window
+        return [
+            (name, [bucket for bucket in buckets if bucket.start + width > cutoff])
+            for name, buckets in self._select(instance, resolution, RESOLUTIONS[resolution][1])
+        ]
+
+    def top_waits(self, instance: Optional[str], window: str, top: int) -> Optional[List[Dict[str, Any]]]:
+        """Rows shaped like :func:`aggregations.parse_top_waits` (without percentiles), or ``None``."""
+
+        seconds = _seconds(window)
+        resolution = next(
+            (name for name, (width, retained) in RESOLUTIONS.items() if width * retained >= seconds), None
+        )
+        if resolution is None or top > ROLLUP_WAIT_TYPES or not self._serving(seconds):
+            return None
+        selected = self._window(instance, resolution, seconds)
+        if not selected:
+            return None
+        rows: List[Dict[str, Any]] = []
+        for name, buckets in selected:
+            merged: Dict[str, List[float]] = {}
+            for bucket in buckets:
+                for wait_type, totals in bucket.waits.items():
+                    target = merged.setdefault(wait_type, [0.0, 0.0, 0])
+                    for position, value in enumerate(totals):
+                        target[position] += value
+            ranked = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:top]
+            rows.extend(
+                {
+                    "instance": name,
+                    "wait_type": wait_type,
+                    "samples": int(totals[2]),
+                    "wait_time_ms": totals[0],
+                    "waiting_tasks": totals[1],
+                    "percentiles": None,
+                }
+                for wait_type, totals in ranked
+            )
+        return rows
+
+    def blocking_histogram(
+        self, instance: Optional[str], window: str, interval: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rows shaped like :func:`aggregations.parse_blocking_histogram` (without percentiles), or ``None``.
+
+        Only intervals equal to a rollup resolution can be served. ``blocked_sessions``
+        is the peak per-poll count rather than an exact distinct count.
+        """
+
+        seconds = _seconds(window)
+        resolution = next((name for name, (width, _) in RESOLUTIONS.items() if width == _seconds(interval)), None)
+        if resolution is None or seconds > RESOLUTIONS[resolution][0] * RESOLUTIONS[resolution][1]:
+            return None
+        if not self._serving(seconds):
+            return None
+        selected = self._window(instance, resolution, seconds)
+        if not selected:
+            return None
+        merged: Dict[int, Dict[str, Any]] = {}
+        for _, buckets in selected:
+            for bucket in buckets:
+                point = merged.setdefault(
+                    bucket.start,
+                    {"events": 0, "blocked_sessions": 0, "total_duration_ms": 0.0, "max_duration_ms": 0.0},
+                )
+                point["events"] += bucket.events
+                point["blocked_sessions"] += bucket.peak_blocked_sessions
+                point["total_duration_ms"] += bucket.total_duration_ms
+                point["max_duration_ms"] = max(point["max_duration_ms"], bucket.max_duration_ms)
+        return [
+            {"timestamp": _iso(start), **point, "percentiles": None} for start, point in sorted(merged.items())
+        ]
+
+    def _select(self, instance: Optional[str], resolution: str, points: int) -> List[Tuple[str, List[_Bucket]]]:
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unsupported rollup resolution '{resolution}'")
+        with self._lock:
+            return [
+                (name, list(series)[-points:])
+                for (name, res), series in sorted(self._series.items())
+                if res == resolution and (instance is None or name == instance)
+            ]
+
+    def freshness(self) -> Dict[str, Any]:
+        """When the buffers were last complete up to, as ``fresh_as_of`` and ``age_seconds``.
+
+        Both are ``None`` until the first poll succeeds.
+        """
+
+        fresh = self._fresh_as_of
+        return {
+            "fresh_as_of": _iso(fresh) if fresh else None,
+            "age_seconds": round(self._clock() - fresh, 3) if fresh else None,
+        }
+
+    def _envelope(self, resolution: str, series: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"resolution": resolution, **self.freshness(), "series": series}
+
+    def wait_series(
+        self, instance: Optional[str] = None, resolution: str = "1m", points: int = 60, top: int = 5
+    ) -> Dict[str, Any]:
+        series = []
+        for name, buckets in self._select(instance, resolution, points):
+            rows = []
+            for bucket in buckets:
+                ranked = sorted(bucket.waits.items(), key=lambda item: item[1][0], reverse=True)
+                rows.append(
+                    {
+                        "bucket": _iso(bucket.start),
+                        "wait_time_ms": sum(totals[0] for totals in bucket.waits.values()),
+                        "waiting_tasks": sum(totals[1] for totals in bucket.waits.values()),
+                        "top_waits": [
+                            {"wait_type": wait_type, "wait_time_ms": totals[0], "waiting_tasks": totals[1]}
+                            for wait_type, totals in ranked[:top]
+                        ],
+                    }
+                )
+            series.append({"instance": name, "points": rows})
+        return self._envelope(resolution, series)
+
+    def blocking_series(
+        self, instance: Optional[str] = None, resolution: str = "1m", points: int = 60
+    ) -> Dict[str, Any]:
+        series = [
+            {
+                "instance": name,
+                "points": [
+                    {
+                        "bucket": _iso(bucket.start),
+                        "events": bucket.events,
+                        "peak_blocked_sessions": bucket.peak_blocked_sessions,
+                        "total_duration_ms": bucket.total_duration_ms,
+                        "max_duration_ms": bucket.max_duration_ms,
+                    }
+                    for bucket in buckets
+                ],
+            }
+            for name, buckets in self._select(instance, resolution, points)
+        ]
+        return self._envelope(resolution, series)
+
+
+class RollupWorker:
+    """Periodically aggregates the telemetry written since the last poll into a :class:`RollupStore`.
+
+    Each poll sends two ``size=0`` aggregation requests bounded by the exact
+    ``[previous poll, now - rollup_ingest_lag)`` range, so slices neither overlap
+    nor leave gaps, and documents still in flight through the ingest pipeline are
+    picked up by a later slice instead of being missed. Both requests split the
+    slice into 1m ``date_histogram`` buckets, and each is folded into the rollup
+    bucket of its own minute. ``settings_provider`` is
+    read every cycle so configuration updates take effect without a restart; a
+    ``rollup_interval`` of zero pauses polling. While Elastic is unreachable the
+    poll interval doubles up to :data:`MAX_BACKOFF` times and the outage is logged
+    once, when it starts and when it ends.
+    """
+
+    def __init__(
+        self,
+        store: RollupStore,
+        settings_provider: Callable[[], ElasticSettings],
+        client_provider: Callable[[ElasticSettings], Any],
+        clock: Callable[[], float] = time.time,
+    ):
+        self._store = store
+        self._settings_provider = settings_provider
+        self._client_provider = client_provider
+        self._clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self._last_end: Optional[float] = None
+        self._failures = 0
+
+    async def run_once(self) -> None:
+        settings = self._settings_provider()
+        client = self._client_provider(settings)
+        now = self._clock()
+        end = now - settings.rollup_ingest_lag
+        start = self._last_end if self._last_end is not None else end - max(settings.rollup_interval, 1.0)
+        waits_response, blocking_response = await asyncio.gather(
+            client.aggregate_metrics(
+                TelemetryQuery().with_field("wait_stats.type").between(_iso(start), _iso(end)).to_dict(),
+                aggregations.per_minute_aggs(
+                    aggregations.top_waits_aggs(instances=settings.rollup_instances, wait_types=ROLLUP_WAIT_TYPES)
+                ),
+            ),
+            client.aggregate_metrics(
+                TelemetryQuery().with_field("blocking.session_id").between(_iso(start), _iso(end)).to_dict(),
+                aggregations.per_minute_aggs(
+                    aggregations.blocking_by_instance_aggs(instances=settings.rollup_instances)
+                ),
+            ),
+        )
+        minutes: Dict[float, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+        for at, rows in aggregations.parse_per_minute(waits_response, aggregations.parse_top_waits):
+            minutes.setdefault(at, ([], []))[0].extend(rows)
+        for at, rows in aggregations.parse_per_minute(blocking_response, aggregations.parse_blocking_by_instance):
+            minutes.setdefault(at, ([], []))[1].extend(rows)
+        for at, (waits, blocking) in sorted(minutes.items()):
+            self._store.ingest(at, waits, blocking)
+        first = self._last_end is None
+        self._last_end = end
+        self._store.mark_fresh(end, now + 2 * settings.rollup_interval, since=start if first else None)
+
+    async def _poll(self) -> None:
+        try:
+            await self.run_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self._failures += 1
+            if self._failures == 1:
+                LOGGER.warning("Telemetry rollup poll failed; backing off until Elastic recovers: %s", exc)
+            else:
+                LOGGER.debug("Telemetry rollup poll failed again (%s in a row): %s", self._failures, exc)
+        else:
+            if self._failures:
+                LOGGER.info("Telemetry rollup polling recovered after %s failed polls", self._failures)
+            self._failures = 0
+
+    async def _loop(self) -> None:
+        while True:
+            interval = self._settings_provider().rollup_interval
+            if interval > 0:
+                await self._poll()
+            backoff = min(2 ** self._failures, MAX_BACKOFF) if self._failures else 1
+            await asyncio.sleep(interval * backoff if interval > 0 else 30)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop(), name="telemetry-rollups")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+__all__ = ["MAX_BACKOFF", "RESOLUTIONS", "ROLLUP_WAIT_TYPES", "RollupStore", "RollupWorker"]
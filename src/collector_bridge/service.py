@@ -1,29 +1,323 @@
 """Service layer for Elastic-backed telemetry access."""
 from __future__ import annotations
 
-from typing import Dict, List
+import functools
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Tuple
 
-from src.collector_bridge.elastic_client import ElasticTelemetryClient
+from src.collector_bridge import aggregations, normalizers
+from src.collector_bridge.cache import TelemetryCache, query_key
+from src.collector_bridge.elastic_client import (
+    BLOCKING_FIELDS,
+    WAIT_STATS_FIELDS,
+    AsyncElasticTelemetryClient,
+    ElasticTelemetryClient,
+)
+from src.collector_bridge.export import export_ndjson
+from src.collector_bridge.query import TelemetryQuery, relative_window
 
 
-class TelemetryService:
-    def __init__(self, client: ElasticTelemetryClient):
+def _waits_query(instance: str | None) -> TelemetryQuery:
+    return TelemetryQuery().with_field(normalizers.WAIT_STATS.marker).for_instance(instance)
+
+
+def _blocking_query(instance: str | None) -> TelemetryQuery:
+    return TelemetryQuery().with_field(normalizers.BLOCKING.marker).for_instance(instance)
+
+
+def _signal_query(marker: str | None, instance: str | None) -> TelemetryQuery:
+    return TelemetryQuery().with_field(marker).for_instance(instance)
+
+
+def _key_query(query: TelemetryQuery) -> Dict[str, Any]:
+    return {"query": query.to_dict(), "sort": query.sort()}
+
+
+class _Call(NamedTuple):
+    """One client call requested by an operation; ``cache`` holds the :func:`query_key` parts minus the index."""
+
+    method: str
+    kwargs: Dict[str, Any]
+    index: str = "metrics_index"
+    cache: Optional[Tuple[Any, ...]] = None
+
+
+def _metrics_call(query: TelemetryQuery, size: int, fields: Any = None) -> _Call:
+    kwargs = {"query": query, "size": size, "fields": fields}
+    return _Call("fetch_metrics", kwargs, cache=("search", _key_query(query), size, fields))
+
+
+def _logs_call(query: TelemetryQuery, size: int) -> _Call:
+    return _Call("fetch_logs", {"query": query, "size": size}, "logs_index", ("search", _key_query(query), size))
+
+
+def _aggregate_call(query: Dict[str, Any], aggs: Dict[str, Any]) -> _Call:
+    return _Call("aggregate_metrics", {"query": query, "aggs": aggs}, cache=("aggs", {"query": query, "aggs": aggs}, 0))
+
+
+class _Request(NamedTuple):
+    """A client call plus the function that turns its result into the operation's return value."""
+
+    call: _Call
+    finish: Callable[[Any], Any]
+
+
+def _fleet_results(
+    normalizer: normalizers.CompiledNormalizer, instances: List[str], responses: List[Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """Normalize every instance's hits in one pass and key the rows (or error) by instance."""
+
+    documents: List[Dict[str, Any]] = []
+    spans: Dict[str, tuple] = {}
+    results: Dict[str, Dict[str, Any]] = {}
+    for position, instance in enumerate(instances):
+        response = responses[position] if position < len(responses) else {"error": "missing response"}
+        error = response.get("error")
+        if error:
+            reason = (error.get("reason") or error.get("type")) if isinstance(error, dict) else str(error)
+            results[instance] = {"error": reason}
+            continue
+        hits = [hit.get("_source", {}) for hit in response.get("hits", {}).get("hits", [])]
+        spans[instance] = (len(documents), len(documents) + len(hits))
+        documents.extend(hits)
+    rows = normalizer.rows(documents)
+    for instance, (start, end) in spans.items():
+        results[instance] = {"rows": rows[start:end]}
+    return results
+
+
+class _TelemetryRequests:
+    """Request building shared by the sync and async services.
+
+    Each ``_*_request`` method builds the :class:`_Request` for one operation, so the
+    query building and normalization live here once and the two services only differ
+    in whether their thin public methods await ``_call``.
+    """
+
+    def __init__(self, client: Any, cache: TelemetryCache | None = None):
         self._client = client
+        self._cache = cache
+
+    def _cache_key(self, call: _Call) -> Tuple[Any, ...]:
+        kind, query, *rest = call.cache
+        return query_key(kind, getattr(self._client.settings, call.index), query, *rest)
+
+    def _load(self, call: _Call) -> Callable[[], Any]:
+        return functools.partial(getattr(self._client, call.method), **call.kwargs)
+
+    def _latest_waits_request(
+        self, instance: str | None, limit: int, start: str | None, end: str | None
+    ) -> _Request:
+        query = _waits_query(instance).between(start, end)
+        return _Request(_metrics_call(query, limit, WAIT_STATS_FIELDS), self._client.normalize_wait_stats)
+
+    def _blocking_sessions_request(
+        self, instance: str | None, limit: int, start: str | None, end: str | None
+    ) -> _Request:
+        query = _blocking_query(instance).between(start, end)
+        return _Request(_metrics_call(query, limit, BLOCKING_FIELDS), self._client.normalize_blocking)
+
+    @staticmethod
+    def _raw_logs_request(search: str, limit: int, start: str | None, end: str | None) -> _Request:
+        return _Request(_logs_call(TelemetryQuery().matching(search).between(start, end), limit), list)
+
+    @staticmethod
+    def _latest_signal_request(
+        signal: str, instance: str | None, limit: int, columnar: bool, start: str | None, end: str | None
+    ) -> _Request:
+        normalizer = normalizers.get_normalizer(signal)
+        query = _signal_query(normalizer.spec.marker, instance).between(start, end)
+        call = _metrics_call(query, limit, normalizer.fields)
+        return _Request(call, functools.partial(normalizer, columnar=columnar))
+
+    @staticmethod
+    def _fleet_discover_request(signal: str, discover_window: str) -> _Request:
+        marker = normalizers.get_normalizer(signal).spec.marker
+        discover = _signal_query(marker, None).between(relative_window(discover_window))
+        call = _aggregate_call(discover.to_dict(), aggregations.instances_aggs())
+        return _Request(call, aggregations.parse_instances)
+
+    @staticmethod
+    def _fleet_signal_request(
+        signal: str, instances: List[str], limit: int, start: str | None, end: str | None
+    ) -> _Request:
+        normalizer = normalizers.get_normalizer(signal)
+        queries = [_signal_query(normalizer.spec.marker, name).between(start, end) for name in instances]
+        call = _Call("msearch_metrics", {"queries": queries, "size": limit, "fields": normalizer.fields})
+        return _Request(call, functools.partial(_fleet_results, normalizer, instances))
+
+    @staticmethod
+    def _top_waits_request(
+        instance: str | None, window: str, top: int, start: str | None, end: str | None
+    ) -> _Request:
+        query = _waits_query(instance).between(start or relative_window(window), end)
+        call = _aggregate_call(query.to_dict(), aggregations.top_waits_aggs(wait_types=top))
+        return _Request(call, aggregations.parse_top_waits)
+
+    @staticmethod
+    def _blocking_timeline_request(
+        instance: str | None, window: str, interval: str, start: str | None, end: str | None
+    ) -> _Request:
+        query = _blocking_query(instance).between(start or relative_window(window), end)
+        call = _aggregate_call(query.to_dict(), aggregations.blocking_histogram_aggs(interval))
+        return _Request(call, aggregations.parse_blocking_histogram)
+
+
+class TelemetryService(_TelemetryRequests):
+    def __init__(self, client: ElasticTelemetryClient, cache: TelemetryCache | None = None):
+        super().__init__(client, cache)
+
+    def _call(self, request: _Request) -> Any:
+        call, load = request.call, self._load(request.call)
+        if self._cache is None or call.cache is None:
+            return request.finish(load())
+        return request.finish(self._cache.get_or_load(self._cache_key(call), load))
+
+    def latest_waits(
+        self, instance: str | None = None, limit: int = 50, start: str | None = None, end: str | None = None
+    ) -> List[Dict]:
+        return self._call(self._latest_waits_request(instance, limit, start, end))
+
+    def blocking_sessions(
+        self, instance: str | None = None, limit: int = 50, start: str | None = None, end: str | None = None
+    ) -> List[Dict]:
+        return self._call(self._blocking_sessions_request(instance, limit, start, end))
+
+    def raw_logs(self, search: str, limit: int = 100, start: str | None = None, end: str | None = None) -> List[Dict]:
+        return self._call(self._raw_logs_request(search, limit, start, end))
+
+    def latest_signal(
+        self,
+        signal: str,
+        instance: str | None = None,
+        limit: int = 50,
+        columnar: bool = False,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> Any:
+        return self._call(self._latest_signal_request(signal, instance, limit, columnar, start, end))
+
+    def fleet_signal(
+        self,
+        signal: str,
+        instances: List[str] | None = None,
+        limit: int = 50,
+        discover_window: str = "1h",
+        start: str | None = None,
+        end: str | None = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        if not instances:
+            instances = self._call(self._fleet_discover_request(signal, discover_window))
+        if not instances:
+            return {}
+        return self._call(self._fleet_signal_request(signal, instances, limit, start, end))
+
+    def top_waits(
+        self,
+        instance: str | None = None,
+        window: str = "15m",
+        top: int = 10,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> List[Dict]:
+        return self._call(self._top_waits_request(instance, window, top, start, end))
+
+    def blocking_timeline(
+        self,
+        instance: str | None = None,
+        window: str = "1h",
+        interval: str = "1m",
+        start: str | None = None,
+        end: str | None = None,
+    ) -> List[Dict]:
+        return self._call(self._blocking_timeline_request(instance, window, interval, start, end))
+
+
+class AsyncTelemetryService(_TelemetryRequests):
+    """Awaitable counterpart of :class:`TelemetryService` used by the API routes."""
+
+    def __init__(self, client: AsyncElasticTelemetryClient, cache: TelemetryCache | None = None):
+        super().__init__(client, cache)
+
+    async def _call(self, request: _Request) -> Any:
+        call, load = request.call, self._load(request.call)
+        if self._cache is None or call.cache is None:
+            return request.finish(await load())
+        return request.finish(await self._cache.aget_or_load(self._cache_key(call), load))
+
+    async def latest_waits(
+        self, instance: str | None = None, limit: int = 50, start: str | None = None, end: str | None = None
+    ) -> List[Dict]:
+        return await self._call(self._latest_waits_request(instance, limit, start, end))
+
+    async def blocking_sessions(
+        self, instance: str | None = None, limit: int = 50, start: str | None = None, end: str | None = None
+    ) -> List[Dict]:
+        return await self._call(self._blocking_sessions_request(instance, limit, start, end))
+
+    async def raw_logs(
+        self, search: str, limit: int = 100, start: str | None = None, end: str | None = None
+    ) -> List[Dict]:
+        return await self._call(self._raw_logs_request(search, limit, start, end))
+
+    async def latest_signal(
+        self,
+        signal: str,
+        instance: str | None = None,
+        limit: int = 50,
+        columnar: bool = False,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> Any:
+        return await self._call(self._latest_signal_request(signal, instance, limit, columnar, start, end))
+
+    async def fleet_signal(
+        self,
+        signal: str,
+        instances: List[str] | None = None,
+        limit: int = 50,
+        discover_window: str = "1h",
+        start: str | None = None,
+        end: str | None = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        if not instances:
+            instances = await self._call(self._fleet_discover_request(signal, discover_window))
+        if not instances:
+            return {}
+        return await self._call(self._fleet_signal_request(signal, instances, limit, start, end))
 
-    def latest_waits(self, instance: str | None = None, limit: int = 50) -> List[Dict]:
-        query = "mssql_instance:\"{}\"".format(instance) if instance else "*"
-        documents = self._client.fetch_metrics(query=query, size=limit)
-        return self._client.normalize_wait_stats(documents)
+    async def top_waits(
+        self,
+        instance: str | None = None,
+        window: str = "15m",
+        top: int = 10,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> List[Dict]:
+        return await self._call(self._top_waits_request(instance, window, top, start, end))
 
-    def blocking_sessions(self, instance: str | None = None, limit: int = 50) -> List[Dict]:
-        query = "blocking.session_id:*"
-        if instance:
-            query += f" AND mssql_instance:\"{instance}\""
-        documents = self._client.fetch_metrics(query=query, size=limit)
-        return self._client.normalize_blocking(documents)
+    async def blocking_timeline(
+        self,
+        instance: str | None = None,
+        window: str = "1h",
+        interval: str = "1m",
+        start: str | None = None,
+        end: str | None = None,
+    ) -> List[Dict]:
+        return await self._call(self._blocking_timeline_request(instance, window, interval, start, end))
 
-    def raw_logs(self, search: str, limit: int = 100) -> List[Dict]:
-        return self._client.fetch_logs(query=search, size=limit)
+    def export(
+        self,
+        dataset: str,
+        search: str = "*",
+        page_size: int = 1000,
+        cursor: Optional[str] = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> AsyncIterator[bytes]:
+        settings = self._client.settings
+        index = settings.logs_index if dataset == "logs" else settings.metrics_index
+        query = TelemetryQuery().matching(search).between(start, end)
+        return export_ndjson(self._client, index, query, page_size=page_size, cursor=cursor)
 
 
-__all__ = ["TelemetryService"]
+__all__ = ["AsyncTelemetryService", "TelemetryService"]
@@ -2,9 +2,9 @@
 from __future__ import annotations
 
 import os
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 try:  # pragma: no cover - import guard exercised implicitly
     import yaml
@@ -22,6 +22,22 @@ class ElasticSettings:
     ca_cert: Optional[str]
     insecure: bool = False
     request_timeout: int = 60
+    connections_per_node: int = 10
+    http_compress: bool = True
+    keep_alive: bool = True
+    sniff_on_start: bool = False
+    sniff_on_node_failure: bool = False
+    sniff_interval: Optional[float] = None
+    cache_ttl: float = 5.0
+    cache_max_entries: int = 256
+    rollup_interval: float = 60.0
+    rollup_instances: int = 200
+    rollup_ingest_lag: float = 30.0
+    insights_index: str = "llm_insights"
+    insights_batch_size: int = 200
+    insights_flush_interval: float = 5.0
+    insights_buffer_size: int = 5000
+    insights_retries: int = 3
 
 
 @dataclass
@@ -30,6 +46,36 @@ class OllamaSettings:
     model: str
     temperature: float = 0.1
     max_tokens: int = 512
+    connect_timeout: float = 5.0
+    request_timeout: float = 120.0
+    max_concurrency: int = 2
+    max_queue: int = 8
+    queue_timeout: float = 30.0
+    retries: int = 2
+    retry_backoff: float = 0.5
+    cache_ttl: float = 3600.0
+    cache_max_entries: int = 256
+    cache_dir: Optional[str] = None
+    cache_disk_max_entries: int = 4096
+    prompt_token_budget: int = 2000
+    prompt_top_k: int = 25
+    job_workers: int = 2
+    job_max_pending: int = 100
+    job_retention: float = 900.0
+
+
+@dataclass
+class SQLServerTarget:
+    """One monitored instance; unset fields inherit from the enclosing :class:`SQLServerSettings`."""
+
+    name: str
+    server: Optional[str] = None
+    dsn: Optional[str] = None
+    database: Optional[str] = None
+    username: Optional[str] = None
+    password: Optional[str] = None
+    login_timeout: Optional[int] = None
+    query_timeout: Optional[int] = None
 
 
 @dataclass
@@ -41,6 +87,18 @@ class SQLServerSettings:
     database: str = "master"
     encrypt: bool = True
     trust_server_certificate: bool = False
+    login_timeout: int = 5
+    query_timeout: int = 30
+    pool_size: int = 5
+    pool_timeout: float = 10.0
+    pool_idle_timeout: float = 300.0
+    pool_max_lifetime: float = 1800.0
+    sample_interval: float = 15.0
+    sample_history: int = 240
+    sample_limit: int = 50
+    fleet_workers: int = 32
+    subscriber_buffer: int = 16
+    targets: List[SQLServerTarget] = field(default_factory=list)
 
 
 @dataclass
@@ -59,6 +117,32 @@ def _resolve_env(value: Optional[str]) -> Optional[str]:
     return value
 
 
+def _optional_float(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _parse_target(raw: Dict[str, Any]) -> SQLServerTarget:
+    server = _resolve_env(raw.get("server"))
+    dsn = _resolve_env(raw.get("dsn"))
+    login_timeout = raw.get("login_timeout")
+    query_timeout = raw.get("query_timeout")
+    name = raw.get("name") or server or dsn
+    if not name:
+        raise ValueError(f"sqlserver.targets entry needs a name, server or dsn: {raw!r}")
+    return SQLServerTarget(
+        name=str(name),
+        server=server,
+        dsn=dsn,
+        database=raw.get("database"),
+        username=_resolve_env(raw.get("username")),
+        password=_resolve_env(raw.get("password")),
+        login_timeout=int(login_timeout) if login_timeout is not None else None,
+        query_timeout=int(query_timeout) if query_timeout is not None else None,
+    )
+
+
 def _parse_settings(raw: Dict[str, Any]) -> AppConfig:
     elastic_raw = raw.get("elastic", {})
     ollama_raw = raw.get("ollama", {})
@@ -73,6 +157,22 @@ def _parse_settings(raw: Dict[str, Any]) -> AppConfig:
         ca_cert=_resolve_env(elastic_raw.get("ca_cert")),
         insecure=bool(elastic_raw.get("insecure", False)),
         request_timeout=int(elastic_raw.get("request_timeout", 60)),
+        connections_per_node=int(elastic_raw.get("connections_per_node", 10)),
+        http_compress=bool(elastic_raw.get("http_compress", True)),
+        keep_alive=bool(elastic_raw.get("keep_alive", True)),
+        sniff_on_start=bool(elastic_raw.get("sniff_on_start", False)),
+        sniff_on_node_failure=bool(elastic_raw.get("sniff_on_node_failure", False)),
+        sniff_interval=_optional_float(elastic_raw.get("sniff_interval")),
+        cache_ttl=float(elastic_raw.get("cache_ttl", 5.0)),
+        cache_max_entries=int(elastic_raw.get("cache_max_entries", 256)),
+        rollup_interval=float(elastic_raw.get("rollup_interval", 60.0)),
+        rollup_instances=int(elastic_raw.get("rollup_instances", 200)),
+        rollup_ingest_lag=float(elastic_raw.get("rollup_ingest_lag", 30.0)),
+        insights_index=elastic_raw.get("insights_index", "llm_insights"),
+        insights_batch_size=int(elastic_raw.get("insights_batch_size", 200)),
+        insights_flush_interval=float(elastic_raw.get("insights_flush_interval", 5.0)),
+        insights_buffer_size=int(elastic_raw.get("insights_buffer_size", 5000)),
+        insights_retries=int(elastic_raw.get("insights_retries", 3)),
     )
 
     ollama = OllamaSettings(
@@ -80,6 +180,22 @@ def _parse_settings(raw: Dict[str, Any]) -> AppConfig:
         model=ollama_raw.get("model", "llama3"),
         temperature=float(ollama_raw.get("temperature", 0.1)),
         max_tokens=int(ollama_raw.get("max_tokens", 512)),
+        connect_timeout=float(ollama_raw.get("connect_timeout", 5.0)),
+        request_timeout=float(ollama_raw.get("request_timeout", 120.0)),
+        max_concurrency=int(ollama_raw.get("max_concurrency", 2)),
+        max_queue=int(ollama_raw.get("max_queue", 8)),
+        queue_timeout=float(ollama_raw.get("queue_timeout", 30.0)),
+        retries=int(ollama_raw.get("retries", 2)),
+        retry_backoff=float(ollama_raw.get("retry_backoff", 0.5)),
+        cache_ttl=float(ollama_raw.get("cache_ttl", 3600.0)),
+        cache_max_entries=int(ollama_raw.get("cache_max_entries", 256)),
+        cache_dir=_resolve_env(ollama_raw.get("cache_dir")),
+        cache_disk_max_entries=int(ollama_raw.get("cache_disk_max_entries", 4096)),
+        prompt_token_budget=int(ollama_raw.get("prompt_token_budget", 2000)),
+        prompt_top_k=int(ollama_raw.get("prompt_top_k", 25)),
+        job_workers=int(ollama_raw.get("job_workers", 2)),
+        job_max_pending=int(ollama_raw.get("job_max_pending", 100)),
+        job_retention=float(ollama_raw.get("job_retention", 900.0)),
     )
 
     sqlserver = SQLServerSettings(
@@ -90,6 +206,18 @@ def _parse_settings(raw: Dict[str, Any]) -> AppConfig:
         database=sql_raw.get("database", "master"),
         encrypt=bool(sql_raw.get("encrypt", True)),
         trust_server_certificate=bool(sql_raw.get("trust_server_certificate", False)),
+        login_timeout=int(sql_raw.get("login_timeout", 5)),
+        query_timeout=int(sql_raw.get("query_timeout", 30)),
+        pool_size=int(sql_raw.get("pool_size", 5)),
+        pool_timeout=float(sql_raw.get("pool_timeout", 10.0)),
+        pool_idle_timeout=float(sql_raw.get("pool_idle_timeout", 300.0)),
+        pool_max_lifetime=float(sql_raw.get("pool_max_lifetime", 1800.0)),
+        sample_interval=float(sql_raw.get("sample_interval", 15.0)),
+        sample_history=int(sql_raw.get("sample_history", 240)),
+        sample_limit=int(sql_raw.get("sample_limit", 50)),
+        fleet_workers=int(sql_raw.get("fleet_workers", 32)),
+        subscriber_buffer=int(sql_raw.get("subscriber_buffer", 16)),
+        targets=[_parse_target(item) for item in sql_raw.get("targets") or []],
     )
 
     return AppConfig(elastic=elastic, ollama=ollama, sqlserver=sqlserver)
@@ -131,6 +259,7 @@ def config_to_dict(config: AppConfig) -> Dict[str, Any]:
     raw["elastic"] = _strip_none(raw["elastic"])
     raw["ollama"] = _strip_none(raw["ollama"])
     raw["sqlserver"] = _strip_none(raw["sqlserver"])
+    raw["sqlserver"]["targets"] = [_strip_none(target) for target in raw["sqlserver"]["targets"]]
     return raw
 
 
@@ -139,6 +268,7 @@ __all__ = [
     "ElasticSettings",
     "OllamaSettings",
     "SQLServerSettings",
+    "SQLServerTarget",
     "config_to_dict",
     "load_config",
 ]
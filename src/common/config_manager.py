@@ -1,10 +1,11 @@
 """Helpers for managing persistent application configuration."""
 from __future__ import annotations
 
+import logging
 import os
 from pathlib import Path
 from threading import RLock
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 try:  # pragma: no cover - PyYAML import guard
     import yaml
@@ -13,6 +14,8 @@ except Exception:  # pragma: no cover
 
 from .config import AppConfig, config_to_dict, load_config
 
+LOGGER = logging.getLogger(__name__)
+
 
 def _default_config_path(path: Optional[os.PathLike[str] | str] = None) -> Path:
     if path:
@@ -41,11 +44,26 @@ class ConfigManager:
         self._path = _default_config_path(path)
         self._lock = RLock()
         self._config = load_config(self._path)
+        self._listeners: List[Callable[[AppConfig], None]] = []
 
     @property
     def path(self) -> Path:
         return self._path
 
+    def subscribe(self, listener: Callable[[AppConfig], None]) -> None:
+        """Register ``listener`` to be called with the new config after every reload or update."""
+
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _notify(self, config: AppConfig) -> None:
+        # The new config is already persisted; one failing listener must not fail the update or skip the rest.
+        for listener in list(self._listeners):
+            try:
+                listener(config)
+            except Exception:
+                LOGGER.exception("Config listener %r failed", listener)
+
     def get_config(self) -> AppConfig:
         with self._lock:
             return self._config
@@ -53,6 +71,7 @@ class ConfigManager:
     def reload(self) -> AppConfig:
         with self._lock:
             self._config = load_config(self._path)
+            self._notify(self._config)
             return self._config
 
     def update(self, payload: Dict[str, Any]) -> AppConfig:
@@ -68,6 +87,7 @@ class ConfigManager:
             with self._path.open("w", encoding="utf-8") as fh:
                 yaml.safe_dump(merged, fh, sort_keys=False)
             self._config = load_config(self._path)
+            self._notify(self._config)
             return self._config
 
 
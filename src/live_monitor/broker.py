@@ -0,0 +1,266 @@
+"""Shared push subscriptions: one collection per topic and interval, fanned out as row deltas."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from src.common.config import SQLServerSettings
+from src.live_monitor.dmv_queries import DMVCollector
+from src.live_monitor.fleet import OPERATIONS, resolve_targets
+from src.live_monitor.sampler import DMVSampler
+
+LOGGER = logging.getLogger(__name__)
+
+Fetch = Callable[[str, str], Awaitable[List[Dict[str, Any]]]]
+
+# Pushable section -> columns identifying a row between collections.
+ROW_KEYS: Dict[str, Tuple[str, ...]] = {
+    "waits": ("wait_type",),
+    "blocking": ("session_id",),
+    "sessions": ("session_id",),
+    # Indexed telemetry documents never change: new ones arrive as upserts, aged-out ones as removals.
+    "metrics/wait-stats": ("timestamp", "instance", "wait_type"),
+    "metrics/blocking": ("timestamp", "session_id"),
+}
+# Sections pushed from Elastic telemetry -> the AsyncTelemetryService method behind their /metrics route.
+METRIC_SECTIONS = {"metrics/wait-stats": "latest_waits", "metrics/blocking": "blocking_sessions"}
+# Columns that differ on every collection even when the row did not change, such as
+# the DMV queries' GETDATE() stamp; messages carry the collection time in ``at``.
+VOLATILE_COLUMNS = frozenset({"collection_time"})
+
+
+def row_key(section: str, row: Dict[str, Any]) -> str:
+    """Identity of ``row`` within ``section``; sent with every row so clients never have to rebuild it."""
+
+    return "|".join(str(row.get(column)) for column in ROW_KEYS[section])
+
+
+def _entries(rows: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"key": key, "row": row} for key, row in rows.items()]
+
+
+def _changed(before: Optional[Dict[str, Any]], after: Dict[str, Any]) -> bool:
+    if before is None:
+        return True
+    columns = (before.keys() | after.keys()) - VOLATILE_COLUMNS
+    return any(before.get(column) != after.get(column) for column in columns)
+
+
+def diff_rows(
+    section: str, previous: Dict[str, Dict[str, Any]], rows: List[Dict[str, Any]]
+) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]], List[str]]:
+    """Rows keyed by :func:`row_key`, the new or changed ``{"key", "row"}`` entries, and the keys that disappeared.
+
+    :data:`VOLATILE_COLUMNS` are ignored when comparing a row with its previous version.
+    """
+
+    current = {row_key(section, row): row for row in rows}
+    upserts = _entries({key: row for key, row in current.items() if _changed(previous.get(key), row)})
+    removed = [key for key in previous if key not in current]
+    return current, upserts, removed
+
+
+def dmv_fetcher(sampler: DMVSampler, collector_factory: Callable[[SQLServerSettings], DMVCollector]) -> Fetch:
+    """Rows for ``(section, instance)``: the sampler's fresh sample when it covers the instance, else a query."""
+
+    def collect(section: str, instance: str) -> List[Dict[str, Any]]:
+        settings = sampler.settings
+        ring = sampler.fresh_ring(instance)
+        rows = ring.latest(section) if ring is not None else None
+        if rows is not None:
+            return rows
+        target = resolve_targets(settings).get(instance)
+        if target is None:
+            raise KeyError(f"Unknown instance '{instance}'")
+        collector = collector_factory(target)
+        return getattr(collector, OPERATIONS[section])(limit=settings.sample_limit)
+
+    async def fetch(section: str, instance: str) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(collect, section, instance)
+
+    return fetch
+
+
+def metrics_fetcher(service_provider: Callable[[], Any], settings_provider: Callable[[], SQLServerSettings]) -> Fetch:
+    """Rows for a :data:`METRIC_SECTIONS` topic from Elastic; an empty instance means every instance."""
+
+    async def fetch(section: str, instance: str) -> List[Dict[str, Any]]:
+        method = getattr(service_provider(), METRIC_SECTIONS[section])
+        return await method(instance=instance or None, limit=settings_provider().sample_limit)
+
+    return fetch
+
+
+def section_fetcher(dmv: Fetch, metrics: Fetch) -> Fetch:
+    """Route :data:`METRIC_SECTIONS` to ``metrics`` and every other section to ``dmv``."""
+
+    async def fetch(section: str, instance: str) -> List[Dict[str, Any]]:
+        return await (metrics if section in METRIC_SECTIONS else dmv)(section, instance)
+
+    return fetch
+
+
+class Subscription:
+    """One client's bounded message queue; ``None`` is delivered once the subscriber has been dropped."""
+
+    def __init__(self, section: str, instance: str, maxsize: int):
+        self.section = section
+        self.instance = instance
+        self.dropped = False
+        self._queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=max(1, maxsize))
+
+    def offer(self, message: Dict[str, Any]) -> bool:
+        if self.dropped:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+            return False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next message; raises :class:`asyncio.TimeoutError` when nothing arrives within ``timeout``."""
+
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+
+class _Topic:
+    __slots__ = ("section", "instance", "subscribers", "rows", "task")
+
+    def __init__(self, section: str, instance: str):
+        self.section = section
+        self.instance = instance
+        self.subscribers: Set[Subscription] = set()
+        self.rows: Optional[Dict[str, Dict[str, Any]]] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class LiveBroker:
+    """Collects each subscribed ``(section, instance)`` topic once per ``sample_interval`` for all its subscribers.
+
+    A topic's collection task runs only while it has subscribers. A new subscriber
+    first receives a ``snapshot`` of the topic's current rows; after that only
+    ``delta`` messages with new or changed rows (``upserts``) and the keys of rows
+    that disappeared (``removed``) are sent, and nothing is sent when nothing
+    changed. Snapshot rows and upserts are ``{"key", "row"}`` entries carrying the
+    :func:`row_key` that ``removed`` later refers to. Each subscriber has a queue
+    of ``subscriber_buffer`` messages; one that falls that far behind is dropped
+    rather than buffered without bound. Must be used from the event loop.
+    """
+
+    def __init__(
+        self,
+        settings_provider: Callable[[], SQLServerSettings],
+        fetch: Fetch,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._settings_provider = settings_provider
+        self._fetch = fetch
+        self._clock = clock
+        self._topics: Dict[Tuple[str, str], _Topic] = {}
+        self._stats = {"collections": 0, "messages": 0, "dropped_subscribers": 0}
+
+    def subscribe(self, section: str, instance: str) -> Subscription:
+        if section not in ROW_KEYS:
+            raise ValueError(f"Unsupported section '{section}'")
+        topic = self._topics.get((section, instance))
+        if topic is None:
+            topic = self._topics[(section, instance)] = _Topic(section, instance)
+            topic.task = asyncio.get_running_loop().create_task(
+                self._produce(topic), name=f"live-push-{section}-{instance}"
+            )
+        subscription = Subscription(section, instance, self._settings_provider().subscriber_buffer)
+        topic.subscribers.add(subscription)
+        if topic.rows is not None:
+            subscription.offer(self._snapshot(topic))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        topic = self._topics.get((subscription.section, subscription.instance))
+        if topic is None:
+            return
+        topic.subscribers.discard(subscription)
+        if not topic.subscribers:
+            del self._topics[(topic.section, topic.instance)]
+            if topic.task is not None:
+                topic.task.cancel()
+
+    def _snapshot(self, topic: _Topic) -> Dict[str, Any]:
+        return {
+            "type": "snapshot",
+            "section": topic.section,
+            "instance": topic.instance,
+            "key": list(ROW_KEYS[topic.section]),
+            "at": self._clock(),
+            "rows": _entries(topic.rows or {}),
+        }
+
+    def _publish(self, topic: _Topic, message: Dict[str, Any]) -> None:
+        for subscription in list(topic.subscribers):
+            if subscription.offer(message):
+                self._stats["messages"] += 1
+            else:
+                LOGGER.info("Dropping slow %s subscriber for %s", topic.section, topic.instance)
+                topic.subscribers.discard(subscription)
+                self._stats["dropped_subscribers"] += 1
+
+    async def _produce(self, topic: _Topic) -> None:
+        while True:
+            message: Optional[Dict[str, Any]]
+            try:
+                rows = await self._fetch(topic.section, topic.instance)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                LOGGER.warning("Live %s collection for %s failed: %s", topic.section, topic.instance, exc)
+                message = {"type": "error", "at": self._clock(), "detail": str(exc) or type(exc).__name__}
+            else:
+                self._stats["collections"] += 1
+                first = topic.rows is None
+                topic.rows, upserts, removed = diff_rows(topic.section, topic.rows or {}, rows)
+                if first:
+                    message = self._snapshot(topic)
+                elif upserts or removed:
+                    message = {"type": "delta", "at": self._clock(), "upserts": upserts, "removed": removed}
+                else:
+                    message = None
+            if message is not None:
+                self._publish(topic, message)
+            interval = self._settings_provider().sample_interval
+            await asyncio.sleep(interval if interval > 0 else 15)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "topics": [
+                {"section": topic.section, "instance": topic.instance, "subscribers": len(topic.subscribers)}
+                for topic in self._topics.values()
+            ],
+        }
+
+    async def close(self) -> None:
+        tasks = [topic.task for topic in self._topics.values() if topic.task is not None]
+        self._topics.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+__all__ = [
+    "LiveBroker",
+    "METRIC_SECTIONS",
+    "ROW_KEYS",
+    "Subscription",
+    "VOLATILE_COLUMNS",
+    "diff_rows",
+    "dmv_fetcher",
+    "metrics_fetcher",
+    "row_key",
+    "section_fetcher",
+]
@@ -3,13 +3,43 @@ from __future__ import annotations
 
 import contextlib
 import logging
-from dataclasses import dataclass
-from typing import Iterator
+import threading
+import time
+from collections import deque
+from dataclasses import astuple, dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
 
 from src.common.config import SQLServerSettings
 
 LOGGER = logging.getLogger(__name__)
 
+# SQLServerSettings fields used to open or pool connections.
+_CONNECTION_FIELDS = (
+    "dsn",
+    "server",
+    "username",
+    "password",
+    "database",
+    "encrypt",
+    "trust_server_certificate",
+    "login_timeout",
+    "query_timeout",
+    "pool_size",
+    "pool_timeout",
+    "pool_idle_timeout",
+    "pool_max_lifetime",
+)
+
+
+def instance_name(settings: SQLServerSettings) -> str:
+    """The key every live-monitor component uses for the configured instance."""
+
+    return settings.server or settings.dsn or "default"
+
+
+def is_configured(settings: SQLServerSettings) -> bool:
+    return bool(settings.server or settings.dsn)
+
 
 @dataclass
 class ConnectionResult:
@@ -17,6 +47,250 @@ class ConnectionResult:
     cursor: any
 
 
+@dataclass
+class _PooledConnection:
+    connection: Any
+    created_at: float
+    last_used: float = field(default=0.0)
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of ODBC connections for a single connection string.
+
+    Checkout validates the connection with a ``SELECT 1`` ping and discards it when
+    the ping fails, when it has been idle longer than ``idle_timeout`` or when it is
+    older than ``max_lifetime``. Callers block for up to ``timeout`` seconds when all
+    ``max_size`` connections are checked out.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 5,
+        timeout: float = 10.0,
+        idle_timeout: float = 300.0,
+        max_lifetime: float = 1800.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._connect = connect
+        self._max_size = max(1, max_size)
+        self._timeout = timeout
+        self._idle_timeout = idle_timeout
+        self._max_lifetime = max_lifetime
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._idle: Deque[_PooledConnection] = deque()
+        self._in_use = 0
+        self._closed = False
+        self._stats = {"checkouts": 0, "creations": 0, "waits": 0, "timeouts": 0, "discarded": 0, "ping_failures": 0}
+
+    def _expired(self, pooled: _PooledConnection, now: float) -> bool:
+        if self._max_lifetime and now - pooled.created_at >= self._max_lifetime:
+            return True
+        return bool(self._idle_timeout) and now - pooled.last_used >= self._idle_timeout
+
+    def _discard(self, pooled: _PooledConnection) -> _PooledConnection:
+        """Count ``pooled`` as discarded; the caller closes it once the lock is released."""
+
+        self._stats["discarded"] += 1
+        return pooled
+
+    @staticmethod
+    def _close(discarded: List[_PooledConnection]) -> None:
+        for pooled in discarded:
+            with contextlib.suppress(Exception):
+                pooled.connection.close()
+
+    @staticmethod
+    def _rollback(pooled: _PooledConnection) -> bool:
+        """End any transaction the caller left open (ODBC connections default to ``autocommit=False``)."""
+
+        try:
+            pooled.connection.rollback()
+            return True
+        except Exception:
+            LOGGER.debug("Discarding pooled SQL Server connection that failed to roll back")
+            return False
+
+    def _ping(self, pooled: _PooledConnection) -> bool:
+        try:
+            cursor = pooled.connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                with contextlib.suppress(Exception):
+                    cursor.close()
+            return True
+        except Exception:
+            LOGGER.debug("Discarding pooled SQL Server connection that failed validation")
+            return False
+
+    def evict_idle(self) -> int:
+        """Close idle connections past their idle timeout or lifetime; returns how many were evicted."""
+
+        now = self._clock()
+        with self._cond:
+            keep = [pooled for pooled in self._idle if not self._expired(pooled, now)]
+            evicted = [self._discard(pooled) for pooled in self._idle if self._expired(pooled, now)]
+            self._idle = deque(keep)
+            if evicted:
+                self._cond.notify_all()
+        self._close(evicted)
+        return len(evicted)
+
+    def acquire(self) -> _PooledConnection:
+        deadline = self._clock() + self._timeout
+        while True:
+            candidate: Optional[_PooledConnection] = None
+            create = False
+            stale: List[_PooledConnection] = []
+            try:
+                with self._cond:
+                    waited = False
+                    while True:
+                        if self._closed:
+                            raise RuntimeError("SQL Server connection pool is closed")
+                        now = self._clock()
+                        while self._idle:
+                            pooled = self._idle.pop()
+                            if self._expired(pooled, now):
+                                stale.append(self._discard(pooled))
+                                continue
+                            candidate = pooled
+                            break
+                        if candidate is not None or self._in_use + len(self._idle) < self._max_size:
+                            break
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise TimeoutError(
+                                f"Timed out after {self._timeout}s waiting for a SQL Server connection"
+                            )
+                        if not waited:
+                            self._stats["waits"] += 1
+                            waited = True
+                        self._cond.wait(remaining)
+                    self._in_use += 1
+                    create = candidate is None
+            finally:
+                self._close(stale)
+            if create:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                now = self._clock()
+                with self._cond:
+                    self._stats["creations"] += 1
+                    self._stats["checkouts"] += 1
+                return _PooledConnection(connection=connection, created_at=now, last_used=now)
+            if self._ping(candidate):
+                with self._cond:
+                    self._stats["checkouts"] += 1
+                return candidate
+            with self._cond:
+                self._stats["ping_failures"] += 1
+                self._discard(candidate)
+                self._in_use -= 1
+            self._close([candidate])
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def release(self, pooled: _PooledConnection, discard: bool = False) -> None:
+        """Return ``pooled`` to the pool after rolling back any open transaction.
+
+        The connection is closed instead when ``discard`` is set, the rollback
+        fails, the pool is closed or the connection has expired.
+        """
+
+        discard = discard or not self._rollback(pooled)
+        with self._cond:
+            self._in_use -= 1
+            pooled.last_used = self._clock()
+            discard = discard or self._closed or self._expired(pooled, pooled.last_used)
+            if discard:
+                self._discard(pooled)
+            else:
+                self._idle.append(pooled)
+            self._cond.notify()
+        if discard:
+            self._close([pooled])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self._stats, "idle": len(self._idle), "in_use": self._in_use, "max_size": self._max_size}
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = [self._discard(pooled) for pooled in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        self._close(idle)
+
+
+def connection_settings_key(settings: SQLServerSettings) -> Tuple[Any, ...]:
+    """The settings that shape connections and pools; other fields can change without reconnecting."""
+
+    return (
+        tuple(getattr(settings, name) for name in _CONNECTION_FIELDS),
+        tuple(astuple(target) for target in settings.targets),
+    )
+
+
+class ConnectionPoolRegistry:
+    """One :class:`ConnectionPool` per distinct connection string, shared across requests."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._settings_key: Optional[Tuple[Any, ...]] = None
+
+    def configure(self, settings: SQLServerSettings) -> None:
+        """Close every pool when the connection settings change; other configuration changes keep them."""
+
+        key = connection_settings_key(settings)
+        with self._lock:
+            changed = self._settings_key is not None and key != self._settings_key
+            self._settings_key = key
+        if changed:
+            LOGGER.info("SQL Server connection settings changed; closing pooled connections")
+            self.close()
+
+    def get(self, conn_str: str, factory: Callable[[], ConnectionPool]) -> ConnectionPool:
+        with self._lock:
+            pool = self._pools.get(conn_str)
+            if pool is None:
+                pool = self._pools[conn_str] = factory()
+            return pool
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            pools = list(self._pools.items())
+        return [{"server": _redact(conn_str), **pool.stats()} for conn_str, pool in pools]
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            pools = list(self._pools.values())
+        return sum(pool.evict_idle() for pool in pools)
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+
+def _redact(conn_str: str) -> str:
+    return ";".join(part for part in conn_str.split(";") if not part.upper().startswith("PWD="))
+
+
 def _import_pyodbc():  # pragma: no cover - trivial wrapper
     try:
         import pyodbc  # type: ignore
@@ -29,8 +303,13 @@ def _import_pyodbc():  # pragma: no cover - trivial wrapper
 
 
 class SQLServerConnectionManager:
-    def __init__(self, settings: SQLServerSettings):
+    def __init__(self, settings: SQLServerSettings, pools: ConnectionPoolRegistry | None = None):
         self._settings = settings
+        self._pools = pools
+
+    @property
+    def instance(self) -> str:
+        return instance_name(self._settings)
 
     def _build_connection_string(self) -> str:
         if self._settings.dsn:
@@ -51,12 +330,52 @@ class SQLServerConnectionManager:
                 parts.append("TrustServerCertificate=yes")
         return ";".join(parts)
 
+    def _open(self, conn_str: str) -> Any:
+        pyodbc = _import_pyodbc()
+        LOGGER.debug("Connecting to SQL Server", extra={"conn_str": _redact(conn_str)})
+        connection = pyodbc.connect(conn_str, timeout=self._settings.login_timeout)
+        connection.timeout = self._settings.query_timeout
+        return connection
+
+    def _pool(self, conn_str: str) -> ConnectionPool:
+        settings = self._settings
+        return self._pools.get(
+            conn_str,
+            lambda: ConnectionPool(
+                lambda: self._open(conn_str),
+                max_size=settings.pool_size,
+                timeout=settings.pool_timeout,
+                idle_timeout=settings.pool_idle_timeout,
+                max_lifetime=settings.pool_max_lifetime,
+            ),
+        )
+
     @contextlib.contextmanager
     def connect(self) -> Iterator[ConnectionResult]:
-        pyodbc = _import_pyodbc()
         conn_str = self._build_connection_string()
-        LOGGER.debug("Connecting to SQL Server", extra={"conn_str": conn_str})
-        connection = pyodbc.connect(conn_str, timeout=5)
+        if self._pools is None:
+            with self._connect_unpooled(conn_str) as ctx:
+                yield ctx
+            return
+        pool = self._pool(conn_str)
+        pooled = pool.acquire()
+        cursor = None
+        failed = False
+        try:
+            cursor = pooled.connection.cursor()
+            yield ConnectionResult(connection=pooled.connection, cursor=cursor)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if cursor is not None:
+                with contextlib.suppress(Exception):
+                    cursor.close()
+            pool.release(pooled, discard=failed)
+
+    @contextlib.contextmanager
+    def _connect_unpooled(self, conn_str: str) -> Iterator[ConnectionResult]:
+        connection = self._open(conn_str)
         cursor = connection.cursor()
         try:
             yield ConnectionResult(connection=connection, cursor=cursor)
@@ -67,4 +386,12 @@ class SQLServerConnectionManager:
                 connection.close()
 
 
-__all__ = ["SQLServerConnectionManager", "ConnectionResult"]
+__all__ = [
+    "ConnectionPool",
+    "ConnectionPoolRegistry",
+    "ConnectionResult",
+    "SQLServerConnectionManager",
+    "connection_settings_key",
+    "instance_name",
+    "is_configured",
+]
@@ -1,11 +1,96 @@
 """DMV query helpers for live monitoring."""
 from __future__ import annotations
 
-from typing import Iterable, List, Mapping
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
 
 from src.live_monitor.connection import SQLServerConnectionManager
+from src.live_monitor.query_stats import QueryStatsTracker
+from src.live_monitor.wait_deltas import WaitDeltaEngine
 
-WAIT_STATS_SQL = """
+# Idle and background waits that say nothing about workload, after the exclusion list
+# commonly used with sys.dm_os_wait_stats; names starting with BENIGN_WAIT_PREFIXES are
+# excluded as well.
+BENIGN_WAIT_TYPES = (
+    "CHECKPOINT_QUEUE",
+    "CHKPT",
+    "CLR_AUTO_EVENT",
+    "CLR_MANUAL_EVENT",
+    "CLR_SEMAPHORE",
+    "CXCONSUMER",
+    "DBMIRROR_DBM_EVENT",
+    "DBMIRROR_EVENTS_QUEUE",
+    "DBMIRROR_WORKER_QUEUE",
+    "DBMIRRORING_CMD",
+    "DIRTY_PAGE_POLL",
+    "DISPATCHER_QUEUE_SEMAPHORE",
+    "EXECSYNC",
+    "FSAGENT",
+    "FT_IFTS_SCHEDULER_IDLE_WAIT",
+    "FT_IFTSHC_MUTEX",
+    "HADR_CLUSAPI_CALL",
+    "HADR_FILESTREAM_IOMGR_IOCOMPLETION",
+    "HADR_LOGCAPTURE_WAIT",
+    "HADR_NOTIFICATION_DEQUEUE",
+    "HADR_TIMER_TASK",
+    "HADR_WORK_QUEUE",
+    "KSOURCE_WAKEUP",
+    "LAZYWRITER_SLEEP",
+    "LOGMGR_QUEUE",
+    "MEMORY_ALLOCATION_EXT",
+    "ONDEMAND_TASK_QUEUE",
+    "PARALLEL_REDO_DRAIN_WORKER",
+    "PARALLEL_REDO_LOG_CACHE",
+    "PARALLEL_REDO_TRAN_LIST",
+    "PARALLEL_REDO_WORKER_SYNC",
+    "PARALLEL_REDO_WORKER_WAIT_WORK",
+    "PREEMPTIVE_OS_FLUSHFILEBUFFERS",
+    "PREEMPTIVE_XE_GETTARGETSTATE",
+    "PVS_PREALLOCATE",
+    "PWAIT_ALL_COMPONENTS_INITIALIZED",
+    "PWAIT_DIRECTLOGCONSUMER_GETNEXT",
+    "PWAIT_EXTENSIBILITY_CLEANUP_TASK",
+    "QDS_ASYNC_QUEUE",
+    "QDS_CLEANUP_STALE_QUERIES_TASK_MAIN_LOOP_SLEEP",
+    "QDS_PERSIST_TASK_MAIN_LOOP_SLEEP",
+    "QDS_SHUTDOWN_QUEUE",
+    "REDO_THREAD_PENDING_WORK",
+    "REQUEST_FOR_DEADLOCK_SEARCH",
+    "RESOURCE_QUEUE",
+    "SERVER_IDLE_CHECK",
+    "SNI_HTTP_ACCEPT",
+    "SOS_WORK_DISPATCHER",
+    "SP_SERVER_DIAGNOSTICS_SLEEP",
+    "SQLTRACE_BUFFER_FLUSH",
+    "SQLTRACE_INCREMENTAL_FLUSH_SLEEP",
+    "SQLTRACE_WAIT_ENTRIES",
+    "STARTUP_DEPENDENCY_MANAGER",
+    "UCS_SESSION_REGISTRATION",
+    "VDI_CLIENT_OTHER",
+    "WAIT_FOR_RESULTS",
+    "WAIT_XTP_CKPT_CLOSE",
+    "WAIT_XTP_HOST_WAIT",
+    "WAIT_XTP_OFFLINE_CKPT_NEW_LOG",
+    "WAIT_XTP_RECOVERY",
+    "WAITFOR",
+    "WAITFOR_TASKSHUTDOWN",
+)
+BENIGN_WAIT_PREFIXES = ("BROKER_", "SLEEP_", "XE_")
+
+
+def _active_waits(column: str) -> str:
+    """WHERE-clause condition on the wait type ``column`` that drops benign waits."""
+
+    names = ", ".join(f"N'{name}'" for name in BENIGN_WAIT_TYPES)
+    # ``_`` is a LIKE wildcard, so it is escaped to match literally.
+    prefixes = "".join(
+        f" AND {column} NOT LIKE N'{prefix.replace('_', '[_]')}%'" for prefix in BENIGN_WAIT_PREFIXES
+    )
+    return f"{column} NOT IN ({names}){prefixes}"
+
+
+WAIT_STATS_SQL = f"""
 SELECT TOP (@limit)
     GETDATE() AS collection_time,
     wait_type,
@@ -14,9 +99,23 @@ SELECT TOP (@limit)
     max_wait_time_ms,
     signal_wait_time_ms
 FROM sys.dm_os_wait_stats
+WHERE {_active_waits('wait_type')}
 ORDER BY wait_time_ms DESC;
 """
 
+# Every non-idle counter, unranked: WaitDeltaEngine needs the full set to diff samples.
+CUMULATIVE_WAIT_STATS_SQL = f"""
+SELECT
+    i.sqlserver_start_time,
+    w.wait_type,
+    w.waiting_tasks_count,
+    w.wait_time_ms,
+    w.signal_wait_time_ms
+FROM sys.dm_os_wait_stats AS w
+CROSS JOIN sys.dm_os_sys_info AS i
+WHERE w.waiting_tasks_count > 0 AND {_active_waits('w.wait_type')};
+"""
+
 BLOCKING_SQL = """
 SELECT TOP (@limit)
     GETDATE() AS collection_time,
@@ -46,21 +145,185 @@ WHERE s.is_user_process = 1
 ORDER BY r.cpu_time DESC;
 """
 
+# Plan-cache counters without text or plans; @since limits a poll to entries that ran
+# since the previous one (NULL for the first, full sample).
+QUERY_STATS_SQL = """
+SET NOCOUNT ON;
+DECLARE @since datetime = ?;
+SELECT
+    GETDATE() AS collection_time,
+    i.sqlserver_start_time,
+    CONVERT(varchar(18), qs.query_hash, 1) AS query_hash,
+    CONVERT(varchar(130), qs.plan_handle, 1) AS plan_handle,
+    CONVERT(varchar(130), qs.sql_handle, 1) AS sql_handle,
+    qs.statement_start_offset,
+    qs.statement_end_offset,
+    qs.creation_time,
+    qs.last_execution_time,
+    qs.execution_count,
+    qs.total_worker_time,
+    qs.total_logical_reads,
+    qs.total_elapsed_time
+FROM sys.dm_os_sys_info AS i
+LEFT JOIN sys.dm_exec_query_stats AS qs
+    -- last_execution_time is when the last run started; a run still going at the
+    -- previous sample only shows up once it completes, so compare its end time.
+    ON @since IS NULL
+    OR DATEADD(second, qs.last_elapsed_time / 1000000 + 1, qs.last_execution_time) >= @since;
+"""
+
+# Batch text for a set of sql_handles; {handles} expands to one "(?)" row per handle.
+SQL_TEXT_SQL = """
+SELECT h.sql_handle, t.text
+FROM (VALUES {handles}) AS h(sql_handle)
+CROSS APPLY sys.dm_exec_sql_text(CONVERT(varbinary(64), h.sql_handle, 1)) AS t;
+"""
+
+# Sections returned by DMVCollector.snapshot(); new DMV queries only need an entry here.
+SNAPSHOT_QUERIES: Dict[str, str] = {
+    "waits": WAIT_STATS_SQL,
+    "blocking": BLOCKING_SQL,
+    "sessions": SESSIONS_SQL,
+}
+
+_LIMIT_PARAM = re.compile(r"@limit\b")
+_COLLECTION_TIME = re.compile(r"GETDATE\(\)\s+AS\s+collection_time", re.IGNORECASE)
+
+
+def _with_limit(sql: str) -> str:
+    """Bind the ``@limit`` variable used by the DMV queries to a positional ODBC parameter."""
+
+    return "SET NOCOUNT ON;\nDECLARE @limit int = ?;\n" + sql
+
+
+_encode = json.JSONEncoder(default=str, separators=(",", ":"), ensure_ascii=False).encode
+
+
+def _row_prefixes(columns: Sequence[str]) -> List[str]:
+    """Per-column ``{"name":`` / ``,"name":`` fragments, encoded once per result set."""
+
+    return [("{" if position == 0 else ",") + _encode(name) + ":" for position, name in enumerate(columns)]
+
+
+def _ndjson_batch(prefixes: Sequence[str], rows: Iterable[Sequence[object]]) -> bytes:
+    return "".join(
+        "".join(prefix + _encode(value) for prefix, value in zip(prefixes, row)) + "}\n" for row in rows
+    ).encode("utf-8")
+
+
+def build_snapshot_batch(sections: Sequence[str]) -> str:
+    """Combine the named :data:`SNAPSHOT_QUERIES` into one batch returning one result set each.
+
+    Every statement shares a single ``@collection_time`` so the sections line up as one
+    point-in-time view, and each receives its own ``@limit_<section>`` parameter.
+    """
+
+    parts = ["SET NOCOUNT ON;", "DECLARE @collection_time datetime = GETDATE();"]
+    for section in sections:
+        parts.append(f"DECLARE @limit_{section} int = ?;")
+    for section in sections:
+        sql = _LIMIT_PARAM.sub(f"@limit_{section}", SNAPSHOT_QUERIES[section])
+        parts.append(_COLLECTION_TIME.sub("@collection_time AS collection_time", sql).strip())
+    return "\n".join(parts)
+
 
 class DMVCollector:
     def __init__(self, manager: SQLServerConnectionManager):
         self._manager = manager
 
     def _execute(self, sql: str, limit: int) -> List[Mapping[str, object]]:
+        return self._query(_with_limit(sql), limit)
+
+    def _query(self, sql: str, *params: object) -> List[Mapping[str, object]]:
         with self._manager.connect() as ctx:
-            ctx.cursor.execute(sql, limit)
+            ctx.cursor.execute(sql, *params)
             columns = [col[0] for col in ctx.cursor.description]
             rows = ctx.cursor.fetchall()
         return [dict(zip(columns, row)) for row in rows]
 
+    def snapshot(self, limit: int = 25, sections: Optional[Sequence[str]] = None) -> Dict[str, object]:
+        """Collect several DMV views in one round trip by walking the batch's result sets."""
+
+        names = list(sections or SNAPSHOT_QUERIES)
+        unknown = [name for name in names if name not in SNAPSHOT_QUERIES]
+        if unknown:
+            raise ValueError(f"Unknown snapshot sections: {', '.join(unknown)}")
+        result: Dict[str, List[Mapping[str, object]]] = {}
+        with self._manager.connect() as ctx:
+            cursor = ctx.cursor
+            cursor.execute(build_snapshot_batch(names), *([limit] * len(names)))
+            for position, name in enumerate(names):
+                if position and not cursor.nextset():
+                    raise RuntimeError(f"SQL Server returned no result set for snapshot section '{name}'")
+                columns = [col[0] for col in cursor.description]
+                result[name] = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        collection_time = next((rows[0].get("collection_time") for rows in result.values() if rows), None)
+        return {"collection_time": collection_time, **result}
+
+    def stream(self, section: str, limit: int, batch_size: int = 500) -> Iterator[bytes]:
+        """Stream a :data:`SNAPSHOT_QUERIES` section as NDJSON, one chunk per ``fetchmany`` batch.
+
+        Rows are encoded straight from the cursor tuples without building dicts, and
+        the connection is held only while the returned iterator is being consumed.
+        """
+
+        if section not in SNAPSHOT_QUERIES:
+            raise ValueError(f"Unknown DMV section '{section}'")
+        sql = _with_limit(SNAPSHOT_QUERIES[section])
+
+        def chunks() -> Iterator[bytes]:
+            with self._manager.connect() as ctx:
+                cursor = ctx.cursor
+                cursor.execute(sql, limit)
+                prefixes = _row_prefixes([col[0] for col in cursor.description])
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield _ndjson_batch(prefixes, rows)
+
+        return chunks()
+
     def wait_stats(self, limit: int = 25) -> List[Mapping[str, object]]:
         return self._execute(WAIT_STATS_SQL, limit)
 
+    def wait_deltas(self, engine: WaitDeltaEngine, instance: Optional[str] = None, top: int = 10) -> Dict[str, object]:
+        """Sample the cumulative wait counters and return the ``top`` waits since the previous sample."""
+
+        rows = self._query(CUMULATIVE_WAIT_STATS_SQL)
+        name = instance or self._manager.instance
+        start_time = rows[0]["sqlserver_start_time"] if rows else None
+        result = engine.observe(name, rows, start_time=start_time)
+        return {**result, "waits": result["waits"][:top]}
+
+    def top_queries(
+        self, tracker: QueryStatsTracker, instance: Optional[str] = None, top: int = 10, order_by: str = "cpu"
+    ) -> Dict[str, object]:
+        """Sample ``dm_exec_query_stats`` and return the ``top`` query hashes by interval delta."""
+
+        name = instance or self._manager.instance
+        rows = self._query(QUERY_STATS_SQL, tracker.since(name))
+        # The LEFT JOIN always yields the server clock row, so an idle interval still advances the tracker.
+        if rows:
+            plans = [row for row in rows if row["plan_handle"] is not None]
+            tracker.observe(name, plans, rows[0]["collection_time"], rows[0]["sqlserver_start_time"])
+        return self.ranked_queries(tracker, name, top=top, order_by=order_by)
+
+    def ranked_queries(
+        self, tracker: QueryStatsTracker, instance: Optional[str] = None, top: int = 10, order_by: str = "cpu"
+    ) -> Dict[str, object]:
+        """The tracker's latest interval ranked without sampling again; only missing statement text is fetched."""
+
+        name = instance or self._manager.instance
+        result = tracker.top(name, top=top, order_by=order_by)
+        missing = tracker.missing_text(query.get("sql_handle") for query in result["queries"])
+        if missing:
+            sql = SQL_TEXT_SQL.format(handles=", ".join("(?)" for _ in missing))
+            texts = {str(row["sql_handle"]): row["text"] for row in self._query(sql, *missing)}
+            tracker.store_text({handle: texts.get(handle) for handle in missing})
+            result = tracker.top(name, top=top, order_by=order_by)
+        return result
+
     def blocking(self, limit: int = 25) -> List[Mapping[str, object]]:
         return self._execute(BLOCKING_SQL, limit)
 
@@ -68,4 +331,16 @@ class DMVCollector:
         return self._execute(SESSIONS_SQL, limit)
 
 
-__all__ = ["DMVCollector", "WAIT_STATS_SQL", "BLOCKING_SQL", "SESSIONS_SQL"]
+__all__ = [
+    "BENIGN_WAIT_PREFIXES",
+    "BENIGN_WAIT_TYPES",
+    "BLOCKING_SQL",
+    "CUMULATIVE_WAIT_STATS_SQL",
+    "DMVCollector",
+    "QUERY_STATS_SQL",
+    "SQL_TEXT_SQL",
+    "SESSIONS_SQL",
+    "SNAPSHOT_QUERIES",
+    "WAIT_STATS_SQL",
+    "build_snapshot_batch",
+]
@@ -0,0 +1,140 @@
+"""Concurrent DMV collection across the configured SQL Server targets."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.common.config import SQLServerSettings, SQLServerTarget
+from src.live_monitor.connection import instance_name, is_configured
+from src.live_monitor.dmv_queries import DMVCollector
+
+LOGGER = logging.getLogger(__name__)
+
+# Fleet operation -> DMVCollector method; each is called with ``limit``.
+OPERATIONS = {
+    "snapshot": "snapshot",
+    "waits": "wait_stats",
+    "blocking": "blocking",
+    "sessions": "active_sessions",
+}
+
+
+def target_settings(settings: SQLServerSettings, target: SQLServerTarget) -> SQLServerSettings:
+    """Settings for one target: its own fields over the shared ``sqlserver`` section."""
+
+    overrides = {
+        key: value
+        for key, value in (
+            ("server", target.server),
+            ("dsn", target.dsn),
+            ("database", target.database),
+            ("username", target.username),
+            ("password", target.password),
+            ("login_timeout", target.login_timeout),
+            ("query_timeout", target.query_timeout),
+        )
+        if value is not None
+    }
+    if target.server is not None and target.dsn is None:
+        overrides["dsn"] = None
+    return replace(settings, targets=[], **overrides)
+
+
+def resolve_targets(settings: SQLServerSettings) -> Dict[str, SQLServerSettings]:
+    """Every monitored instance by name: the top-level server first, then each listed target.
+
+    The top-level entry is left out only when it has no server or DSN and targets
+    are listed, since there is nothing to connect to.
+    """
+
+    resolved: Dict[str, SQLServerSettings] = {}
+    if is_configured(settings) or not settings.targets:
+        resolved[instance_name(settings)] = replace(settings, targets=[])
+    for target in settings.targets:
+        resolved[target.name] = target_settings(settings, target)
+    return resolved
+
+
+class FleetCollector:
+    """Fans :class:`DMVCollector` calls out to every target on a bounded thread pool.
+
+    At most ``max_workers`` targets are queried at once. Each target gets its own
+    deadline of ``login_timeout + query_timeout`` seconds from the moment its
+    collection starts; a target that misses it is reported with a timeout error
+    and does not hold up the rest of the sweep. The thread pool is twice the
+    concurrency limit so calls abandoned on timeout, which the ODBC query timeout
+    ends shortly after, cannot starve the next sweep.
+    """
+
+    def __init__(self, collector_factory: Callable[[SQLServerSettings], DMVCollector], max_workers: int = 32):
+        self._collector_factory = collector_factory
+        self._max_workers = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.configure(max_workers)
+
+    def configure(self, max_workers: int) -> None:
+        max_workers = max(1, max_workers)
+        if max_workers == self._max_workers:
+            return
+        previous = self._executor
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=2 * max_workers, thread_name_prefix="dmv-fleet")
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    async def _collect(
+        self, semaphore: asyncio.Semaphore, name: str, settings: SQLServerSettings, method: str, limit: int
+    ) -> Dict[str, Any]:
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            deadline = settings.login_timeout + settings.query_timeout
+
+            def call() -> Any:
+                return getattr(self._collector_factory(settings), method)(limit=limit)
+
+            try:
+                data = await asyncio.wait_for(loop.run_in_executor(self._executor, call), timeout=deadline)
+                error = None
+            except asyncio.TimeoutError:
+                data, error = None, f"timed out after {deadline}s"
+            except Exception as exc:
+                LOGGER.warning("DMV collection failed for %s: %s", name, exc)
+                data, error = None, str(exc) or type(exc).__name__
+            latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            return {"latency_ms": latency_ms, "error": error, "data": data}
+
+    async def sweep(
+        self,
+        settings: SQLServerSettings,
+        operation: str = "snapshot",
+        limit: int = 25,
+        targets: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Run ``operation`` against every (or the named) target and key the results by target name."""
+
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unsupported fleet operation '{operation}'")
+        resolved = resolve_targets(settings)
+        if targets:
+            unknown = [name for name in targets if name not in resolved]
+            if unknown:
+                raise ValueError(f"Unknown SQL Server targets: {', '.join(unknown)}")
+            resolved = {name: resolved[name] for name in targets}
+        semaphore = asyncio.Semaphore(self._max_workers)
+        names: List[str] = list(resolved)
+        results = await asyncio.gather(
+            *(self._collect(semaphore, name, resolved[name], OPERATIONS[operation], limit) for name in names)
+        )
+        return dict(zip(names, results))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = ["FleetCollector", "OPERATIONS", "resolve_targets", "target_settings"]
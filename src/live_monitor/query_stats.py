@@ -0,0 +1,177 @@
+"""Interval deltas over ``sys.dm_exec_query_stats`` aggregated by ``query_hash``."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Cumulative counters tracked per plan-cache entry, as (output name, DMV column, scale).
+# Worker and elapsed time are reported by SQL Server in microseconds.
+COUNTERS: Tuple[Tuple[str, str, float], ...] = (
+    ("executions", "execution_count", 1.0),
+    ("cpu_ms", "total_worker_time", 0.001),
+    ("logical_reads", "total_logical_reads", 1.0),
+    ("duration_ms", "total_elapsed_time", 0.001),
+)
+ORDER_BY = {"cpu": "cpu_ms", "reads": "logical_reads", "duration": "duration_ms", "executions": "executions"}
+
+
+def statement_text(text: Optional[str], start_offset: int, end_offset: int) -> Optional[str]:
+    """Slice one statement out of a batch using the DMV's UTF-16 byte offsets."""
+
+    if text is None:
+        return None
+    start = max(start_offset, 0) // 2
+    end = len(text) if end_offset == -1 else end_offset // 2 + 1
+    return text[start:end].strip() or text
+
+
+class _InstanceState:
+    __slots__ = ("counters", "collected_at", "start_time", "last")
+
+    def __init__(self, start_time: Any):
+        # (plan_handle, start offset, end offset) -> (last_execution_time, counter values)
+        self.counters: Dict[Tuple[str, int, int], Tuple[Any, Tuple[float, ...]]] = {}
+        self.collected_at: Any = None
+        self.start_time = start_time
+        self.last: Dict[str, Any] = {"interval_seconds": None, "queries": []}
+
+
+class QueryStatsTracker:
+    """Keeps per-plan counters between samples and ranks ``query_hash`` groups by interval deltas.
+
+    After a full first sample, each poll only needs the plan-cache rows executed
+    since the previous poll (see :meth:`since`): rows that did not run have zero
+    delta. A plan compiled during the interval counts from zero; a known plan whose
+    counters move backwards was recompiled and also counts from zero. Entries idle
+    for longer than ``retention`` are dropped, bounding memory by the active part
+    of the plan cache. Statement text is cached by ``sql_handle`` in an LRU of
+    ``text_cache_size`` batches so each batch is fetched from SQL Server once.
+    """
+
+    def __init__(self, retention: float = 3600.0, text_cache_size: int = 5000):
+        self._retention = retention
+        self._text_cache_size = text_cache_size
+        self._states: Dict[str, _InstanceState] = {}
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = Lock()
+
+    def since(self, instance: str) -> Any:
+        """Server time of the previous sample, or ``None`` when a full sample is needed."""
+
+        with self._lock:
+            state = self._states.get(instance)
+            return state.collected_at if state is not None else None
+
+    def observe(
+        self, instance: str, rows: Sequence[Mapping[str, Any]], collected_at: Any, start_time: Any
+    ) -> Dict[str, Any]:
+        with self._lock:
+            state = self._states.get(instance)
+            if state is None or state.start_time != start_time:
+                state = self._states[instance] = _InstanceState(start_time)
+                baseline = True
+            else:
+                baseline = False
+            previous_at = state.collected_at
+            groups: Dict[str, Dict[str, Any]] = {}
+            for row in rows:
+                key = (str(row["plan_handle"]), int(row["statement_start_offset"]), int(row["statement_end_offset"]))
+                values = tuple(float(row.get(column) or 0) * scale for _, column, scale in COUNTERS)
+                known = state.counters.get(key)
+                state.counters[key] = (row.get("last_execution_time"), values)
+                if baseline:
+                    continue
+                if known is not None:
+                    deltas = [now - before if now >= before else now for now, before in zip(values, known[1])]
+                elif row.get("creation_time") is not None and row["creation_time"] >= previous_at:
+                    deltas = list(values)
+                else:
+                    continue
+                if not any(deltas):
+                    continue
+                query_hash = str(row["query_hash"])
+                group = groups.get(query_hash)
+                if group is None:
+                    group = groups[query_hash] = {"query_hash": query_hash, "plans": 0, "_lead": -1.0}
+                    group.update((name, 0.0) for name, _, _ in COUNTERS)
+                group["plans"] += 1
+                for (name, _, _), delta in zip(COUNTERS, deltas):
+                    group[name] += delta
+                if deltas[1] > group["_lead"]:
+                    group["_lead"] = deltas[1]
+                    group["sql_handle"] = str(row["sql_handle"])
+                    group["statement_start_offset"] = key[1]
+                    group["statement_end_offset"] = key[2]
+            self._prune(state, collected_at)
+            interval = _seconds_between(previous_at, collected_at) if not baseline else None
+            for group in groups.values():
+                group.pop("_lead")
+                executions = group["executions"]
+                group["avg_cpu_ms"] = group["cpu_ms"] / executions if executions else None
+                group["avg_duration_ms"] = group["duration_ms"] / executions if executions else None
+                group["cpu_ms_per_sec"] = group["cpu_ms"] / interval if interval else None
+            state.collected_at = collected_at
+            state.last = {"instance": instance, "interval_seconds": interval, "queries": list(groups.values())}
+            return state.last
+
+    def _prune(self, state: _InstanceState, collected_at: Any) -> None:
+        stale = [
+            key
+            for key, (last_run, _) in state.counters.items()
+            if last_run is not None and _seconds_between(last_run, collected_at) > self._retention
+        ]
+        for key in stale:
+            del state.counters[key]
+
+    def missing_text(self, handles: Iterable[str]) -> List[str]:
+        with self._lock:
+            return sorted({handle for handle in handles if handle and handle not in self._texts})
+
+    def store_text(self, texts: Mapping[str, Optional[str]]) -> None:
+        with self._lock:
+            for handle, text in texts.items():
+                self._texts[handle] = text or ""
+                self._texts.move_to_end(handle)
+            while len(self._texts) > self._text_cache_size:
+                self._texts.popitem(last=False)
+
+    def top(self, instance: str, top: int = 10, order_by: str = "cpu") -> Dict[str, Any]:
+        """The ``top`` query hashes from the latest interval ranked by ``order_by``, with statement text."""
+
+        if order_by not in ORDER_BY:
+            raise ValueError(f"Unsupported order '{order_by}'")
+        metric = ORDER_BY[order_by]
+        with self._lock:
+            state = self._states.get(instance)
+            last = state.last if state is not None else {"interval_seconds": None, "queries": []}
+            ranked = sorted(last["queries"], key=lambda group: group[metric], reverse=True)[:top]
+            queries = []
+            for group in ranked:
+                text = self._texts.get(group.get("sql_handle", ""))
+                if text is not None:
+                    self._texts.move_to_end(group["sql_handle"])
+                statement = statement_text(text, group["statement_start_offset"], group["statement_end_offset"])
+                queries.append({**group, "statement": statement})
+        return {
+            "instance": instance,
+            "interval_seconds": last["interval_seconds"],
+            "order_by": order_by,
+            "queries": queries,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "instances": len(self._states),
+                "tracked_plans": sum(len(state.counters) for state in self._states.values()),
+                "cached_texts": len(self._texts),
+            }
+
+
+def _seconds_between(earlier: Any, later: Any) -> float:
+    delta = later - earlier
+    return delta.total_seconds() if hasattr(delta, "total_seconds") else float(delta)
+
+
+__all__ = ["COUNTERS", "ORDER_BY", "QueryStatsTracker", "statement_text"]
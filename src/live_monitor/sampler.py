@@ -0,0 +1,266 @@
+"""Scheduled DMV sampling into bounded in-memory ring buffers."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from array import array
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from src.common.config import SQLServerSettings
+from src.live_monitor.connection import instance_name, is_configured
+from src.live_monitor.dmv_queries import DMVCollector
+from src.live_monitor.fleet import resolve_targets
+from src.live_monitor.query_stats import QueryStatsTracker
+from src.live_monitor.wait_deltas import WaitDeltaEngine
+
+LOGGER = logging.getLogger(__name__)
+
+# Row sections kept per sample; "wait_deltas" and "top_queries" hold the interval's ranked deltas.
+SECTIONS = ("waits", "blocking", "sessions", "wait_deltas", "top_queries")
+# Consecutive failed samples stretch the sampling interval up to this multiple.
+MAX_BACKOFF = 8
+
+
+class SampleRing:
+    """Fixed-capacity ring of DMV samples.
+
+    Per-sample scalars live in preallocated typed ``array`` columns and the row
+    payloads in a preallocated slot list, so memory is bounded by ``capacity`` no
+    matter how long the sampler runs.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._collected_at = array("d", bytes(8 * self.capacity))
+        self._duration_ms = array("d", bytes(8 * self.capacity))
+        self._blocked_sessions = array("l", [0]) * self.capacity
+        self._active_sessions = array("l", [0]) * self.capacity
+        self._wait_ms_per_sec = array("d", bytes(8 * self.capacity))
+        self._rows: List[Optional[Dict[str, List[Dict[str, Any]]]]] = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, at: float, duration_ms: float, rows: Dict[str, List[Dict[str, Any]]]) -> None:
+        deltas = rows.get("wait_deltas") or []
+        with self._lock:
+            slot = self._next
+            self._collected_at[slot] = at
+            self._duration_ms[slot] = duration_ms
+            self._blocked_sessions[slot] = len(rows.get("blocking") or [])
+            self._active_sessions[slot] = sum(1 for row in rows.get("sessions") or [] if row.get("status"))
+            self._wait_ms_per_sec[slot] = sum(row["wait_ms_per_sec"] for row in deltas)
+            self._rows[slot] = rows
+            self._next = (slot + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _slots(self, samples: int) -> List[int]:
+        count = min(max(samples, 0), self._count)
+        return [(self._next - count + offset) % self.capacity for offset in range(count)]
+
+    def latest_at(self) -> Optional[float]:
+        with self._lock:
+            return self._collected_at[(self._next - 1) % self.capacity] if self._count else None
+
+    def latest(self, section: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            if not self._count:
+                return None
+            return self._rows[(self._next - 1) % self.capacity][section]  # type: ignore[index]
+
+    def history(self, section: str, samples: int) -> List[Dict[str, Any]]:
+        """The last ``samples`` payloads of ``section``, oldest first."""
+
+        with self._lock:
+            return [
+                {"collected_at": self._collected_at[slot], "rows": self._rows[slot][section]}  # type: ignore[index]
+                for slot in self._slots(samples)
+            ]
+
+    def series(self, samples: int) -> Dict[str, List[float]]:
+        """Column-oriented scalars for the last ``samples`` samples, oldest first."""
+
+        with self._lock:
+            slots = self._slots(samples)
+            return {
+                "collected_at": [self._collected_at[slot] for slot in slots],
+                "duration_ms": [self._duration_ms[slot] for slot in slots],
+                "blocked_sessions": [self._blocked_sessions[slot] for slot in slots],
+                "active_sessions": [self._active_sessions[slot] for slot in slots],
+                "wait_ms_per_sec": [self._wait_ms_per_sec[slot] for slot in slots],
+            }
+
+
+class DMVSampler:
+    """Runs the :class:`DMVCollector` queries on a fixed interval and buffers the results.
+
+    Every instance from :func:`resolve_targets` is sampled in turn into its own
+    :class:`SampleRing`, and readers are served from the rings, so load on each
+    SQL Server stays at one snapshot batch plus the wait-counter and query-stats
+    reads per interval, however many clients are watching. ``settings_provider``
+    is read every cycle; a ``sample_interval`` of zero pauses sampling, a new
+    ``sample_history`` reallocates the rings and removed targets lose theirs.
+    Nothing runs until a server, DSN or target is configured. An instance that
+    fails is logged when it starts failing and when it recovers without holding
+    up the others; only while every instance fails does the interval double, up
+    to :data:`MAX_BACKOFF` times.
+    """
+
+    def __init__(
+        self,
+        settings_provider: Callable[[], SQLServerSettings],
+        collector_factory: Callable[[SQLServerSettings], DMVCollector],
+        engine: WaitDeltaEngine,
+        tracker: Optional[QueryStatsTracker] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._settings_provider = settings_provider
+        self._collector_factory = collector_factory
+        self._engine = engine
+        self._tracker = tracker
+        self._clock = clock
+        self._rings: Dict[str, SampleRing] = {}
+        self._failing: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._failures = 0
+
+    @property
+    def settings(self) -> SQLServerSettings:
+        return self._settings_provider()
+
+    @property
+    def instance(self) -> str:
+        return instance_name(self._settings_provider())
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def ring(self, instance: Optional[str] = None) -> Optional[SampleRing]:
+        return self._rings.get(instance or self.instance)
+
+    def fresh_ring(self, instance: Optional[str] = None) -> Optional[SampleRing]:
+        """The instance's ring if its newest sample is within two sampling intervals."""
+
+        settings = self._settings_provider()
+        ring = self.ring(instance)
+        latest = ring.latest_at() if ring is not None else None
+        if latest is None or settings.sample_interval <= 0:
+            return None
+        return ring if self._clock() - latest <= 2 * settings.sample_interval else None
+
+    def sample_once(self) -> None:
+        """Sample every resolved instance; raises the last error only if all of them failed."""
+
+        settings = self._settings_provider()
+        targets = resolve_targets(settings)
+        for name in [name for name in self._rings if name not in targets]:
+            del self._rings[name]
+        self._failing &= set(targets)
+        error: Optional[Exception] = None
+        for name, target in targets.items():
+            try:
+                self._sample_target(name, target, settings)
+            except Exception as exc:
+                error = exc
+                if name not in self._failing:
+                    self._failing.add(name)
+                    LOGGER.warning("DMV sampling of %s failed: %s", name, exc)
+            else:
+                if name in self._failing:
+                    self._failing.discard(name)
+                    LOGGER.info("DMV sampling of %s recovered", name)
+        if error is not None and self._failing >= set(targets):
+            raise error
+
+    def _sample_target(self, name: str, target: SQLServerSettings, settings: SQLServerSettings) -> None:
+        collector = self._collector_factory(target)
+        started = time.perf_counter()
+        snapshot = collector.snapshot(limit=settings.sample_limit)
+        deltas = collector.wait_deltas(self._engine, instance=name, top=settings.sample_limit)
+        queries = (
+            collector.top_queries(self._tracker, instance=name, top=settings.sample_limit)["queries"]
+            if self._tracker is not None
+            else []
+        )
+        duration_ms = (time.perf_counter() - started) * 1000
+        ring = self._rings.get(name)
+        if ring is None or ring.capacity != max(1, settings.sample_history):
+            ring = self._rings[name] = SampleRing(settings.sample_history)
+        ring.append(
+            self._clock(),
+            duration_ms,
+            {
+                "waits": snapshot["waits"],
+                "blocking": snapshot["blocking"],
+                "sessions": snapshot["sessions"],
+                "wait_deltas": deltas["waits"],
+                "top_queries": queries,
+            },
+        )
+
+    async def _sample(self) -> None:
+        try:
+            await asyncio.to_thread(self.sample_once)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self._failures += 1
+            if self._failures == 1:
+                LOGGER.info("DMV sampling failed for every instance; backing off until one recovers: %s", exc)
+            else:
+                LOGGER.debug("DMV sample failed again (%s in a row): %s", self._failures, exc)
+        else:
+            if self._failures:
+                LOGGER.info("DMV sampling recovered after %s failed samples", self._failures)
+            self._failures = 0
+
+    async def _loop(self) -> None:
+        while True:
+            settings = self._settings_provider()
+            interval = settings.sample_interval
+            if interval > 0 and _has_targets(settings):
+                await self._sample()
+            backoff = min(2 ** self._failures, MAX_BACKOFF) if self._failures else 1
+            await asyncio.sleep(interval * backoff if interval > 0 else 30)
+
+    def start(self) -> None:
+        """Start sampling on the running loop, unless SQL Server is not configured yet (see :meth:`configure`)."""
+
+        self._event_loop = asyncio.get_running_loop()
+        if self._task is not None:
+            return
+        if not _has_targets(self._settings_provider()):
+            LOGGER.info("SQL Server is not configured; DMV sampling stays off")
+            return
+        self._task = self._event_loop.create_task(self._loop(), name="dmv-sampler")
+
+    def configure(self, settings: SQLServerSettings) -> None:
+        """Start sampling once a configuration update provides a server; safe to call from any thread."""
+
+        if self._task is None and self._event_loop is not None and _has_targets(settings):
+            self._event_loop.call_soon_threadsafe(self.start)
+
+    async def stop(self) -> None:
+        self._event_loop = None
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+def _has_targets(settings: SQLServerSettings) -> bool:
+    return is_configured(settings) or bool(settings.targets)
+
+
+__all__ = ["DMVSampler", "MAX_BACKOFF", "SECTIONS", "SampleRing"]
@@ -0,0 +1,132 @@
+"""Per-interval deltas over the cumulative ``sys.dm_os_wait_stats`` counters."""
+from __future__ import annotations
+
+import time
+from array import array
+from threading import Lock
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+# Counter columns tracked per wait type, in array order.
+COUNTERS = ("waiting_tasks_count", "wait_time_ms", "signal_wait_time_ms")
+
+
+class _InstanceSample:
+    """Previous sample for one instance: a wait-type index plus one ``array('d')`` per counter."""
+
+    __slots__ = ("positions", "values", "at", "start_time")
+
+    def __init__(self, positions: Dict[str, int], values: List[array], at: float, start_time: Any):
+        self.positions = positions
+        self.values = values
+        self.at = at
+        self.start_time = start_time
+
+
+class WaitDeltaEngine:
+    """Turns successive cumulative wait-stats samples into per-interval deltas and rates.
+
+    ``observe`` compares a sample with the previous one for the same instance. A
+    changed ``sqlserver_start_time`` means the instance restarted and the sample
+    only becomes the new baseline. A drop in total wait time means the counters
+    were cleared with ``DBCC SQLPERF``; every counter is then measured from zero,
+    and the same rule applies to any single counter that moves backwards.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._lock = Lock()
+        self._samples: Dict[str, _InstanceSample] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+
+    def _capture(
+        self, rows: Sequence[Mapping[str, Any]], previous: Optional[_InstanceSample], at: float, start_time: Any
+    ) -> _InstanceSample:
+        positions = dict(previous.positions) if previous else {}
+        for row in rows:
+            positions.setdefault(str(row["wait_type"]), len(positions))
+        values = [array("d", bytes(8 * len(positions))) for _ in COUNTERS]
+        for row in rows:
+            position = positions[str(row["wait_type"])]
+            for counter, column in zip(values, COUNTERS):
+                counter[position] = float(row.get(column) or 0)
+        return _InstanceSample(positions, values, at, start_time)
+
+    def observe(
+        self,
+        instance: str,
+        rows: Sequence[Mapping[str, Any]],
+        start_time: Any = None,
+        at: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Record a cumulative sample and return the deltas since the previous one."""
+
+        at = self._clock() if at is None else at
+        with self._lock:
+            previous = self._samples.get(instance)
+            current = self._capture(rows, previous, at, start_time)
+            self._samples[instance] = current
+            if previous is None or previous.start_time != start_time or at <= previous.at:
+                result = self._baseline(instance, at, "restart" if previous is not None else None)
+            else:
+                result = self._delta(instance, previous, current)
+            self._latest[instance] = result
+            return result
+
+    @staticmethod
+    def _baseline(instance: str, at: float, reset: Optional[str]) -> Dict[str, Any]:
+        return {"instance": instance, "sampled_at": at, "interval_seconds": None, "reset": reset, "waits": []}
+
+    @staticmethod
+    def _delta(instance: str, previous: _InstanceSample, current: _InstanceSample) -> Dict[str, Any]:
+        elapsed = current.at - previous.at
+        old_tasks, old_wait, old_signal = previous.values
+        new_tasks, new_wait, new_signal = current.values
+        cleared = sum(new_wait) < sum(old_wait)
+        known = len(old_wait)
+        waits = []
+        for wait_type, position in current.positions.items():
+            deltas = []
+            for old, new in ((old_tasks, new_tasks), (old_wait, new_wait), (old_signal, new_signal)):
+                before = old[position] if position < known and not cleared else 0.0
+                after = new[position]
+                deltas.append(after - before if after >= before else after)
+            tasks, wait_ms, signal_ms = deltas
+            if not wait_ms and not tasks:
+                continue
+            waits.append(
+                {
+                    "wait_type": wait_type,
+                    "waiting_tasks": tasks,
+                    "wait_time_ms": wait_ms,
+                    "signal_wait_time_ms": signal_ms,
+                    "resource_wait_time_ms": wait_ms - signal_ms,
+                    "wait_ms_per_sec": wait_ms / elapsed,
+                    "tasks_per_sec": tasks / elapsed,
+                    "avg_wait_ms": wait_ms / tasks if tasks else None,
+                }
+            )
+        waits.sort(key=lambda row: row["wait_time_ms"], reverse=True)
+        return {
+            "instance": instance,
+            "sampled_at": current.at,
+            "interval_seconds": elapsed,
+            "reset": "cleared" if cleared else None,
+            "waits": waits,
+        }
+
+    def latest(self, instance: Optional[str] = None, top: int = 10) -> List[Dict[str, Any]]:
+        """Most recent interval per instance, trimmed to the ``top`` waits."""
+
+        with self._lock:
+            results = [
+                result for name, result in sorted(self._latest.items()) if instance is None or name == instance
+            ]
+        return [{**result, "waits": result["waits"][:top]} for result in results]
+
+    def forget(self, instance: str) -> None:
+        with self._lock:
+            self._samples.pop(instance, None)
+            self._latest.pop(instance, None)
+
+
+__all__ = ["COUNTERS", "WaitDeltaEngine"]
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from src.analytics.blocking import analyze_blocking, latest_snapshot
+
+
+def _row(session, blocker, wait_ms=100.0, **extra):
+    return {"session_id": session, "blocking_session_id": blocker, "wait_duration_ms": wait_ms, **extra}
+
+
+def test_chains_are_grouped_under_head_blockers() -> None:
+    rows = [
+        _row(52, 51, 1000),
+        _row(53, 52, 400),
+        _row(54, 52, 300),
+        _row(55, 53, 50),
+        _row(61, 60, 10),
+    ]
+
+    result = analyze_blocking(rows)
+
+    assert result["total_blocked_sessions"] == 5
+    assert result["max_depth"] == 3
+    assert result["cycles"] == []
+    head = result["heads"][0]
+    assert head["session_id"] == 51
+    assert head["blocked_sessions"] == 4
+    assert head["depth"] == 3
+    assert head["total_wait_ms"] == 1750
+    assert [child["session_id"] for child in head["tree"]["blocking"]] == [52]
+    assert sorted(child["session_id"] for child in head["tree"]["blocking"][0]["blocking"]) == [53, 54]
+    assert result["heads"][1]["session_id"] == 60
+
+
+def test_cycles_are_reported_and_not_treated_as_heads() -> None:
+    rows = [_row(70, 71), _row(71, 72), _row(72, 70), _row(73, 72), _row(80, 80)]
+
+    result = analyze_blocking(rows)
+
+    assert result["heads"] == []
+    assert [sorted(cycle) for cycle in result["cycles"]] == [[70, 71, 72]]
+    assert result["total_blocked_sessions"] == 4
+
+
+def test_elastic_rows_keep_each_sessions_latest_state() -> None:
+    rows = [
+        {"session_id": 52, "blocking_session_id": 51, "duration_ms": 900, "wait_type": "LCK_M_X"},
+        {"session_id": 52, "blocking_session_id": 40, "duration_ms": 100, "wait_type": "LCK_M_S"},
+    ]
+
+    head = analyze_blocking(rows)["heads"][0]
+
+    assert head["session_id"] == 51
+    assert head["tree"]["blocking"][0] == {"session_id": 52, "wait_type": "LCK_M_X", "wait_ms": 900.0, "blocking": []}
+
+
+def test_rows_from_older_snapshots_do_not_form_chains() -> None:
+    newest, older = "2024-05-01T12:01:00Z", "2024-05-01T12:00:00Z"
+    rows = [
+        _row(52, 51, timestamp=newest, instance="sql01"),
+        _row(51, 52, timestamp=older, instance="sql01"),
+        _row(53, 51, timestamp=older, instance="sql01"),
+        _row(71, 70, timestamp=older, instance="sql02"),
+    ]
+
+    snapshot = latest_snapshot(rows)
+    result = analyze_blocking([row for row in snapshot if row["instance"] == "sql01"])
+
+    assert [row["session_id"] for row in snapshot] == [52, 71]
+    assert result["cycles"] == []
+    assert result["total_blocked_sessions"] == 1
+    assert result["heads"][0]["session_id"] == 51
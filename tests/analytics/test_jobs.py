@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Dict, List
+
+import pytest
+
+from src.analytics.jobs import InsightJobQueue, JobQueueFullError
+from src.analytics.ollama_client import OllamaBusyError
+from src.common.config import OllamaSettings
+
+
+class _Stream:
+    def __init__(self, title: str, gate: threading.Event):
+        self._title = title
+        self._gate = gate
+        self.closed = False
+
+    def __iter__(self):
+        yield {"event": "token", "data": {"token": "partial"}}
+        self._gate.wait(5)
+        if self.closed:
+            raise RuntimeError("connection closed")
+        yield {"event": "done", "data": {"response": f"insight for {self._title}", "cached": False}}
+
+    def close(self) -> None:
+        self.closed = True
+        self._gate.set()
+
+
+class _Analyzer:
+    def __init__(self) -> None:
+        self.gate = threading.Event()
+        self.started: List[str] = []
+        self.streams: Dict[str, _Stream] = {}
+
+    def analyze_stream(
+        self, title: str, metrics: List[Dict[str, Any]], issues: Any, use_cache: bool, instance: Any
+    ) -> _Stream:
+        self.started.append(title)
+        stream = self.streams[title] = _Stream(title, self.gate)
+        return stream
+
+
+def _queue(analyzer: _Analyzer, **overrides: Any) -> InsightJobQueue:
+    settings = OllamaSettings(host="http://ollama", model="m", job_workers=1, **overrides)
+    return InsightJobQueue(lambda: settings, lambda: analyzer)
+
+
+async def _until(predicate) -> None:
+    for _ in range(200):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_jobs_run_by_priority_and_duplicates_share_a_job() -> None:
+    async def scenario() -> None:
+        analyzer = _Analyzer()
+        jobs = _queue(analyzer)
+        jobs.start()
+        try:
+            first = jobs.submit({"title": "sql01", "metrics": []})
+            await _until(lambda: analyzer.started == ["sql01"])
+            low, again = jobs.submit_many([{"title": "sql02"}, {"title": "sql02"}])
+            urgent = jobs.submit({"title": "sql03"}, priority=5)
+            assert again["id"] == low["id"] and again["deduplicated"] is True
+            analyzer.gate.set()
+            await _until(lambda: jobs.get(low["id"])["status"] == "succeeded")
+            assert jobs.get(urgent["id"])["status"] == "succeeded"
+        finally:
+            await jobs.stop()
+        assert analyzer.started == ["sql01", "sql03", "sql02"]
+        done = jobs.get(first["id"])
+        assert done["status"] == "succeeded"
+        assert done["result"]["response"] == "insight for sql01"
+        assert jobs.stats()["deduplicated"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_busy_ollama_requeues_the_job_with_backoff() -> None:
+    class _BusyOnce(_Analyzer):
+        def analyze_stream(self, title, *args):
+            if not self.started:
+                self.started.append("busy")
+                raise OllamaBusyError("Ollama generation queue is full")
+            return super().analyze_stream(title, *args)
+
+    async def scenario() -> None:
+        analyzer = _BusyOnce()
+        analyzer.gate.set()
+        jobs = _queue(analyzer, retry_backoff=0.01)
+        jobs.start()
+        try:
+            job = jobs.submit({"title": "sql01"})
+            await _until(lambda: jobs.get(job["id"])["status"] == "succeeded")
+        finally:
+            await jobs.stop()
+        assert analyzer.started == ["busy", "sql01"]
+        assert jobs.get(job["id"])["error"] is None
+        assert jobs.stats()["requeued"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancel_closes_the_running_generation_and_skips_queued_jobs() -> None:
+    async def scenario() -> None:
+        analyzer = _Analyzer()
+        jobs = _queue(analyzer)
+        jobs.start()
+        try:
+            running = jobs.submit({"title": "sql01"})
+            queued = jobs.submit({"title": "sql02"})
+            await _until(lambda: jobs.get(running["id"])["status"] == "running")
+            assert jobs.cancel(queued["id"])["status"] == "cancelled"
+            assert jobs.cancel(running["id"])["status"] == "cancelled"
+            await _until(lambda: analyzer.streams["sql01"].closed)
+            await asyncio.sleep(0.05)
+        finally:
+            await jobs.stop()
+        assert jobs.get(running["id"])["status"] == "cancelled"
+        assert analyzer.started == ["sql01"]
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_the_whole_batch_and_finished_jobs_expire() -> None:
+    async def scenario() -> None:
+        analyzer = _Analyzer()
+        clock = [1000.0]
+        settings = OllamaSettings(host="http://ollama", model="m", job_workers=1, job_max_pending=1, job_retention=60)
+        jobs = InsightJobQueue(lambda: settings, lambda: analyzer, clock=lambda: clock[0])
+        jobs.start()
+        try:
+            first = jobs.submit({"title": "sql01"})
+            await _until(lambda: analyzer.started == ["sql01"])
+            with pytest.raises(JobQueueFullError):
+                jobs.submit_many([{"title": "sql02"}, {"title": "sql03"}])
+            analyzer.gate.set()
+            await _until(lambda: jobs.get(first["id"])["status"] == "succeeded")
+        finally:
+            await jobs.stop()
+        clock[0] += 61
+        assert jobs.get(first["id"]) is None
+        assert jobs.stats()["rejected"] == 2
+
+    asyncio.run(scenario())
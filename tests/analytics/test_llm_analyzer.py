@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from unittest.mock import MagicMock, patch
+import os
+import time
+from unittest.mock import MagicMock
 
 import pytest
 
-from src.analytics.llm_analyzer import LLMAnalyzer
+from src.analytics.llm_analyzer import InsightCache, LLMAnalyzer
+from src.analytics.ollama_client import OllamaClient
 from src.common.config import OllamaSettings
 
 
@@ -14,24 +17,185 @@ def settings() -> OllamaSettings:
 
 
 def test_analyze_success(settings: OllamaSettings) -> None:
-    analyzer = LLMAnalyzer(settings)
+    session = MagicMock()
     fake_response = {"response": "Insightful analysis"}
-    with patch("requests.post") as post:
-        post.return_value = MagicMock(status_code=200, json=lambda: fake_response)
-        post.return_value.raise_for_status = MagicMock()
-        result = analyzer.analyze("Blocking", metrics=[{"wait_type": "LCK_M_S"}], issues="Blocking detected")
+    session.post.return_value = MagicMock(status_code=200, json=lambda: fake_response)
+    analyzer = LLMAnalyzer(settings, client=OllamaClient(settings, session=session))
+
+    result = analyzer.analyze("Blocking", metrics=[{"wait_type": "LCK_M_S"}], issues="Blocking detected")
 
     assert result["response"] == "Insightful analysis"
     assert result["model"] == "test-model"
     assert "Blocking" in result["prompt"]
+    assert session.post.call_args.args[0] == "http://ollama/api/generate"
+    assert session.post.call_args.kwargs["json"]["stream"] is False
 
 
 def test_analyze_http_error(settings: OllamaSettings) -> None:
-    analyzer = LLMAnalyzer(settings)
-    with patch("requests.post") as post:
-        mock_resp = MagicMock()
-        mock_resp.raise_for_status.side_effect = RuntimeError("boom")
-        post.return_value = mock_resp
-        with pytest.raises(RuntimeError):
-            analyzer.analyze("Blocking", metrics=[])
-        post.assert_called_once()
+    session = MagicMock()
+    mock_resp = MagicMock(status_code=500)
+    mock_resp.raise_for_status.side_effect = RuntimeError("boom")
+    session.post.return_value = mock_resp
+    analyzer = LLMAnalyzer(settings, client=OllamaClient(settings, session=session))
+
+    with pytest.raises(RuntimeError):
+        analyzer.analyze("Blocking", metrics=[])
+    session.post.assert_called_once()
+
+
+def _streaming_session(lines):
+    session = MagicMock()
+    response = MagicMock(status_code=200)
+    response.iter_lines.return_value = iter(lines)
+    session.post.return_value = response
+    return session, response
+
+
+def test_analyze_stream_relays_tokens_then_timing(settings: OllamaSettings) -> None:
+    session, response = _streaming_session(
+        [
+            b'{"response": "Add ", "done": false}',
+            b"",
+            b'{"response": "an index", "done": false}',
+            b'{"response": "", "done": true, "eval_count": 40, "eval_duration": 2000000000}',
+        ]
+    )
+    client = OllamaClient(settings, session=session)
+    analyzer = LLMAnalyzer(settings, client=client)
+
+    events = list(analyzer.analyze_stream("Blocking", metrics=[]))
+
+    assert session.post.call_args.kwargs["json"]["stream"] is True
+    assert session.post.call_args.kwargs["stream"] is True
+    assert [event["data"]["token"] for event in events[:-1]] == ["Add ", "an index"]
+    done = events[-1]
+    assert done["event"] == "done"
+    assert done["data"]["response"] == "Add an index"
+    assert done["data"]["timing"]["tokens"] == 40
+    assert done["data"]["timing"]["tokens_per_sec"] == 20.0
+    assert done["data"]["timing"]["time_to_first_token_ms"] is not None
+    response.close.assert_called_once()
+    assert client._slots.acquire(blocking=False)
+
+
+def test_time_to_first_token_includes_waiting_for_ollama(settings: OllamaSettings) -> None:
+    session, response = _streaming_session([b'{"response": "a", "done": true}'])
+    post = session.post.return_value
+
+    def slow_post(*args, **kwargs):
+        time.sleep(0.05)
+        return post
+
+    session.post.side_effect = slow_post
+    stream = LLMAnalyzer(settings, client=OllamaClient(settings, session=session)).analyze_stream("Blocking", [])
+
+    timing = list(stream)[-1]["data"]["timing"]
+    assert timing["time_to_first_token_ms"] >= 50
+    assert timing["total_ms"] >= timing["time_to_first_token_ms"]
+
+
+def test_closing_a_stream_drops_the_upstream_generation(settings: OllamaSettings) -> None:
+    session, response = _streaming_session([b'{"response": "a"}', b'{"response": "b"}'])
+    client = OllamaClient(settings.__class__(host="http://ollama", model="m", max_concurrency=1), session=session)
+    stream = LLMAnalyzer(settings, client=client).analyze_stream("Blocking", metrics=[])
+
+    assert next(iter(stream))["data"]["token"] == "a"
+    stream.close()
+    stream.close()
+
+    response.close.assert_called_once()
+    assert client._slots.acquire(blocking=False)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cached_insight_is_served_without_calling_ollama(settings: OllamaSettings, tmp_path) -> None:
+    session = MagicMock()
+    session.post.return_value = MagicMock(status_code=200, json=lambda: {"response": "Add an index"})
+    cache = InsightCache(directory=str(tmp_path))
+    analyzer = LLMAnalyzer(settings, client=OllamaClient(settings, session=session), cache=cache)
+
+    first = analyzer.analyze("Blocking", metrics=[{"wait_type": "LCK_M_S"}])
+    second = analyzer.analyze("Blocking", metrics=[{"wait_type": "LCK_M_S"}])
+    refreshed = analyzer.analyze("Blocking", metrics=[{"wait_type": "LCK_M_S"}], use_cache=False)
+
+    assert (first["cached"], second["cached"], refreshed["cached"]) == (False, True, False)
+    assert second["response"] == "Add an index"
+    assert session.post.call_count == 2
+    assert cache.stats()["bypassed"] == 1
+
+    client = OllamaClient(settings, session=session)
+    restarted = LLMAnalyzer(settings, client=client, cache=InsightCache(directory=str(tmp_path)))
+    assert restarted.analyze("Blocking", metrics=[{"wait_type": "LCK_M_S"}])["cached"] is True
+    assert session.post.call_count == 2
+
+
+def test_insight_cache_expires_and_evicts(tmp_path) -> None:
+    clock = _Clock()
+    cache = InsightCache(ttl=60, max_entries=1, directory=str(tmp_path), clock=clock)
+    cache.put("a", {"response": "A"})
+    cache.put("b", {"response": "B"})
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("a") == {"response": "A"}
+    assert cache.stats()["disk_hits"] == 1
+
+    clock.now += 61
+    assert cache.get("a") is None
+    assert not (tmp_path / "a.json").exists()
+
+
+def test_insight_cache_caps_the_directory_on_write(tmp_path) -> None:
+    cache = InsightCache(ttl=60, max_entries=10, directory=str(tmp_path), disk_max_entries=2, clock=_Clock())
+    for age, key in enumerate("abc"):
+        cache.put(key, {"response": key})
+        os.utime(tmp_path / f"{key}.json", (1000 + age, 1000 + age))
+
+    assert sorted(path.name for path in tmp_path.glob("*.json")) == ["b.json", "c.json"]
+    assert cache.stats()["disk_evictions"] == 1
+    assert cache.stats()["disk_entries"] == 2
+
+
+def test_insight_cache_keeps_entries_when_settings_are_unchanged() -> None:
+    cache = InsightCache(ttl=60, max_entries=10, clock=_Clock())
+    cache.put("a", {"response": "A"})
+
+    cache.configure(60, 10, None)
+    assert cache.get("a") == {"response": "A"}
+    cache.configure(60, 5, None)
+    assert cache.get("a") is None
+
+def test_streamed_insight_is_replayed_from_cache(settings: OllamaSettings) -> None:
+    session, _ = _streaming_session([b'{"response": "Add an index", "done": true}'])
+    analyzer = LLMAnalyzer(settings, client=OllamaClient(settings, session=session), cache=InsightCache())
+
+    list(analyzer.analyze_stream("Blocking", metrics=[]))
+    replay = list(analyzer.analyze_stream("Blocking", metrics=[]))
+
+    assert session.post.call_count == 1
+    assert [event["event"] for event in replay] == ["token", "done"]
+    assert replay[-1]["data"]["cached"] is True
+    assert replay[-1]["data"]["response"] == "Add an index"
+
+
+def test_fresh_insights_are_recorded_with_their_inputs(settings: OllamaSettings) -> None:
+    session = MagicMock()
+    session.post.return_value = MagicMock(status_code=200, json=lambda: {"response": "Add an index"})
+    recorded = []
+    analyzer = LLMAnalyzer(
+        settings, client=OllamaClient(settings, session=session), cache=InsightCache(), recorder=recorded.append
+    )
+
+    analyzer.analyze("Waits", metrics=[{"wait_type": "CXPACKET"}], instance="sql01")
+    analyzer.analyze("Waits", metrics=[{"wait_type": "CXPACKET"}], instance="sql01")
+
+    assert len(recorded) == 1
+    assert recorded[0]["instance"] == "sql01"
+    assert recorded[0]["metrics"] == [{"wait_type": "CXPACKET"}]
+    assert recorded[0]["response"] == "Add an index"
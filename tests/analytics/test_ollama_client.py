@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from src.analytics.ollama_client import OllamaBusyError, OllamaClient, OllamaClientRegistry
+from src.common.config import OllamaSettings
+
+
+def _settings(**overrides) -> OllamaSettings:
+    return OllamaSettings(host="http://ollama/", model="m", **overrides)
+
+
+def _response(status: int, body=None) -> MagicMock:
+    response = MagicMock(status_code=status)
+    response.json.return_value = body or {}
+    if status >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(str(status))
+    return response
+
+
+def test_retries_connection_errors_and_retryable_statuses_with_backoff() -> None:
+    session = MagicMock()
+    session.post.side_effect = [requests.ConnectionError("refused"), _response(503), _response(200, {"response": "ok"})]
+    sleeps = []
+    client = OllamaClient(_settings(retries=2, retry_backoff=0.5), session=session, sleep=sleeps.append)
+
+    assert client.generate({"prompt": "x"}) == {"response": "ok"}
+    assert sleeps == [0.5, 1.0]
+    assert session.post.call_args.kwargs["timeout"] == (5.0, 120.0)
+    assert client.stats()["retries"] == 2
+
+
+def test_gives_up_after_configured_retries() -> None:
+    session = MagicMock()
+    session.post.return_value = _response(503)
+    client = OllamaClient(_settings(retries=1), session=session, sleep=lambda _: None)
+
+    with pytest.raises(requests.HTTPError):
+        client.generate({})
+    assert session.post.call_count == 2
+    assert client.stats()["failures"] == 1
+
+
+def test_rejects_fast_when_the_wait_queue_is_full() -> None:
+    release = threading.Event()
+    started = threading.Event()
+    session = MagicMock()
+
+    def slow_post(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return _response(200)
+
+    session.post.side_effect = slow_post
+    client = OllamaClient(_settings(max_concurrency=1, max_queue=0), session=session)
+    worker = threading.Thread(target=client.generate, args=({},))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(OllamaBusyError):
+            client.generate({})
+    finally:
+        release.set()
+        worker.join()
+    assert client.stats()["rejected"] == 1
+
+
+def test_queued_callers_time_out() -> None:
+    client = OllamaClient(_settings(max_concurrency=1, max_queue=1, queue_timeout=0.01), session=MagicMock())
+    client._slots.acquire()
+    with pytest.raises(OllamaBusyError):
+        client.generate({})
+    assert client.stats()["queue_timeouts"] == 1
+
+
+def test_registry_shares_one_client_until_connection_settings_change() -> None:
+    registry = OllamaClientRegistry()
+    first = registry.get(_settings())
+    assert registry.get(_settings()) is first
+    assert registry.get(_settings(temperature=0.7, cache_ttl=5)) is first
+    assert registry.get(_settings(max_concurrency=4)) is not first
+    registry.close()
+
+
+def test_replaced_client_is_closed_once_its_generations_finish() -> None:
+    session = MagicMock()
+    session.post.return_value = _response(200)
+    session.post.return_value.iter_lines.return_value = iter([b'{"done": true}'])
+    registry = OllamaClientRegistry(lambda settings: OllamaClient(settings, session=session))
+    stream = registry.get(_settings()).generate_stream({"prompt": "x"})
+
+    registry.get(_settings(max_concurrency=4))
+    session.close.assert_not_called()
+
+    assert list(stream) == [{"done": True}]
+    session.close.assert_called_once()
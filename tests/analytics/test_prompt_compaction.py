@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from src.analytics.prompt_compaction import compact_metrics, estimate_tokens
+
+
+def _wait_rows(count: int):
+    # One snapshot of 100 cumulative wait counters per minute.
+    return [
+        {
+            "@timestamp": f"2024-01-01T{index // 6000:02d}:{index // 100 % 60:02d}:00Z",
+            "instance": "sql01",
+            "wait_type": f"WAIT_{index % 100:03d}",
+            "wait_time_ms": float(index % 100 * (index // 100 + 1)),
+            "waiting_tasks": index // 100 + 1,
+        }
+        for index in range(count)
+    ]
+
+
+def test_duplicate_rows_are_merged_and_ranked_by_severity() -> None:
+    result = compact_metrics(_wait_rows(500), token_budget=4000, top_k=5)
+
+    assert result["rows"] == 500
+    assert result["groups"] == 100
+    assert result["shown"] == 5
+    assert result["severity"] == "wait_time_ms"
+    lines = result["table"].splitlines()
+    assert lines[0] == "Window: 2024-01-01T00:00:00Z .. 2024-01-01T00:04:00Z"
+    assert lines[1] == "| instance | wait_type | wait_time_ms | waiting_tasks | rows |"
+    # WAIT_099 was sampled five times; the newest counters are reported, not their sum.
+    assert lines[2] == "| sql01 | WAIT_099 | 495 | 5 | 5 |"
+    assert lines[-1].startswith("Other 95 groups (475 rows): wait_time_ms sum=")
+    assert "p95=" in lines[-1]
+    assert result["compression_ratio"] > 10
+
+
+def test_merged_gauges_keep_their_peak_and_late_numbers_stay_measures() -> None:
+    rows = [
+        {"@timestamp": "2024-01-01T00:02:00Z", "wait_type": "LCK_M_X", "wait_ms_per_sec": 40.0, "cpu_ms": None},
+        {"@timestamp": "2024-01-01T00:01:00Z", "wait_type": "LCK_M_X", "wait_ms_per_sec": 90.0, "cpu_ms": 7},
+        {"@timestamp": "2024-01-01T00:00:00Z", "wait_type": "LCK_M_X", "wait_ms_per_sec": 10.0, "cpu_ms": 3},
+    ]
+
+    lines = compact_metrics(rows)["table"].splitlines()
+
+    assert lines[1] == "| wait_type | wait_ms_per_sec | cpu_ms | rows |"
+    assert lines[2] == "| LCK_M_X | 90 | 7 | 3 |"
+
+
+def test_duration_columns_are_measures_not_timestamps() -> None:
+    # Shaped like SESSIONS_SQL rows: cpu_time is milliseconds of CPU, collection_time is when it was read.
+    rows = [
+        {"collection_time": "2024-01-01T00:01:00", "session_id": 52, "cpu_time": 900, "total_elapsed_time": 5000},
+        {"collection_time": "2024-01-01T00:00:00", "session_id": 52, "cpu_time": 400, "total_elapsed_time": 2000},
+    ]
+
+    lines = compact_metrics(rows)["table"].splitlines()
+
+    assert lines[0] == "Window: 2024-01-01T00:00:00 .. 2024-01-01T00:01:00"
+    assert lines[1] == "| session_id | cpu_time | total_elapsed_time | rows |"
+    assert lines[2] == "| 52 | 900 | 5000 | 2 |"
+
+
+def test_table_is_cut_to_the_token_budget() -> None:
+    small = compact_metrics(_wait_rows(50), token_budget=120, top_k=50)
+    large = compact_metrics(_wait_rows(5000), token_budget=120, top_k=50)
+
+    for result in (small, large):
+        assert result["tokens"] <= 120
+        assert estimate_tokens(result["table"]) == result["tokens"]
+        assert 0 < result["shown"] < 50
+    assert large["compression_ratio"] > 50 * small["compression_ratio"]
+
+
+def test_identifiers_are_not_summed() -> None:
+    rows = [
+        {"session_id": 52, "blocking_session_id": 0, "wait_duration_ms": 10},
+        {"session_id": 53, "blocking_session_id": 52, "wait_duration_ms": 500},
+    ]
+
+    result = compact_metrics(rows)
+
+    assert result["table"].splitlines() == [
+        "| session_id | blocking_session_id | wait_duration_ms |",
+        "| 53 | 52 | 500 |",
+        "| 52 | 0 | 10 |",
+    ]
+    assert compact_metrics([])["table"] == "(none)"
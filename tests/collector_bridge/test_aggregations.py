@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from src.collector_bridge import aggregations
+
+
+def test_parse_top_waits_flattens_buckets() -> None:
+    response = {
+        "aggregations": {
+            "instances": {
+                "buckets": [
+                    {
+                        "key": "sql1",
+                        "wait_types": {
+                            "buckets": [
+                                {
+                                    "key": "PAGEIOLATCH_SH",
+                                    "doc_count": 12,
+                                    "wait_time_ms": {"value": 5400.0},
+                                    "waiting_tasks": {"value": 30.0},
+                                    "wait_time_pct": {"values": {"50.0": 400.0, "95.0": 900.0}},
+                                }
+                            ]
+                        },
+                    }
+                ]
+            }
+        }
+    }
+
+    rows = aggregations.parse_top_waits(response)
+
+    assert rows == [
+        {
+            "instance": "sql1",
+            "wait_type": "PAGEIOLATCH_SH",
+            "samples": 12,
+            "wait_time_ms": 5400.0,
+            "waiting_tasks": 30.0,
+            "percentiles": {"p50": 400.0, "p95": 900.0},
+        }
+    ]
+
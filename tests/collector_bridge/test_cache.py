@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.collector_bridge.cache import TelemetryCache, query_key
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_expiry_and_lru_eviction() -> None:
+    clock = FakeClock()
+    cache = TelemetryCache(ttl=5, max_entries=2, clock=clock)
+    loads = []
+
+    def loader(value):
+        return lambda: loads.append(value) or value
+
+    assert cache.get_or_load("a", loader(1)) == 1
+    assert cache.get_or_load("a", loader(2)) == 1
+    cache.get_or_load("b", loader(3))
+    cache.get_or_load("c", loader(4))  # evicts "a"
+    clock.now = 10
+    assert cache.get_or_load("c", loader(5)) == 5
+
+    stats = cache.stats()
+    assert loads == [1, 3, 4, 5]
+    assert stats["hits"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_sync_requests_coalesce() -> None:
+    cache = TelemetryCache(ttl=5)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return ["doc"]
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.get_or_load("k", slow_loader)))
+    owner.start()
+    started.wait(2)
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", slow_loader))) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    deadline = time.monotonic() + 2
+    while cache.stats()["coalesced"] < 3:
+        assert time.monotonic() < deadline, "waiters never coalesced"
+        time.sleep(0.001)
+    release.set()
+    for thread in [owner, *waiters]:
+        thread.join(2)
+
+    assert calls == [1]
+    assert results == [["doc"]] * 4
+
+
+def test_async_requests_coalesce_and_propagate_errors() -> None:
+    cache = TelemetryCache(ttl=5)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("elastic down")
+
+    async def scenario():
+        values = await asyncio.gather(*(cache.aget_or_load("k", loader) for _ in range(5)))
+        errors = await asyncio.gather(*(cache.aget_or_load("bad", failing) for _ in range(2)), return_exceptions=True)
+        return values, errors
+
+    values, errors = asyncio.run(scenario())
+    assert calls == [1]
+    assert values == [{"ok": True}] * 5
+    assert all(isinstance(err, RuntimeError) for err in errors)
+    assert cache.stats()["coalesced"] == 5
+
+
+def test_async_waiter_takes_over_when_owner_is_cancelled() -> None:
+    cache = TelemetryCache(ttl=5)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01 if len(calls) > 1 else 10)
+        return len(calls)
+
+    async def scenario():
+        owner = asyncio.create_task(cache.aget_or_load("k", loader))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.aget_or_load("k", loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+        owner.cancel()
+        values = await asyncio.wait_for(asyncio.gather(*waiters), 2)
+        return owner.cancelled(), values
+
+    cancelled, values = asyncio.run(scenario())
+    assert cancelled
+    assert values == [2, 2, 2]
+    assert calls == [1, 1]
+
+
+def test_load_in_flight_during_clear_is_not_stored() -> None:
+    cache = TelemetryCache(ttl=5)
+    release = asyncio.Event()
+
+    async def stale():
+        await release.wait()
+        return "stale"
+
+    async def fresh():
+        return "fresh"
+
+    async def scenario():
+        owner = asyncio.create_task(cache.aget_or_load("k", stale))
+        await asyncio.sleep(0)
+        cache.clear()
+        after_clear = await cache.aget_or_load("k", fresh)
+        release.set()
+        return await owner, after_clear, await cache.aget_or_load("k", stale)
+
+    assert asyncio.run(scenario()) == ("stale", "fresh", "fresh")
+
+
+def test_query_key_normalizes_whitespace() -> None:
+    assert query_key("search", "idx", "a  AND\nb", 10) == query_key("search", "idx", "a AND b", 10)
+
+
+def test_configure_invalidates() -> None:
+    cache = TelemetryCache(ttl=5)
+    cache.get_or_load("k", lambda: 1)
+    cache.configure(ttl=0, max_entries=10)
+    assert cache.stats()["entries"] == 0
+    assert not cache.enabled
+    with pytest.raises(ZeroDivisionError):
+        cache.get_or_load("k", lambda: 1 / 0)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import replace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from elastic_transport import ApiResponseMeta
+from elasticsearch import NotFoundError
+
+from src.collector_bridge.elastic_client import (
+    WAIT_STATS_FIELDS,
+    AsyncElasticTelemetryClient,
+    ElasticClientRegistry,
+    ElasticTelemetryClient,
+    PointInTimeExpiredError,
+)
+from src.collector_bridge.query import TelemetryQuery
+from src.common.config import ElasticSettings
+
+
+@pytest.fixture
+def settings() -> ElasticSettings:
+    return ElasticSettings(
+        url="http://localhost:9200",
+        metrics_index="metric-*",
+        logs_index="log-*",
+        username=None,
+        password=None,
+        ca_cert=None,
+    )
+
+
+def test_registry_reuses_client_for_equal_settings(settings: ElasticSettings) -> None:
+    registry = ElasticClientRegistry()
+    first = registry.get(settings)
+    second = registry.get(replace(settings))
+    other = registry.get(replace(settings, request_timeout=5))
+
+    assert first is second
+    assert other is not first
+    stats = registry.stats()
+    assert stats["clients"] == 1
+    assert stats["retired"] == 1
+    assert stats["created"] == 2
+    assert stats["reused"] == 1
+    assert stats["pools"][0]["nodes"][0]["max_connections"] == settings.connections_per_node
+
+    registry.close()
+    assert registry.stats()["clients"] == 0
+
+
+def test_registry_closes_retired_clients_once_idle(settings: ElasticSettings) -> None:
+    now = [0.0]
+    closed = []
+
+    class FakeClient:
+        def __init__(self, settings: ElasticSettings):
+            self.settings = settings
+
+        def close(self) -> None:
+            closed.append(self)
+
+        def pool_stats(self) -> list:
+            return []
+
+    registry = ElasticClientRegistry(FakeClient, clock=lambda: now[0])
+    first = registry.get(settings)
+    registry.get(replace(settings, request_timeout=5))
+    assert closed == []
+
+    now[0] = settings.request_timeout + 1
+    registry.get(replace(settings, request_timeout=5))
+    assert closed == [first]
+    assert registry.stats()["retired"] == 0
+    assert registry.get(settings) is not first
+
+
+def test_registry_reap_closes_async_clients_on_their_own_loop(settings: ElasticSettings) -> None:
+    now = [0.0]
+    closed_on = []
+
+    class FakeAsyncClient:
+        def __init__(self, settings: ElasticSettings):
+            self.settings = settings
+
+        async def close(self) -> None:
+            closed_on.append(asyncio.get_running_loop())
+
+        def pool_stats(self) -> list:
+            return []
+
+    async def scenario() -> asyncio.AbstractEventLoop:
+        registry = ElasticClientRegistry(FakeAsyncClient, clock=lambda: now[0])
+        registry.get(settings)
+        registry.get(replace(settings, request_timeout=5))
+        now[0] = settings.request_timeout + 1
+        assert await asyncio.to_thread(registry.reap) == 1
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert registry.stats()["retired"] == 0
+        return asyncio.get_running_loop()
+
+    loop = asyncio.run(scenario())
+    assert closed_on == [loop]
+
+
+def test_async_registry_closes_clients(settings: ElasticSettings) -> None:
+    async def scenario() -> dict:
+        registry = ElasticClientRegistry(AsyncElasticTelemetryClient)
+        client = registry.get(settings)
+        assert isinstance(client, AsyncElasticTelemetryClient)
+        await registry.aclose()
+        return registry.stats()
+
+    assert asyncio.run(scenario())["clients"] == 0
+
+
+def test_fetch_metrics_requests_only_normalizer_fields(settings: ElasticSettings) -> None:
+    client = ElasticTelemetryClient(settings)
+    with patch.object(client._client, "search", return_value={"hits": {"hits": []}}) as search:
+        client.fetch_metrics(TelemetryQuery(), size=5, fields=WAIT_STATS_FIELDS)
+
+    assert search.call_args.kwargs["source_includes"] == list(WAIT_STATS_FIELDS)
+
+
+def test_scan_fails_when_resumed_point_in_time_expired(settings: ElasticSettings) -> None:
+    client = AsyncElasticTelemetryClient(settings)
+    expired = NotFoundError("search_context_missing_exception", ApiResponseMeta(404, "1.1", {}, 0.0, None), {})
+
+    async def scenario() -> None:
+        with patch.object(client._client, "search", AsyncMock(side_effect=[expired])), patch.object(
+            client._client, "open_point_in_time", AsyncMock()
+        ) as open_pit:
+            scan = client.scan("logs-*", {}, page_size=10, pit_id="pit-1", search_after=[5, 3])
+            with pytest.raises(PointInTimeExpiredError):
+                [page async for page in scan]
+        open_pit.assert_not_called()
+        await client.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from src.collector_bridge.elastic_client import PointInTimeExpiredError
+from src.collector_bridge.export import decode_cursor, encode_cursor, export_ndjson
+
+
+class ScanClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    async def scan(self, index, query, page_size=1000, pit_id=None, search_after=None):
+        self.calls.append({"pit_id": pit_id, "search_after": search_after})
+        for page in self.pages:
+            yield "pit-1", page
+
+
+def _collect(stream) -> list:
+    async def run() -> list:
+        return [chunk async for chunk in stream]
+
+    body = b"".join(asyncio.run(run()))
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_export_streams_documents_and_cursors() -> None:
+    pages = [
+        [{"_source": {"message": "a"}, "sort": [1, 0]}, {"_source": {"message": "b"}, "sort": [2, 1]}],
+        [{"_source": {"message": "c"}, "sort": [3, 2]}],
+    ]
+    lines = _collect(export_ndjson(ScanClient(pages), "logs-*", page_size=2))
+
+    assert [line.get("message") for line in lines if "message" in line] == ["a", "b", "c"]
+    assert decode_cursor(lines[2]["_export"]["cursor"]) == ("pit-1", [2, 1])
+    assert lines[2]["_export"]["record"] == "cursor"
+    assert lines[-1] == {"_export": {"record": "end"}}
+
+
+class FailingScanClient(ScanClient):
+    async def scan(self, index, query, page_size=1000, pit_id=None, search_after=None):
+        yield "pit-1", self.pages[0]
+        raise RuntimeError("search_context_missing_exception")
+
+
+def test_export_ends_with_error_record_when_scan_fails() -> None:
+    pages = [[{"_source": {"message": "a"}, "sort": [1, 0]}]]
+    lines = _collect(export_ndjson(FailingScanClient(pages), "logs-*"))
+
+    assert lines[0] == {"message": "a"}
+    error = lines[-1]["_export"]
+    assert error["record"] == "error"
+    assert "search_context_missing_exception" in error["detail"]
+    assert decode_cursor(error["cursor"]) == ("pit-1", [1, 0])
+
+
+class ExpiringScanClient(ScanClient):
+    async def scan(self, index, query, page_size=1000, pit_id=None, search_after=None):
+        for page in self.pages:
+            yield "pit-1", page
+        raise PointInTimeExpiredError("Point-in-time for logs-* expired; restart the scan")
+
+
+def test_export_raises_when_resumed_cursor_expired() -> None:
+    stream = export_ndjson(ExpiringScanClient([]), "logs-*", cursor=encode_cursor("pit-9", [5, 3]))
+    with pytest.raises(PointInTimeExpiredError):
+        _collect(stream)
+
+
+def test_export_error_after_expiry_carries_no_cursor() -> None:
+    pages = [[{"_source": {"message": "a"}, "sort": [1, 0]}]]
+    lines = _collect(export_ndjson(ExpiringScanClient(pages), "logs-*"))
+
+    assert lines[-1]["_export"]["record"] == "error"
+    assert lines[-1]["_export"]["cursor"] is None
+
+
+def test_export_resumes_from_cursor() -> None:
+    client = ScanClient([])
+    _collect(export_ndjson(client, "logs-*", cursor=encode_cursor("pit-9", [5, 3])))
+    assert client.calls == [{"pit_id": "pit-9", "search_after": [5, 3]}]
+
+
+def test_decode_cursor_rejects_garbage() -> None:
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+
+from src.collector_bridge import insights
+from src.collector_bridge.insights import InsightWriter, insight_document
+from src.common.config import ElasticSettings
+
+
+def _settings(**overrides) -> ElasticSettings:
+    return ElasticSettings(
+        url="http://localhost:9200",
+        metrics_index="metric-*",
+        logs_index="log-*",
+        username=None,
+        password=None,
+        ca_cert=None,
+        **overrides,
+    )
+
+
+class BulkClient:
+    def __init__(self, statuses=None, error=None) -> None:
+        self.statuses = list(statuses or [])
+        self.error = error
+        self.calls = []
+        self.templates = []
+
+    async def put_index_template(self, name, template):
+        self.templates.append((name, template))
+        return {"acknowledged": True}
+
+    async def bulk_index(self, index, documents):
+        self.calls.append((index, [doc_id for doc_id, _ in documents]))
+        if self.error is not None:
+            raise self.error
+        statuses = self.statuses.pop(0) if self.statuses else [201] * len(documents)
+        return {"items": [{"index": {"status": status}} for status in statuses]}
+
+    async def raw_search(self, index, query, size):
+        self.search = (index, query.to_dict(), size)
+        return {"hits": {"hits": [{"_id": "a1", "_source": {"summary": "Add an index"}}]}}
+
+
+def _record(instance: str = "sql01") -> dict:
+    response = "Summary\n- Add an index\n2. Update stats"
+    return {"instance": instance, "title": "Waits", "model": "m", "response": response}
+
+
+def test_insight_document_extracts_actions_and_caps_metrics() -> None:
+    document = insight_document({**_record(), "metrics": [{"value": index} for index in range(80)]}, 0.0)
+
+    assert document["@timestamp"] == document["generated_at"] == "1970-01-01T00:00:00+00:00"
+    assert document["mssql_instance"] == "sql01"
+    assert document["recommended_actions"] == ["Add an index", "Update stats"]
+    assert len(document["supporting_metrics"]) == 50
+    assert document["metrics_count"] == 80
+
+
+def test_partial_failures_are_retried_and_permanent_errors_dropped() -> None:
+    client = BulkClient(statuses=[[201, 429, 400]])
+    writer = InsightWriter(lambda: _settings(insights_retries=1), lambda _: client)
+    for instance in ("sql01", "sql02", "sql03"):
+        writer.record(_record(instance))
+
+    first = asyncio.run(writer.flush())
+    second = asyncio.run(writer.flush())
+
+    assert first == {"indexed": 1, "retried": 1, "failed": 1}
+    assert second == {"indexed": 1, "retried": 0, "failed": 0}
+    assert client.calls[0][0] == "llm_insights"
+    assert client.calls[1][1] == [client.calls[0][1][1]]
+    assert writer.stats()["buffered"] == 0
+
+
+def test_documents_missing_from_a_short_bulk_response_are_retried() -> None:
+    client = BulkClient(statuses=[[201]])
+    writer = InsightWriter(lambda: _settings(insights_retries=1), lambda _: client)
+    for instance in ("sql01", "sql02", "sql03"):
+        writer.record(_record(instance))
+
+    first = asyncio.run(writer.flush())
+    second = asyncio.run(writer.flush())
+
+    assert first == {"indexed": 1, "retried": 2, "failed": 0}
+    assert second == {"indexed": 2, "retried": 0, "failed": 0}
+    assert client.calls[1][1] == client.calls[0][1][1:]
+
+
+def test_failed_requests_give_up_after_the_retry_budget() -> None:
+    writer = InsightWriter(lambda: _settings(insights_retries=2), lambda _: BulkClient(error=ConnectionError("down")))
+    writer.record(_record())
+
+    outcomes = [asyncio.run(writer.flush()) for _ in range(3)]
+
+    assert [outcome["retried"] for outcome in outcomes] == [1, 1, 0]
+    assert outcomes[-1]["failed"] == 1
+    assert writer.stats()["buffered"] == 0
+
+
+def test_full_buffer_drops_after_waiting(monkeypatch) -> None:
+    monkeypatch.setattr(insights, "RECORD_TIMEOUT", 0.01)
+    writer = InsightWriter(lambda: _settings(insights_buffer_size=1), lambda _: BulkClient())
+
+    assert writer.record(_record()) is True
+    assert writer.record(_record()) is False
+    assert writer.stats()["dropped"] == 1
+
+
+def test_background_task_flushes_full_batches_and_drains_on_stop() -> None:
+    async def scenario() -> BulkClient:
+        client = BulkClient()
+        writer = InsightWriter(lambda: _settings(insights_batch_size=2, insights_flush_interval=60), lambda _: client)
+        writer.start()
+        await asyncio.to_thread(writer.record, _record("sql01"))
+        await asyncio.to_thread(writer.record, _record("sql02"))
+        for _ in range(100):
+            if client.calls:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.to_thread(writer.record, _record("sql03"))
+        await writer.stop()
+        return client
+
+    client = asyncio.run(scenario())
+
+    assert [len(ids) for _, ids in client.calls] == [2, 1]
+    assert [name for name, _ in client.templates] == ["llm_insights"]
+
+
+def test_index_template_maps_the_instance_as_keyword_before_the_first_write() -> None:
+    client = BulkClient()
+    writer = InsightWriter(lambda: _settings(), lambda _: client)
+    writer.record(_record())
+
+    asyncio.run(writer.flush())
+    asyncio.run(writer.flush())
+
+    name, template = client.templates[0]
+    properties = template["template"]["mappings"]["properties"]
+    assert len(client.templates) == 1
+    assert template["index_patterns"] == [name] == ["llm_insights"]
+    assert properties["mssql_instance"] == {"type": "keyword"}
+    assert properties["supporting_metrics"] == {"type": "flattened"}
+
+
+def test_writes_wait_for_the_index_template() -> None:
+    class NoTemplate(BulkClient):
+        async def put_index_template(self, name, template):
+            raise ConnectionError("down")
+
+    client = NoTemplate()
+    writer = InsightWriter(lambda: _settings(), lambda _: client)
+    writer.record(_record())
+
+    assert asyncio.run(writer.flush())["retried"] == 1
+    assert client.calls == []
+
+
+def test_search_filters_by_instance_and_time() -> None:
+    client = BulkClient()
+    writer = InsightWriter(lambda: _settings(), lambda _: client)
+
+    result = asyncio.run(writer.search(instance="sql01", start="now-1d", limit=10))
+
+    assert result == [{"id": "a1", "summary": "Add an index"}]
+    index, query, size = client.search
+    assert (index, size) == ("llm_insights", 10)
+    assert {"term": {"mssql_instance": "sql01"}} in query["bool"]["filter"]
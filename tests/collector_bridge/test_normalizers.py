@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pytest
+
+from src.collector_bridge.normalizers import NORMALIZERS, NormalizerSpec, compile_normalizer, get_normalizer
+
+
+def test_wait_stats_rows_match_legacy_shape() -> None:
+    docs = [
+        {"@timestamp": "t1", "mssql_instance": "sql1", "wait_stats": {"type": "LCK_M_S", "time_ms": 10, "tasks": 2}},
+        {"timestamp": "t2", "wait_stats": None},
+    ]
+
+    rows = NORMALIZERS["wait_stats"](docs)
+
+    assert rows[0] == {
+        "timestamp": "t1",
+        "instance": "sql1",
+        "wait_type": "LCK_M_S",
+        "wait_time_ms": 10,
+        "waiting_tasks": 2,
+    }
+    assert rows[1]["timestamp"] == "t2"
+    assert rows[1]["wait_type"] is None
+
+
+def test_columnar_fast_and_fallback_paths_agree() -> None:
+    normalizer = NORMALIZERS["blocking"]
+    complete = [
+        {"@timestamp": f"t{i}", "blocking": {"session_id": i, "blocking_session_id": 1, "wait_type": "LCK_M_X",
+                                             "duration_ms": i * 10, "query_text": "SELECT 1"}}
+        for i in range(3)
+    ]
+    partial = complete + [{"timestamp": "t9", "blocking": {"session_id": 9}}]
+
+    fast = normalizer(complete, columnar=True)
+    slow = normalizer(partial, columnar=True)
+
+    assert fast["session_id"] == [0, 1, 2]
+    assert slow["timestamp"] == ["t0", "t1", "t2", "t9"]
+    assert slow["duration_ms"][-1] is None
+
+
+def test_spec_fields_drive_projection() -> None:
+    spec = NormalizerSpec(name="custom", columns={"a": ("x.a", "y"), "b": ("x.b",)})
+    normalizer = compile_normalizer(spec)
+
+    assert normalizer.fields == ("x.a", "y", "x.b")
+    assert normalizer([{"y": 1, "x": {"b": 2}}]) == [{"a": 1, "b": 2}]
+
+
+def test_unknown_signal() -> None:
+    with pytest.raises(ValueError):
+        get_normalizer("nope")
+
+
+def test_zero_values_are_not_replaced_by_fallbacks() -> None:
+    spec = NormalizerSpec(name="custom", columns={"a": ("x.a", "y")})
+    cpu = NORMALIZERS["cpu"]([{"cpu": {"percent": 0, "sql_percent": 0}}])
+
+    assert compile_normalizer(spec)([{"x": {"a": 0}, "y": 40}]) == [{"a": 0}]
+    assert cpu[0]["cpu_percent"] == 0
+    assert cpu[0]["sql_cpu_percent"] == 0
+    assert NORMALIZERS["cpu"]([{"cpu": {"percent": 0}}], columnar=True)["cpu_percent"] == [0]
+
+
+def test_fallback_used_only_for_missing_values() -> None:
+    docs = [
+        {"@timestamp": None, "timestamp": "t0", "io": {"database": "db", "read_bytes": 512}},
+        {"@timestamp": "t1", "timestamp": "t9", "io": {"database": "db", "read_bytes": 0}},
+        {"timestamp": "t2", "io": {"database": "db", "read_bytes": 1024}},
+    ]
+
+    columns = NORMALIZERS["io"](docs, columnar=True)
+
+    assert columns["timestamp"] == ["t0", "t1", "t2"]
+    assert columns["read_bytes"] == [512, 0, 1024]
+    assert NORMALIZERS["io"](docs) == [dict(zip(columns, values)) for values in zip(*columns.values())]
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from src.collector_bridge.query import INSTANCE_FIELD, TelemetryQuery, relative_window
+
+
+def test_query_renders_filter_only_bool() -> None:
+    query = (
+        TelemetryQuery()
+        .with_field("blocking.session_id")
+        .for_instance("sql1")
+        .between(relative_window("15m"), "2024-05-01T00:00:00Z")
+    )
+
+    assert query.to_dict() == {
+        "bool": {
+            "filter": [
+                {"term": {"mssql_instance.keyword": "sql1"}},
+                {"exists": {"field": "blocking.session_id"}},
+                {"range": {"@timestamp": {"gte": "now-15m/m", "lt": "2024-05-01T00:00:00Z"}}},
+            ]
+        }
+    }
+    assert query.sort() == [{"@timestamp": {"order": "desc", "unmapped_type": "date"}}]
+
+
+def test_wildcard_text_and_empty_query() -> None:
+    assert TelemetryQuery().matching("*").to_dict() == {"match_all": {}}
+    assert TelemetryQuery().matching("error").to_dict() == {"bool": {"filter": [{"query_string": {"query": "error"}}]}}
+
+
+def test_instance_field_can_target_a_keyword_mapped_index() -> None:
+    query = TelemetryQuery().for_instance("sql1", field=INSTANCE_FIELD)
+    assert query.to_dict() == {"bool": {"filter": [{"term": {"mssql_instance": "sql1"}}]}}
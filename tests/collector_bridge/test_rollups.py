@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+
+import pytest
+
+from src.collector_bridge.rollups import RollupStore, RollupWorker
+from src.common.config import ElasticSettings
+
+
+def _settings(**overrides) -> ElasticSettings:
+    return ElasticSettings(
+        url="http://localhost:9200",
+        metrics_index="metric-*",
+        logs_index="log-*",
+        username=None,
+        password=None,
+        ca_cert=None,
+        rollup_interval=60,
+        **overrides,
+    )
+
+
+def _epoch(iso: str) -> float:
+    return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+
+
+class AggClient:
+    """Answers every slice with one 1m bucket, or with one bucket per entry of ``minutes`` when given."""
+
+    def __init__(self, minutes=None) -> None:
+        self.ranges = []
+        self.minutes = minutes
+
+    async def aggregate_metrics(self, query, aggs):
+        window = query["bool"]["filter"][-1]["range"]["@timestamp"]
+        self.ranges.append(window)
+        assert aggs["minutes"]["date_histogram"]["fixed_interval"] == "1m"
+        instances = aggs["minutes"]["aggs"]["instances"]
+        if "wait_types" in instances["aggs"]:
+            bucket = {
+                "key": "sql1",
+                "wait_types": {
+                    "buckets": [
+                        {
+                            "key": "CXPACKET",
+                            "doc_count": 2,
+                            "wait_time_ms": {"value": 300.0},
+                            "waiting_tasks": {"value": 4.0},
+                        }
+                    ]
+                },
+            }
+        else:
+            bucket = {
+                "key": "sql1",
+                "doc_count": 3,
+                "blocked_sessions": {"value": 2},
+                "total_duration_ms": {"value": 900.0},
+                "max_duration_ms": {"value": 500.0},
+            }
+        minutes = self.minutes or [_epoch(window["gte"]) // 60 * 60]
+        buckets = [{"key": minute * 1000, "instances": {"buckets": [bucket]}} for minute in minutes]
+        return {"aggregations": {"minutes": {"buckets": buckets}}}
+
+
+def test_worker_polls_contiguous_slices_into_rollups() -> None:
+    store = RollupStore()
+    client = AggClient()
+    now = iter([120.0, 150.0])
+    worker = RollupWorker(store, _settings, lambda _: client, clock=lambda: next(now))
+
+    asyncio.run(worker.run_once())
+    asyncio.run(worker.run_once())
+
+    assert client.ranges[2]["gte"] == client.ranges[0]["lt"]
+    waits = store.wait_series(resolution="1m")
+    assert waits["fresh_as_of"] is not None
+    points = waits["series"][0]["points"]
+    assert [point["wait_time_ms"] for point in points] == [300.0, 300.0]
+    hourly = store.blocking_series(resolution="1h")["series"][0]["points"]
+    assert hourly == [
+        {
+            "bucket": "1970-01-01T00:00:00Z",
+            "events": 6,
+            "peak_blocked_sessions": 2,
+            "total_duration_ms": 1800.0,
+            "max_duration_ms": 500.0,
+        }
+    ]
+
+
+def test_worker_folds_each_minute_of_a_slice_into_its_own_bucket() -> None:
+    store = RollupStore()
+    client = AggClient(minutes=[240.0, 300.0, 360.0])
+    worker = RollupWorker(store, lambda: _settings(rollup_ingest_lag=0), lambda _: client, clock=lambda: 600.0)
+
+    asyncio.run(worker.run_once())
+
+    points = store.wait_series(resolution="1m")["series"][0]["points"]
+    assert [point["bucket"] for point in points] == [
+        "1970-01-01T00:04:00Z",
+        "1970-01-01T00:05:00Z",
+        "1970-01-01T00:06:00Z",
+    ]
+    assert [point["wait_time_ms"] for point in points] == [300.0] * 3
+    five = store.blocking_series(resolution="5m")["series"][0]["points"]
+    assert [(point["bucket"], point["events"]) for point in five] == [
+        ("1970-01-01T00:00:00Z", 3),
+        ("1970-01-01T00:05:00Z", 6),
+    ]
+
+
+def test_worker_leaves_ingest_lag_out_of_each_slice() -> None:
+    client = AggClient()
+    worker = RollupWorker(RollupStore(), lambda: _settings(rollup_ingest_lag=45), lambda _: client, clock=lambda: 600.0)
+
+    asyncio.run(worker.run_once())
+
+    assert client.ranges[0] == {"gte": "1970-01-01T00:08:15Z", "lt": "1970-01-01T00:09:15Z"}
+
+
+def test_summaries_served_from_buffers_once_they_cover_the_window() -> None:
+    now = [3600.0]
+    store = RollupStore(clock=lambda: now[0])
+    worker = RollupWorker(store, lambda: _settings(rollup_ingest_lag=0), lambda _: AggClient(), clock=lambda: now[0])
+
+    asyncio.run(worker.run_once())
+    assert store.top_waits(None, "15m", 10) is None
+
+    for _ in range(16):
+        now[0] += 60
+        asyncio.run(worker.run_once())
+
+    waits = store.top_waits("sql1", "15m", 10)
+    assert waits == [
+        {
+            "instance": "sql1",
+            "wait_type": "CXPACKET",
+            "samples": 30,
+            "wait_time_ms": 4500.0,
+            "waiting_tasks": 60.0,
+            "percentiles": None,
+        }
+    ]
+    assert store.top_waits("sql9", "15m", 10) is None
+    assert store.blocking_histogram("sql9", "5m", "1m") is None
+    assert store.freshness()["fresh_as_of"] == "1970-01-01T01:16:00Z"
+    timeline = store.blocking_histogram(None, "5m", "1m")
+    assert [point["events"] for point in timeline] == [3] * 5
+    assert store.blocking_histogram(None, "5m", "30s") is None
+    assert store.top_waits(None, "15m", 500) is None
+
+    now[0] += 600  # worker stopped polling
+    assert store.top_waits(None, "15m", 10) is None
+
+
+def test_worker_logs_an_outage_once_and_backs_off(caplog, monkeypatch) -> None:
+    class DownClient:
+        async def aggregate_metrics(self, query, aggs):
+            raise ConnectionError("connection refused")
+
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 4:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    worker = RollupWorker(RollupStore(), _settings, lambda _: DownClient())
+
+    with caplog.at_level(logging.WARNING, logger="src.collector_bridge.rollups"):
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(worker._loop())
+
+    assert sleeps == [120, 240, 480, 480]
+    assert len(caplog.records) == 1
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Dict, List
 
 import pytest
 
-from src.collector_bridge.service import TelemetryService
+from src.collector_bridge.service import AsyncTelemetryService, TelemetryService
 
 
 class DummyClient:
@@ -12,12 +13,12 @@ class DummyClient:
         self.wait_docs = wait_docs
         self.blocking_docs = blocking_docs
 
-    def fetch_metrics(self, query: str, size: int = 200):  # pragma: no cover - simple forwarding
-        if "blocking" in query:
+    def fetch_metrics(self, query: str, size: int = 200, fields=None):  # pragma: no cover - simple forwarding
+        if "blocking" in str(query):
             return self.blocking_docs
         return self.wait_docs
 
-    def fetch_logs(self, query: str, size: int = 200):  # pragma: no cover
+    def fetch_logs(self, query: str, size: int = 200, fields=None):  # pragma: no cover
         return self.wait_docs
 
     def normalize_wait_stats(self, documents):
@@ -42,3 +43,46 @@ def test_latest_waits(service: TelemetryService) -> None:
 def test_blocking_sessions(service: TelemetryService) -> None:
     data = service.blocking_sessions(limit=1)
     assert data[0]["blocking_session_id"] == 55
+
+
+class AsyncDummyClient(DummyClient):
+    async def fetch_metrics(self, query: str, size: int = 200, fields=None):
+        return super().fetch_metrics(query, size, fields)
+
+    async def fetch_logs(self, query: str, size: int = 200, fields=None):
+        return super().fetch_logs(query, size, fields)
+
+
+def test_async_service_queries() -> None:
+    service = AsyncTelemetryService(AsyncDummyClient([{"wait_type": "CXPACKET"}], [{"blocking_session_id": 7}]))
+
+    waits = asyncio.run(service.latest_waits(instance="sql1", limit=1))
+    blocking = asyncio.run(service.blocking_sessions(limit=1))
+
+    assert waits[0]["wait_type"] == "CXPACKET"
+    assert blocking[0]["blocking_session_id"] == 7
+
+
+class FleetClient:
+    def __init__(self) -> None:
+        self.queries = []
+
+    def aggregate_metrics(self, query, aggs):
+        return {"aggregations": {"instances": {"buckets": [{"key": "sql1"}, {"key": "sql2"}]}}}
+
+    def msearch_metrics(self, queries, size=50, fields=None):
+        self.queries.append(list(queries))
+        return [
+            {"hits": {"hits": [{"_source": {"mssql_instance": "sql1", "wait_stats": {"type": "CXPACKET"}}}]}},
+            {"error": {"type": "search_phase_execution_exception", "reason": "shard failure"}},
+        ]
+
+
+def test_fleet_signal_batches_instances_and_isolates_errors() -> None:
+    client = FleetClient()
+    result = TelemetryService(client).fleet_signal("wait_stats", limit=5)
+
+    assert len(client.queries) == 1
+    assert [query.instance for query in client.queries[0]] == ["sql1", "sql2"]
+    assert result["sql1"]["rows"][0]["wait_type"] == "CXPACKET"
+    assert result["sql2"] == {"error": "shard failure"}
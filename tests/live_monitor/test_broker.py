@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List
+
+from src.common.config import SQLServerSettings, SQLServerTarget
+from src.live_monitor.broker import LiveBroker, diff_rows, dmv_fetcher, metrics_fetcher, section_fetcher
+
+
+def _settings(**overrides: Any) -> SQLServerSettings:
+    return SQLServerSettings(server="sql01", **{"sample_interval": 0.01, **overrides})
+
+
+def test_diff_reports_changed_and_removed_rows_only() -> None:
+    previous, _, _ = diff_rows("waits", {}, [{"wait_type": "A", "ms": 1}, {"wait_type": "B", "ms": 1}])
+
+    rows = [{"wait_type": "A", "ms": 2}, {"wait_type": "C", "ms": 1}]
+    current, upserts, removed = diff_rows("waits", previous, rows)
+
+    assert upserts == [
+        {"key": "A", "row": {"wait_type": "A", "ms": 2}},
+        {"key": "C", "row": {"wait_type": "C", "ms": 1}},
+    ]
+    assert removed == ["B"]
+    assert set(current) == {"A", "C"}
+
+
+def test_diff_ignores_the_collection_time_of_dmv_rows() -> None:
+    def sample(at: str, waiting_ms: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                "collection_time": at,
+                "session_id": 61,
+                "blocking_session_id": 55,
+                "wait_type": "LCK_M_X",
+                "wait_duration_ms": waiting_ms,
+                "resource_description": "keylock hobtid=72057594047365120",
+            },
+            {
+                "collection_time": at,
+                "session_id": 72,
+                "blocking_session_id": 61,
+                "wait_type": "LCK_M_S",
+                "wait_duration_ms": 1200,
+                "resource_description": "pagelock fileid=1 pageid=312",
+            },
+        ]
+
+    previous, _, _ = diff_rows("blocking", {}, sample("2024-01-01 10:00:00.000", 4100))
+    current, upserts, removed = diff_rows("blocking", previous, sample("2024-01-01 10:00:15.000", 19100))
+
+    assert [entry["key"] for entry in upserts] == ["61"]
+    assert upserts[0]["row"]["wait_duration_ms"] == 19100
+    assert removed == []
+    assert diff_rows("blocking", current, sample("2024-01-01 10:00:30.000", 19100))[1] == []
+
+
+def test_keys_are_sent_as_the_server_built_them() -> None:
+    rows = [{"timestamp": "2024-01-01T00:00:00Z", "session_id": None}, {"timestamp": 1.0, "session_id": 52}]
+
+    _, upserts, _ = diff_rows("metrics/blocking", {}, rows)
+
+    assert [entry["key"] for entry in upserts] == ["2024-01-01T00:00:00Z|None", "1.0|52"]
+    assert [entry["row"] for entry in upserts] == rows
+
+
+class Source:
+    def __init__(self) -> None:
+        self.calls: List[tuple] = []
+        self.rows: List[Dict[str, Any]] = [{"wait_type": "A", "ms": 1}]
+
+    async def __call__(self, section: str, instance: str) -> List[Dict[str, Any]]:
+        self.calls.append((section, instance))
+        return list(self.rows)
+
+
+def test_subscribers_share_one_collection_and_receive_deltas() -> None:
+    async def scenario() -> None:
+        source = Source()
+        broker = LiveBroker(lambda: _settings(sample_interval=0.05), source)
+        first = broker.subscribe("waits", "sql01")
+        assert (await first.get(1))["type"] == "snapshot"
+        second = broker.subscribe("waits", "sql01")
+        joined = await second.get(1)
+        assert joined["type"] == "snapshot" and joined["rows"] == [{"key": "A", "row": {"wait_type": "A", "ms": 1}}]
+
+        source.rows = [{"wait_type": "A", "ms": 5}]
+        delta = await first.get(1)
+        upserts = [{"key": "A", "row": {"wait_type": "A", "ms": 5}}]
+        assert delta == {"type": "delta", "at": delta["at"], "upserts": upserts, "removed": []}
+        assert (await second.get(1))["upserts"] == delta["upserts"]
+        assert broker.stats()["topics"] == [{"section": "waits", "instance": "sql01", "subscribers": 2}]
+        assert broker.stats()["collections"] == len(source.calls)
+
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+        assert broker.stats()["topics"] == []
+        calls = len(source.calls)
+        await asyncio.sleep(0.15)
+        assert len(source.calls) == calls
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_dropped() -> None:
+    async def scenario() -> None:
+        source = Source()
+        broker = LiveBroker(lambda: _settings(subscriber_buffer=2), source)
+        subscription = broker.subscribe("waits", "sql01")
+        for index in range(10):
+            source.rows = [{"wait_type": "A", "ms": index}]
+            await asyncio.sleep(0.02)
+            if subscription.dropped:
+                break
+        assert subscription.dropped
+        assert await subscription.get(1) is None
+        assert broker.stats()["dropped_subscribers"] == 1
+        await broker.close()
+
+    asyncio.run(scenario())
+
+
+class FakeSampler:
+    def __init__(self, settings: SQLServerSettings, ring: Any = None):
+        self.settings = settings
+        self.instance = settings.server
+        self._ring = ring
+
+    def fresh_ring(self, instance=None):
+        return self._ring if instance in (None, self.instance) else None
+
+
+class FakeRing:
+    def latest(self, section: str):
+        return [{"wait_type": "SAMPLED"}]
+
+
+class FakeCollector:
+    def __init__(self, settings: SQLServerSettings):
+        self.settings = settings
+
+    def wait_stats(self, limit: int):
+        return [{"wait_type": "QUERIED", "server": self.settings.server, "limit": limit}]
+
+
+def test_fetcher_prefers_the_fresh_sample_and_queries_other_targets() -> None:
+    settings = _settings(targets=[SQLServerTarget(name="sql02", server="sql02.example.com")])
+
+    sampled = dmv_fetcher(FakeSampler(settings, FakeRing()), FakeCollector)
+    queried = dmv_fetcher(FakeSampler(settings), FakeCollector)
+
+    assert asyncio.run(sampled("waits", "sql01")) == [{"wait_type": "SAMPLED"}]
+    assert asyncio.run(sampled("waits", "sql02"))[0]["server"] == "sql02.example.com"
+    assert asyncio.run(queried("waits", "sql01")) == [{"wait_type": "QUERIED", "server": "sql01", "limit": 50}]
+    assert asyncio.run(queried("waits", "sql02"))[0]["server"] == "sql02.example.com"
+
+
+class FakeTelemetryService:
+    def __init__(self) -> None:
+        self.calls: List[Dict[str, Any]] = []
+
+    async def latest_waits(self, instance=None, limit=50):
+        self.calls.append({"instance": instance, "limit": limit})
+        return [{"timestamp": "2024-01-01T00:00:00Z", "instance": "sql01", "wait_type": "CXPACKET"}]
+
+
+def test_metric_sections_are_fetched_from_telemetry() -> None:
+    service = FakeTelemetryService()
+    settings = _settings(sample_limit=20)
+    fetch = section_fetcher(Source(), metrics_fetcher(lambda: service, lambda: settings))
+
+    rows = asyncio.run(fetch("metrics/wait-stats", ""))
+
+    assert rows[0]["wait_type"] == "CXPACKET"
+    assert service.calls == [{"instance": None, "limit": 20}]
+    assert asyncio.run(fetch("waits", "sql01")) == [{"wait_type": "A", "ms": 1}]
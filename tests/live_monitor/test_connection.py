@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import pytest
+
+from src.common.config import SQLServerSettings
+from src.live_monitor.connection import ConnectionPool, ConnectionPoolRegistry
+
+
+class FakeCursor:
+    def __init__(self, conn: "FakeConnection"):
+        self.conn = conn
+
+    def execute(self, sql, *params):
+        if self.conn.broken:
+            raise RuntimeError("connection reset")
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.broken = False
+        self.closed = False
+        self.rollbacks = 0
+        self.rollback_fails = False
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def rollback(self) -> None:
+        if self.rollback_fails:
+            raise RuntimeError("connection reset")
+        self.rollbacks += 1
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_pool_reuses_validates_and_evicts() -> None:
+    clock = Clock()
+    created = []
+    pool = ConnectionPool(
+        lambda: created.append(FakeConnection()) or created[-1], max_size=2, idle_timeout=60, clock=clock
+    )
+
+    first = pool.acquire()
+    pool.release(first)
+    again = pool.acquire()
+    assert again.connection is created[0]
+
+    again.connection.broken = True
+    pool.release(again)
+    replacement = pool.acquire()
+    assert replacement.connection is created[1]
+    pool.release(replacement)
+
+    clock.now = 120
+    assert pool.evict_idle() == 1
+    stats = pool.stats()
+    assert stats["creations"] == 2
+    assert stats["checkouts"] == 3
+    assert stats["ping_failures"] == 1
+    assert stats["idle"] == 0
+
+
+def test_pool_waits_then_times_out_when_exhausted() -> None:
+    pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.05)
+    held = pool.acquire()
+
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+    pool.release(held)
+    assert pool.acquire().connection is held.connection
+    assert pool.stats()["waits"] == 1
+
+
+def test_registry_shares_pool_per_connection_string() -> None:
+    registry = ConnectionPoolRegistry()
+    first = registry.get("SERVER=a;PWD=secret", lambda: ConnectionPool(FakeConnection))
+    second = registry.get("SERVER=a;PWD=secret", lambda: ConnectionPool(FakeConnection))
+
+    assert first is second
+    assert registry.stats()[0]["server"] == "SERVER=a"
+    registry.close()
+    with pytest.raises(RuntimeError):
+        first.acquire()
+
+
+def test_release_rolls_back_and_discards_on_rollback_failure() -> None:
+    pool = ConnectionPool(FakeConnection, max_size=1)
+    pooled = pool.acquire()
+    pool.release(pooled)
+    assert pooled.connection.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+    again = pool.acquire()
+    again.connection.rollback_fails = True
+    pool.release(again)
+
+    assert again.connection.closed
+    assert pool.stats()["idle"] == 0
+    assert pool.stats()["discarded"] == 1
+
+
+def test_registry_closes_pools_only_when_connection_settings_change() -> None:
+    registry = ConnectionPoolRegistry()
+    settings = SQLServerSettings(server="sql1")
+    registry.configure(settings)
+    pool = registry.get("SERVER=sql1", lambda: ConnectionPool(FakeConnection))
+
+    registry.configure(SQLServerSettings(server="sql1", sample_interval=5))
+    assert registry.get("SERVER=sql1", lambda: ConnectionPool(FakeConnection)) is pool
+
+    registry.configure(SQLServerSettings(server="sql1", pool_size=10))
+    with pytest.raises(RuntimeError):
+        pool.acquire()
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+from src.live_monitor.dmv_queries import DMVCollector, build_snapshot_batch
+
+
+class BatchCursor:
+    def __init__(self, result_sets):
+        self.result_sets = list(result_sets)
+        self.position = 0
+        self.executed = []
+
+    def execute(self, sql, *params):
+        self.executed.append((sql, params))
+
+    @property
+    def description(self):
+        return [(name,) for name in self.result_sets[self.position][0]]
+
+    def fetchall(self):
+        return self.result_sets[self.position][1]
+
+    def nextset(self):
+        self.position += 1
+        return self.position < len(self.result_sets)
+
+
+class FakeManager:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.connects = 0
+
+    @contextlib.contextmanager
+    def connect(self):
+        self.connects += 1
+        yield SimpleNamespace(connection=None, cursor=self.cursor)
+
+
+def test_snapshot_reads_every_result_set_in_one_round_trip() -> None:
+    cursor = BatchCursor(
+        [
+            (["collection_time", "wait_type"], [("t0", "CXPACKET")]),
+            (["collection_time", "session_id"], []),
+            (["collection_time", "session_id"], [("t0", 51), ("t0", 52)]),
+        ]
+    )
+    manager = FakeManager(cursor)
+
+    snapshot = DMVCollector(manager).snapshot(limit=10)
+
+    assert manager.connects == 1
+    assert len(cursor.executed) == 1
+    assert cursor.executed[0][1] == (10, 10, 10)
+    assert snapshot["collection_time"] == "t0"
+    assert snapshot["waits"] == [{"collection_time": "t0", "wait_type": "CXPACKET"}]
+    assert snapshot["blocking"] == []
+    assert [row["session_id"] for row in snapshot["sessions"]] == [51, 52]
+
+
+def test_snapshot_batch_shares_collection_time() -> None:
+    batch = build_snapshot_batch(["waits", "sessions"])
+    assert batch.count("GETDATE()") == 1
+    assert "TOP (@limit_sessions)" in batch
+
+
+def test_snapshot_rejects_unknown_sections() -> None:
+    with pytest.raises(ValueError):
+        DMVCollector(FakeManager(BatchCursor([]))).snapshot(sections=["plans"])
+
+
+class ScriptedCursor:
+    """Answers each execute() with the next scripted (columns, rows) result."""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.executed = []
+        self.current = None
+
+    def execute(self, sql, *params):
+        self.executed.append((sql, params))
+        self.current = self.results.pop(0)
+
+    @property
+    def description(self):
+        return [(name,) for name in self.current[0]]
+
+    def fetchall(self):
+        return self.current[1]
+
+
+def test_wait_deltas_skip_benign_waits_and_key_by_configured_instance() -> None:
+    from src.live_monitor.wait_deltas import WaitDeltaEngine
+
+    columns = ["sqlserver_start_time", "wait_type", "waiting_tasks_count", "wait_time_ms", "signal_wait_time_ms"]
+    cursor = ScriptedCursor([(columns, [("boot", "LCK_M_X", 1, 100, 0)])])
+    manager = FakeManager(cursor)
+    manager.instance = "sql01"
+    engine = WaitDeltaEngine()
+
+    DMVCollector(manager).wait_deltas(engine)
+
+    sql = cursor.executed[0][0]
+    assert "N'LAZYWRITER_SLEEP'" in sql and "N'XE_TIMER_EVENT'" not in sql
+    assert "NOT LIKE N'BROKER[_]%'" in sql and "NOT LIKE N'SLEEP[_]%'" in sql
+    assert "@@SERVERNAME" not in sql
+    assert [result["instance"] for result in engine.latest()] == ["sql01"]
+
+
+def test_top_queries_fetches_text_once_per_handle() -> None:
+    from datetime import datetime, timedelta
+
+    from src.live_monitor.query_stats import QueryStatsTracker
+
+    columns = [
+        "collection_time", "sqlserver_start_time", "query_hash", "plan_handle", "sql_handle",
+        "statement_start_offset", "statement_end_offset", "creation_time", "last_execution_time",
+        "execution_count", "total_worker_time", "total_logical_reads", "total_elapsed_time",
+    ]
+    t0 = datetime(2024, 1, 1)
+
+    def sample(at, executions):
+        return (columns, [(at, "boot", "0xA", "0xP", "0xS", 0, -1, t0, at, executions, executions * 1000, 0, 0)])
+
+    cursor = ScriptedCursor(
+        [
+            sample(t0, 1),
+            sample(t0 + timedelta(seconds=10), 5),
+            (["sql_handle", "text"], [("0xS", "SELECT * FROM orders")]),
+            sample(t0 + timedelta(seconds=20), 9),
+        ]
+    )
+    manager = FakeManager(cursor)
+    manager.instance = "sql01"
+    collector = DMVCollector(manager)
+    tracker = QueryStatsTracker()
+
+    assert collector.top_queries(tracker)["queries"] == []
+    first = collector.top_queries(tracker)
+    second = collector.top_queries(tracker)
+
+    assert first["queries"][0]["statement"] == "SELECT * FROM orders"
+    assert second["queries"][0]["executions"] == 4
+    assert cursor.executed[1][1] == (t0,)
+    assert sum("dm_exec_sql_text" in sql for sql, _ in cursor.executed) == 1
+
+
+def test_idle_query_stats_sample_still_advances_the_tracker() -> None:
+    from datetime import datetime, timedelta
+
+    from src.live_monitor.query_stats import QueryStatsTracker
+
+    columns = ["collection_time", "sqlserver_start_time", "plan_handle"]
+    t0 = datetime(2024, 1, 1)
+    cursor = ScriptedCursor([(columns, [(t0, "boot", None)]), (columns, [(t0 + timedelta(seconds=10), "boot", None)])])
+    manager = FakeManager(cursor)
+    manager.instance = "sql01"
+    collector = DMVCollector(manager)
+    tracker = QueryStatsTracker()
+
+    collector.top_queries(tracker)
+    result = collector.top_queries(tracker)
+
+    assert tracker.since("sql01") == t0 + timedelta(seconds=10)
+    assert result["interval_seconds"] == 10
+    assert result["queries"] == []
+    assert "last_elapsed_time" in cursor.executed[0][0]
+
+class StreamingCursor:
+    def __init__(self, columns, rows):
+        self.description = [(name,) for name in columns]
+        self.rows = list(rows)
+        self.batches = []
+
+    def execute(self, sql, *params):
+        self.params = params
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        self.batches.append(len(batch))
+        return batch
+
+
+def test_stream_encodes_fetchmany_batches_as_ndjson() -> None:
+    import json
+    from datetime import datetime
+
+    at = datetime(2024, 1, 1, 12, 0)
+    cursor = StreamingCursor(
+        ["collection_time", "session_id", "login_name"],
+        [(at, 51, "app"), (at, 52, None), (at, 53, 'say "hi"')],
+    )
+    manager = FakeManager(cursor)
+
+    chunks = DMVCollector(manager).stream("sessions", limit=100, batch_size=2)
+    assert manager.connects == 0
+    body = list(chunks)
+
+    assert len(body) == 2
+    assert cursor.batches == [2, 1, 0]
+    assert cursor.params == (100,)
+    rows = [json.loads(line) for line in b"".join(body).splitlines()]
+    assert rows[0] == {"collection_time": str(at), "session_id": 51, "login_name": "app"}
+    assert rows[2]["login_name"] == 'say "hi"'
+    assert rows[1]["login_name"] is None
+
+
+def test_stream_rejects_unknown_sections() -> None:
+    with pytest.raises(ValueError):
+        DMVCollector(FakeManager(None)).stream("plans", limit=10)
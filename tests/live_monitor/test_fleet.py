@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.common.config import SQLServerSettings, SQLServerTarget
+from src.live_monitor.fleet import FleetCollector, resolve_targets
+
+
+def _settings(*targets: SQLServerTarget) -> SQLServerSettings:
+    return SQLServerSettings(
+        dsn="shared", username="monitor", login_timeout=1, query_timeout=1, targets=list(targets)
+    )
+
+
+def test_targets_inherit_shared_settings() -> None:
+    resolved = resolve_targets(_settings(SQLServerTarget(name="a", server="sql-a", query_timeout=5)))
+
+    assert list(resolved) == ["shared", "a"]
+    assert resolved["shared"].dsn == "shared"
+    assert resolved["shared"].targets == []
+
+    assert resolved["a"].server == "sql-a"
+    assert resolved["a"].dsn is None
+    assert resolved["a"].username == "monitor"
+    assert resolved["a"].query_timeout == 5
+    assert resolved["a"].targets == []
+    assert list(resolve_targets(_settings())) == ["shared"]
+
+
+def test_unconfigured_top_level_is_left_out_when_targets_are_listed() -> None:
+    settings = SQLServerSettings(targets=[SQLServerTarget(name="a", server="sql-a")])
+
+    assert list(resolve_targets(settings)) == ["a"]
+    assert list(resolve_targets(SQLServerSettings())) == ["default"]
+
+
+class FakeCollector:
+    def __init__(self, settings: SQLServerSettings, release: threading.Event):
+        self.settings = settings
+        self.release = release
+
+    def snapshot(self, limit):
+        if self.settings.server == "hung":
+            self.release.wait(5)
+        if self.settings.server == "broken":
+            raise RuntimeError("login failed")
+        time.sleep(0.1)
+        return {"server": self.settings.server, "limit": limit}
+
+
+def test_sweep_runs_targets_concurrently_and_isolates_failures() -> None:
+    release = threading.Event()
+    healthy = [SQLServerTarget(name=f"sql{i}", server=f"sql{i}") for i in range(8)]
+    settings = _settings(
+        *healthy,
+        SQLServerTarget(name="hung", server="hung", login_timeout=0, query_timeout=0),
+        SQLServerTarget(name="broken", server="broken"),
+    )
+    fleet = FleetCollector(lambda target: FakeCollector(target, release), max_workers=16)
+    try:
+        started = time.perf_counter()
+        results = asyncio.run(fleet.sweep(settings, limit=5))
+        elapsed = time.perf_counter() - started
+    finally:
+        release.set()
+        fleet.close()
+
+    assert elapsed < 0.6
+    assert results["sql3"]["data"] == {"server": "sql3", "limit": 5}
+    assert results["sql3"]["error"] is None
+    assert results["hung"]["error"].startswith("timed out")
+    assert results["broken"] == {"latency_ms": results["broken"]["latency_ms"], "error": "login failed", "data": None}
+
+
+def test_sweep_rejects_unknown_targets() -> None:
+    fleet = FleetCollector(lambda target: None, max_workers=1)
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(fleet.sweep(_settings(SQLServerTarget(name="a", server="a")), targets=["b"]))
+    finally:
+        fleet.close()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from src.live_monitor.query_stats import QueryStatsTracker, statement_text
+
+T0 = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def _row(plan, query_hash, executions, cpu_us, reads=0, elapsed_us=0, created=T0 - timedelta(hours=1), start=0, end=-1):
+    return {
+        "plan_handle": plan,
+        "sql_handle": f"sql-{plan}",
+        "query_hash": query_hash,
+        "statement_start_offset": start,
+        "statement_end_offset": end,
+        "creation_time": created,
+        "last_execution_time": T0,
+        "execution_count": executions,
+        "total_worker_time": cpu_us,
+        "total_logical_reads": reads,
+        "total_elapsed_time": elapsed_us,
+    }
+
+
+def test_first_sample_is_a_full_baseline() -> None:
+    tracker = QueryStatsTracker()
+    assert tracker.since("sql01") is None
+
+    result = tracker.observe("sql01", [_row("p1", "0xA", 100, 5_000_000)], T0, "boot")
+
+    assert result["interval_seconds"] is None
+    assert result["queries"] == []
+    assert tracker.since("sql01") == T0
+
+
+def test_deltas_are_grouped_by_query_hash_and_ranked() -> None:
+    tracker = QueryStatsTracker()
+    tracker.observe("sql01", [_row("p1", "0xA", 100, 5_000_000), _row("p2", "0xA", 10, 100_000)], T0, "boot")
+    later = T0 + timedelta(seconds=10)
+    tracker.observe(
+        "sql01",
+        [
+            _row("p1", "0xA", 110, 5_400_000, reads=50),
+            _row("p2", "0xA", 12, 700_000),
+            _row("p3", "0xB", 2, 200_000, reads=9000, created=T0 + timedelta(seconds=5)),
+            _row("p4", "0xC", 999, 9_000_000, created=T0 - timedelta(days=1)),
+        ],
+        later,
+        "boot",
+    )
+
+    by_cpu = tracker.top("sql01", top=5)
+    assert by_cpu["interval_seconds"] == 10
+    first = by_cpu["queries"][0]
+    assert first["query_hash"] == "0xA"
+    assert first["plans"] == 2
+    assert first["executions"] == 12
+    assert first["cpu_ms"] == 1000
+    assert first["cpu_ms_per_sec"] == 100
+    assert first["sql_handle"] == "sql-p2"
+    # p4 was not seen in the full baseline and predates it, so its lifetime totals are not an interval delta.
+    assert [query["query_hash"] for query in by_cpu["queries"]] == ["0xA", "0xB"]
+    assert tracker.top("sql01", top=1, order_by="reads")["queries"][0]["query_hash"] == "0xB"
+
+
+def test_recompiled_plan_counts_from_zero() -> None:
+    tracker = QueryStatsTracker()
+    tracker.observe("sql01", [_row("p1", "0xA", 100, 5_000_000)], T0, "boot")
+    tracker.observe("sql01", [_row("p1", "0xA", 3, 30_000)], T0 + timedelta(seconds=5), "boot")
+
+    assert tracker.top("sql01")["queries"][0]["executions"] == 3
+
+
+def test_statement_text_is_cached_by_sql_handle() -> None:
+    tracker = QueryStatsTracker(text_cache_size=1)
+    text = "SELECT 1;\nUPDATE t SET x = 1;"
+    tracker.observe("sql01", [_row("p1", "0xA", 1, 1, start=20, end=-1)], T0, "boot")
+    tracker.observe("sql01", [_row("p1", "0xA", 2, 2, start=20, end=-1)], T0 + timedelta(seconds=1), "boot")
+
+    assert tracker.missing_text(["sql-p1"]) == ["sql-p1"]
+    tracker.store_text({"sql-p1": text})
+    assert tracker.missing_text(["sql-p1"]) == []
+    assert tracker.top("sql01")["queries"][0]["statement"] == "UPDATE t SET x = 1;"
+    tracker.store_text({"sql-other": "SELECT 2"})
+    assert tracker.missing_text(["sql-p1"]) == ["sql-p1"]
+
+
+def test_statement_text_offsets() -> None:
+    assert statement_text("SELECT 1; SELECT 2;", 20, 36) == "SELECT 2;"
+    assert statement_text(None, 0, -1) is None
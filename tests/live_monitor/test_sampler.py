@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import pytest
+
+from src.common.config import SQLServerSettings, SQLServerTarget
+from src.live_monitor.sampler import DMVSampler, SampleRing
+from src.live_monitor.wait_deltas import WaitDeltaEngine
+
+
+def _rows(index: int) -> dict:
+    return {
+        "waits": [{"wait_type": "CXPACKET", "wait_time_ms": index}],
+        "blocking": [{"session_id": 51}] * index,
+        "sessions": [{"session_id": 51, "status": "running"}, {"session_id": 52, "status": None}],
+        "wait_deltas": [{"wait_type": "CXPACKET", "wait_ms_per_sec": float(index)}],
+    }
+
+
+def test_ring_keeps_only_the_newest_samples() -> None:
+    ring = SampleRing(3)
+    for index in range(5):
+        ring.append(float(index), 1.0, _rows(index))
+
+    assert len(ring) == 3
+    assert ring.latest_at() == 4.0
+    assert ring.latest("waits") == [{"wait_type": "CXPACKET", "wait_time_ms": 4}]
+    assert [sample["collected_at"] for sample in ring.history("waits", 10)] == [2.0, 3.0, 4.0]
+    series = ring.series(2)
+    assert series["collected_at"] == [3.0, 4.0]
+    assert series["blocked_sessions"] == [3, 4]
+    assert series["active_sessions"] == [1, 1]
+    assert series["wait_ms_per_sec"] == [3.0, 4.0]
+
+
+class FakeCollector:
+    calls = 0
+
+    def snapshot(self, limit):
+        FakeCollector.calls += 1
+        return {"collection_time": None, "waits": [{"limit": limit}], "blocking": [], "sessions": []}
+
+    def wait_deltas(self, engine, instance=None, top=10):
+        return engine.observe(instance, [], at=float(FakeCollector.calls))
+
+
+def test_sampler_buffers_samples_per_instance() -> None:
+    settings = SQLServerSettings(server="sql01", sample_interval=15, sample_history=2, sample_limit=7)
+    now = [100.0]
+    sampler = DMVSampler(lambda: settings, lambda _: FakeCollector(), WaitDeltaEngine(), clock=lambda: now[0])
+
+    assert sampler.fresh_ring() is None
+    for _ in range(3):
+        sampler.sample_once()
+
+    ring = sampler.fresh_ring()
+    assert ring is not None and len(ring) == 2
+    assert ring.latest("waits") == [{"limit": 7}]
+
+    now[0] += 31
+    assert sampler.fresh_ring() is None
+    assert sampler.ring("sql01") is ring
+
+
+def test_sampler_stays_off_until_sql_server_is_configured() -> None:
+    settings = [SQLServerSettings(sample_interval=15)]
+    sampler = DMVSampler(lambda: settings[0], lambda _: FakeCollector(), WaitDeltaEngine())
+
+    async def scenario() -> tuple:
+        sampler.start()
+        idle = sampler._task
+        settings[0] = SQLServerSettings(server="sql01", sample_interval=15)
+        sampler.configure(settings[0])
+        await asyncio.sleep(0)
+        running = sampler._task
+        await sampler.stop()
+        return idle, running
+
+    idle, running = asyncio.run(scenario())
+    assert idle is None
+    assert running is not None
+
+
+class FailingCollector(FakeCollector):
+    def snapshot(self, limit):
+        raise ConnectionError("login failed")
+
+
+def test_sampler_samples_every_target_and_isolates_failures(caplog) -> None:
+    settings = SQLServerSettings(
+        sample_interval=15,
+        targets=[SQLServerTarget(name="sql01", server="sql01"), SQLServerTarget(name="sql02", server="sql02")],
+    )
+    now = [100.0]
+
+    def factory(target):
+        return FailingCollector() if target.server == "sql02" else FakeCollector()
+
+    sampler = DMVSampler(lambda: settings, factory, WaitDeltaEngine(), clock=lambda: now[0])
+    with caplog.at_level(logging.WARNING, logger="src.live_monitor.sampler"):
+        sampler.sample_once()
+        sampler.sample_once()
+
+    assert sampler.fresh_ring("sql01") is not None
+    assert sampler.ring("sql02") is None
+    assert [record.getMessage() for record in caplog.records] == ["DMV sampling of sql02 failed: login failed"]
+
+    settings = SQLServerSettings(sample_interval=15, targets=[SQLServerTarget(name="sql02", server="sql02")])
+    with pytest.raises(ConnectionError):
+        sampler.sample_once()
+    assert sampler.ring("sql01") is None
+
+
+def test_sampler_logs_failures_once_and_backs_off(caplog, monkeypatch) -> None:
+    settings = SQLServerSettings(server="sql01", sample_interval=10)
+    sampler = DMVSampler(lambda: settings, lambda _: FailingCollector(), WaitDeltaEngine())
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 5:
+            raise asyncio.CancelledError
+
+    async def inline(function, *args):
+        return function(*args)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(asyncio, "to_thread", inline)
+    with caplog.at_level(logging.WARNING, logger="src.live_monitor.sampler"):
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(sampler._loop())
+
+    assert sleeps == [20, 40, 80, 80, 80]
+    assert len(caplog.records) == 1
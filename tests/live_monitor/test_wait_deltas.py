@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pytest
+
+from src.live_monitor.wait_deltas import WaitDeltaEngine
+
+
+def _rows(**waits):
+    return [
+        {"wait_type": name, "waiting_tasks_count": tasks, "wait_time_ms": wait, "signal_wait_time_ms": signal}
+        for name, (tasks, wait, signal) in waits.items()
+    ]
+
+
+def test_first_sample_is_a_baseline() -> None:
+    engine = WaitDeltaEngine()
+    result = engine.observe("sql01", _rows(CXPACKET=(10, 5000, 100)), start_time="boot", at=0.0)
+    assert result["interval_seconds"] is None
+    assert result["waits"] == []
+
+
+def test_deltas_and_rates_between_samples() -> None:
+    engine = WaitDeltaEngine()
+    engine.observe("sql01", _rows(CXPACKET=(10, 5000, 100), LCK_M_X=(1, 50, 0)), start_time="boot", at=0.0)
+    result = engine.observe(
+        "sql01",
+        _rows(CXPACKET=(12, 5200, 110), LCK_M_X=(5, 4050, 10), PAGEIOLATCH_SH=(3, 30, 3)),
+        start_time="boot",
+        at=10.0,
+    )
+
+    assert result["interval_seconds"] == 10.0
+    assert [row["wait_type"] for row in result["waits"]] == ["LCK_M_X", "CXPACKET", "PAGEIOLATCH_SH"]
+    lock = result["waits"][0]
+    assert lock["wait_time_ms"] == 4000
+    assert lock["waiting_tasks"] == 4
+    assert lock["wait_ms_per_sec"] == 400
+    assert lock["avg_wait_ms"] == 1000
+    assert lock["resource_wait_time_ms"] == 3990
+    assert result["waits"][2]["wait_time_ms"] == 30
+
+
+def test_unchanged_counters_are_omitted() -> None:
+    engine = WaitDeltaEngine()
+    engine.observe("sql01", _rows(CXPACKET=(10, 5000, 100)), start_time="boot", at=0.0)
+    assert engine.observe("sql01", _rows(CXPACKET=(10, 5000, 100)), start_time="boot", at=5.0)["waits"] == []
+
+
+def test_sqlperf_clear_measures_from_zero() -> None:
+    engine = WaitDeltaEngine()
+    engine.observe("sql01", _rows(CXPACKET=(10, 5000, 100), LCK_M_X=(5, 900, 0)), start_time="boot", at=0.0)
+    result = engine.observe("sql01", _rows(CXPACKET=(2, 300, 10)), start_time="boot", at=10.0)
+
+    assert result["reset"] == "cleared"
+    assert [(row["wait_type"], row["wait_time_ms"]) for row in result["waits"]] == [("CXPACKET", 300)]
+
+
+def test_restart_rebaselines() -> None:
+    engine = WaitDeltaEngine()
+    engine.observe("sql01", _rows(CXPACKET=(10, 5000, 100)), start_time="boot-1", at=0.0)
+    result = engine.observe("sql01", _rows(CXPACKET=(20, 9000, 100)), start_time="boot-2", at=10.0)
+    assert result["reset"] == "restart"
+    assert result["waits"] == []
+
+    follow_up = engine.observe("sql01", _rows(CXPACKET=(21, 9100, 100)), start_time="boot-2", at=20.0)
+    assert follow_up["waits"][0]["wait_time_ms"] == pytest.approx(100)
+
+
+def test_latest_is_kept_per_instance() -> None:
+    engine = WaitDeltaEngine()
+    for instance in ("sql01", "sql02"):
+        engine.observe(instance, _rows(A=(1, 10, 0), B=(1, 10, 0)), at=0.0)
+        engine.observe(instance, _rows(A=(2, 30, 0), B=(2, 20, 0)), at=1.0)
+
+    latest = engine.latest(top=1)
+    assert [result["instance"] for result in latest] == ["sql01", "sql02"]
+    assert [row["wait_type"] for row in latest[0]["waits"]] == ["A"]
+    assert engine.latest("sql02", top=5)[0]["instance"] == "sql02"
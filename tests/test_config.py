@@ -3,6 +3,8 @@ from __future__ import annotations
 import os
 from pathlib import Path
 
+import pytest
+
 from src.common import config as config_module
 
 
@@ -61,3 +63,42 @@ def test_config_to_dict_roundtrip(tmp_path: Path) -> None:
     assert as_dict["elastic"]["request_timeout"] == 90
     assert "password" not in as_dict["elastic"]
     assert as_dict["sqlserver"]["encrypt"] is False
+
+
+def test_sqlserver_targets_parse_and_serialise(tmp_path: Path) -> None:
+    yaml = tmp_path / "settings.yaml"
+    yaml.write_text(
+        """
+        sqlserver:
+          server: sql1
+          targets:
+            - name: prod-a
+              server: sql-a
+              query_timeout: 10
+            - server: sql-b
+        """,
+        encoding="utf-8",
+    )
+
+    cfg = config_module.load_config(yaml)
+    assert [target.name for target in cfg.sqlserver.targets] == ["prod-a", "sql-b"]
+    assert cfg.sqlserver.targets[0].query_timeout == 10
+    assert cfg.sqlserver.targets[1].login_timeout is None
+
+    as_dict = config_module.config_to_dict(cfg)
+    assert as_dict["sqlserver"]["targets"][1] == {"name": "sql-b", "server": "sql-b"}
+
+
+def test_sqlserver_target_without_name_server_or_dsn_is_rejected(tmp_path: Path) -> None:
+    yaml = tmp_path / "settings.yaml"
+    yaml.write_text(
+        """
+        sqlserver:
+          targets:
+            - database: master
+        """,
+        encoding="utf-8",
+    )
+
+    with pytest.raises(ValueError, match="needs a name, server or dsn"):
+        config_module.load_config(yaml)
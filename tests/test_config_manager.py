@@ -56,3 +56,32 @@ def test_config_manager_requires_yaml(tmp_path: Path) -> None:
             manager.update({"elastic": {"url": "http://example"}})
     finally:
         module.yaml = original_yaml
+
+
+def test_config_manager_notifies_listeners(tmp_path: Path) -> None:
+    config_file = tmp_path / "settings.yaml"
+    config_file.write_text("{}", encoding="utf-8")
+    manager = ConfigManager(config_file)
+    seen = []
+    manager.subscribe(lambda cfg: seen.append(cfg.elastic.cache_ttl))
+
+    manager.update({"elastic": {"cache_ttl": 2}})
+    manager.reload()
+
+    assert seen == [2.0, 2.0]
+
+
+def test_failing_listener_does_not_block_the_others(tmp_path: Path) -> None:
+    config_file = tmp_path / "settings.yaml"
+    config_file.write_text("{}", encoding="utf-8")
+    manager = ConfigManager(config_file)
+    seen = []
+
+    def broken(cfg):
+        raise RuntimeError("listener failed")
+
+    manager.subscribe(broken)
+    manager.subscribe(lambda cfg: seen.append(cfg.elastic.cache_ttl))
+
+    assert manager.update({"elastic": {"cache_ttl": 3}}).elastic.cache_ttl == 3.0
+    assert seen == [3.0]